@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the paths hit on every analysis request
+
+Covers prompt building, markdown to HTML conversion, section splitting and
+document building on 1 KB to 1 MB readings, and profile handling. Results
+are written as JSON; pass an earlier file with --compare to flag slowdowns:
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_hot_paths.py -o baseline.json
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_hot_paths.py --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cosmic_destiny.analyzer import DestinyAnalyzer
+from cosmic_destiny.renderer import markdown_to_html, split_sections, build_document
+from cosmic_destiny.compatibility import chart_for_key, compute_chart
+from cosmic_destiny.server import AnalysisServer
+
+PROFILE = {
+    "chinese_name": "測試",
+    "english_name": "Test",
+    "gender": "男",
+    "birth_date": "2000-01-01",
+    "birth_time": "12:00 - 12:59",
+    "zodiac": "摩羯座 (Capricorn)",
+    "chinese_zodiac": "龍 (Dragon)",
+    "mbti": "INTJ",
+    "birthplace": "台北",
+    "fortune_type": "紫微斗數命盤分析",
+    "focus_area": "事業發展與財富軌跡",
+    "life_phases": ["成年早期 (19-30歲)", "成年中期 (31-45歲)"]
+}
+
+SECTION = (
+    "## 命盤總論\n\n"
+    "八字四柱解析顯示，日主屬木，生於冬月，**水旺木浮**，需以火土調候。\n"
+    "- **事業**：適合需要長期規劃的工作，中年後漸入佳境。\n"
+    "- **財運**：*正財穩定*，偏財宜守不宜攻。\n"
+    "- **感情**：重視精神契合，晚婚較為有利。\n\n"
+    "> 開運建議：多接觸紅色與黃色，居家宜朝南。\n\n"
+)
+
+READING_SIZES = [1024, 10 * 1024, 100 * 1024, 1024 * 1024]
+
+
+def make_reading(size):
+    """
+    Build a markdown reading of about the given size
+
+    Args:
+        size (int): Target size in UTF-8 bytes
+
+    Returns:
+        str: The reading
+    """
+    repeats = max(1, round(size / len(SECTION.encode("utf-8"))))
+    return SECTION * repeats
+
+
+def measure(function, min_time=0.2, max_repeats=1000):
+    """
+    Call a function repeatedly and time each call
+
+    Args:
+        function (callable): Function taking no arguments
+        min_time (float): Keep repeating until this many seconds have passed
+        max_repeats (int): Upper bound on the number of calls
+
+    Returns:
+        list: Duration of each call in microseconds
+    """
+    # One untimed call to warm caches before measuring
+    function()
+
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < max_repeats and (len(timings) < 3 or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+def summarize(name, timings, size=None):
+    """
+    Reduce the timings of one benchmark to summary statistics
+
+    Args:
+        name (str): Benchmark name
+        timings (list): Call durations in microseconds
+        size (int): Input size in bytes, if the benchmark has one
+
+    Returns:
+        dict: JSON-serializable result
+    """
+    result = {
+        "name": name,
+        "repeats": len(timings),
+        "min_us": min(timings),
+        "median_us": statistics.median(timings),
+        "mean_us": statistics.fmean(timings),
+    }
+    if size is not None:
+        result["size_bytes"] = size
+        result["mb_per_s"] = size / result["median_us"]
+    return result
+
+
+def run_benchmarks(min_time):
+    """
+    Run every benchmark
+
+    Args:
+        min_time (float): Minimum seconds spent on each benchmark
+
+    Returns:
+        list: Result of each benchmark
+    """
+    analyzer = DestinyAnalyzer()
+    profile_body = json.dumps(PROFILE, ensure_ascii=False).encode("utf-8")
+
+    def uncached_chart():
+        chart_for_key.cache_clear()
+        compute_chart(PROFILE)
+
+    results = [
+        summarize("create_prompt", measure(lambda: analyzer.create_prompt(PROFILE), min_time)),
+        summarize("parse_profile", measure(lambda: AnalysisServer.parse_profile(profile_body), min_time)),
+        summarize("compute_chart", measure(uncached_chart, min_time)),
+    ]
+
+    # Document building needs a GUI application for fonts; keep a reference
+    # so it lives until the benchmarks are done
+    from PyQt6.QtGui import QGuiApplication
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv[:1])
+
+    for size in READING_SIZES:
+        text = make_reading(size)
+        actual = len(text.encode("utf-8"))
+        html = markdown_to_html(text)
+        label = f"{size // 1024}KB" if size < 1024 * 1024 else f"{size // (1024 * 1024)}MB"
+        results += [
+            summarize(f"markdown_to_html[{label}]", measure(lambda: markdown_to_html(text), min_time), actual),
+            summarize(f"split_sections[{label}]", measure(lambda: split_sections(text), min_time), actual),
+            summarize(f"build_document[{label}]", measure(lambda: build_document(html), min_time), actual),
+        ]
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results with an earlier run
+
+    Args:
+        results (list): Results of this run
+        baseline (dict): Contents of an earlier output file
+        threshold (float): Slowdown ratio reported as a regression
+
+    Returns:
+        list: Names of the benchmarks that regressed
+    """
+    previous = {result["name"]: result for result in baseline["results"]}
+    regressions = []
+
+    print(f"\n{'benchmark':<28} {'baseline (us)':>14} {'now (us)':>12} {'ratio':>7}")
+    for result in results:
+        old = previous.get(result["name"])
+        if old is None:
+            continue
+        ratio = result["median_us"] / old["median_us"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{result['name']:<28} {old['median_us']:>14.1f} {result['median_us']:>12.1f} "
+              f"{ratio:>6.2f}x{flag}")
+        if ratio > threshold:
+            regressions.append(result["name"])
+    return regressions
+
+
+def main():
+    """Run the suite, print a table and write the JSON results"""
+    parser = argparse.ArgumentParser(description="CosmicDestiny hot path micro-benchmarks")
+    parser.add_argument("--output", "-o", default="bench_hot_paths.json", help="JSON results file")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="minimum seconds spent on each benchmark")
+    parser.add_argument("--compare", default=None, help="earlier results file to compare with")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="slowdown ratio counted as a regression")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.min_time)
+
+    print(f"{'benchmark':<28} {'median (us)':>12} {'min (us)':>12} {'MB/s':>8} {'runs':>6}")
+    for result in results:
+        throughput = f"{result['mb_per_s']:.1f}" if "mb_per_s" in result else "-"
+        print(f"{result['name']:<28} {result['median_us']:>12.1f} {result['min_us']:>12.1f} "
+              f"{throughput:>8} {result['repeats']:>6}")
+
+    output = {
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
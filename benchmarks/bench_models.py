@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Compare models and generation settings over a fixed profile corpus
+
+Runs every profile of the corpus against every combination of the given
+models and options, one request at a time, and collects model load time,
+prompt evaluation and generation speed, output length, time to first token
+and total latency as reported by Ollama:
+
+    # two model tags, each with two temperatures, against the configured backend
+    python benchmarks/bench_models.py --model deepseek-r1:14b --model deepseek-r1:7b \\
+        --option temperature=0.5,0.7
+
+    # quick dry run of the harness itself
+    python benchmarks/bench_models.py --fake --profiles 2
+
+Options not given keep their MODEL_SETTINGS values. The output directory
+receives results.json with every run, report.md with the comparison table,
+and side_by_side.html with each profile's readings in one row, one column
+per variant, for reviewing quality next to speed.
+"""
+
+import argparse
+import html
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cosmic_destiny.analyzer import DestinyAnalyzer
+from cosmic_destiny.settings import current_settings, parse_env_value
+from cosmic_destiny.config import (FORTUNE_TYPES, FOCUS_AREAS, CHINESE_ZODIACS, WESTERN_ZODIACS,
+                                   MBTI_TYPES, LIFE_PHASES)
+
+# Fixed input fields of the corpus; the rest vary per profile
+BIRTHS = [
+    ("王小明", "Ming Wang", "男", "1990-03-15", "08:00 - 08:59", "台北"),
+    ("陳怡君", "Yi-Chun Chen", "女", "1985-11-02", "23:00 - 23:59", "高雄"),
+    ("林志豪", "Chih-Hao Lin", "男", "2001-07-21", "12:00 - 12:59", "台中"),
+    ("張雅婷", "Ya-Ting Chang", "女", "1978-01-30", "05:00 - 05:59", "花蓮"),
+    ("黃建宏", "Chien-Hung Huang", "男", "1996-09-09", "17:00 - 17:59", "新竹"),
+    ("李佩珊", "Pei-Shan Lee", "女", "2008-05-05", "02:00 - 02:59", "台南"),
+]
+
+
+def make_corpus():
+    """
+    Build the fixed benchmark corpus
+
+    Each profile takes a different fortune type, focus area, zodiac signs
+    and MBTI type, so the corpus covers the prompt variations.
+
+    Returns:
+        list: User data dictionaries
+    """
+    corpus = []
+    for index, (chinese, english, gender, date, hour, place) in enumerate(BIRTHS):
+        corpus.append({
+            "chinese_name": chinese,
+            "english_name": english,
+            "gender": gender,
+            "birth_date": date,
+            "birth_time": hour,
+            "zodiac": WESTERN_ZODIACS[index * 5 % len(WESTERN_ZODIACS)],
+            "chinese_zodiac": CHINESE_ZODIACS[index * 7 % len(CHINESE_ZODIACS)],
+            "mbti": MBTI_TYPES[index * 3 % len(MBTI_TYPES)],
+            "birthplace": place,
+            "fortune_type": FORTUNE_TYPES[index % len(FORTUNE_TYPES)],
+            "focus_area": FOCUS_AREAS[index % len(FOCUS_AREAS)],
+            "life_phases": LIFE_PHASES[index % 3:index % 3 + 2],
+        })
+    return corpus
+
+
+def parse_option(text):
+    """
+    Parse an --option argument
+
+    Args:
+        text (str): NAME=VALUE[,VALUE...], e.g. temperature=0.5,0.7
+
+    Returns:
+        tuple: (name, list of values)
+    """
+    name, separator, values = text.partition("=")
+    if not separator or not name or not values:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE[,VALUE...], got {text!r}")
+    return name, [parse_env_value(value) for value in values.split(",")]
+
+
+def make_variants(models, options):
+    """
+    Combine every model with every combination of option values
+
+    Args:
+        models (list): Model tags
+        options (list): (name, values) pairs from parse_option
+
+    Returns:
+        list: (label, model, option overrides) tuples
+    """
+    names = [name for name, _ in options]
+    variants = []
+    for model in models:
+        for values in itertools.product(*(values for _, values in options)):
+            overrides = dict(zip(names, values))
+            label = " ".join([model] + [f"{name}={value}" for name, value in overrides.items()])
+            variants.append((label, model, overrides))
+    return variants
+
+
+def run_one(analyzer, settings, user_data):
+    """
+    Run one analysis with fixed settings
+
+    Args:
+        analyzer (DestinyAnalyzer): Analyzer sending the request
+        settings (BackendSettings): Model and options of the variant
+        user_data (dict): Profile to analyze
+
+    Returns:
+        dict: Timings, Ollama metrics and the output
+    """
+    stats = {}
+    pieces = []
+    start_time = time.perf_counter()
+    first_token = None
+    prompt = analyzer.create_prompt(user_data)
+    for text in analyzer.stream_generate(prompt, stats, settings):
+        if first_token is None:
+            first_token = time.perf_counter() - start_time
+        pieces.append(text)
+    total = time.perf_counter() - start_time
+
+    metrics = stats.get("metrics", {})
+    output = "".join(pieces)
+
+    def rate(count, duration):
+        count, duration = metrics.get(count), metrics.get(duration)
+        return count / (duration / 1e9) if count and duration else None
+
+    return {
+        "total": total,
+        "ttft": first_token,
+        "load": metrics.get("load_duration", 0) / 1e9,
+        "prompt_tokens_per_s": rate("prompt_eval_count", "prompt_eval_duration"),
+        "eval_tokens_per_s": rate("eval_count", "eval_duration"),
+        "eval_count": metrics.get("eval_count", 0),
+        "output_chars": len(output),
+        "output": output,
+    }
+
+
+def run_matrix(url, variants, corpus, repeats=1, warmup=True):
+    """
+    Run the corpus against every variant
+
+    Args:
+        url (str): Ollama generate endpoint
+        variants (list): Variants from make_variants
+        corpus (list): Profiles to analyze
+        repeats (int): Runs of each profile per variant
+        warmup (bool): Load each model with one untimed request first
+
+    Returns:
+        list: One result per run, tagged with variant, profile and repeat
+    """
+    analyzer = DestinyAnalyzer(api_url=url)
+    base = current_settings()._replace(api_url=url, ladder=(), tier=0)
+    results = []
+    total_runs = len(variants) * len(corpus) * repeats
+
+    for label, model, overrides in variants:
+        settings = base._replace(model=model, options=dict(base.options, **overrides))
+        if warmup:
+            try:
+                run_one(analyzer, settings._replace(options=dict(settings.options, num_predict=1)),
+                        corpus[0])
+            except Exception as e:
+                print(f"\nwarm-up of {label} failed: {str(e).splitlines()[0]}", file=sys.stderr)
+
+        for (index, user_data), repeat in itertools.product(enumerate(corpus), range(repeats)):
+            try:
+                result = run_one(analyzer, settings, user_data)
+            except Exception as e:
+                result = {"error": str(e).splitlines()[0]}
+            result.update(variant=label, profile=index, repeat=repeat)
+            results.append(result)
+            print(f"\r{len(results)}/{total_runs} runs finished", end="", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+    return results
+
+
+def summarize(results, variants):
+    """
+    Reduce the runs of each variant to its averages
+
+    Args:
+        results (list): Runs from run_matrix
+        variants (list): Variants from make_variants, in report order
+
+    Returns:
+        list: One summary dictionary per variant
+    """
+    def mean(runs, key):
+        values = [run[key] for run in runs if run.get(key) is not None]
+        return statistics.fmean(values) if values else None
+
+    def median(runs, key):
+        values = [run[key] for run in runs if run.get(key) is not None]
+        return statistics.median(values) if values else None
+
+    summaries = []
+    for label, _, _ in variants:
+        runs = [run for run in results if run["variant"] == label]
+        succeeded = [run for run in runs if "error" not in run]
+        summaries.append({
+            "variant": label,
+            "runs": len(runs),
+            "errors": len(runs) - len(succeeded),
+            "load_s": mean(succeeded, "load"),
+            "prompt_tokens_per_s": mean(succeeded, "prompt_tokens_per_s"),
+            "eval_tokens_per_s": mean(succeeded, "eval_tokens_per_s"),
+            "eval_count": mean(succeeded, "eval_count"),
+            "output_chars": mean(succeeded, "output_chars"),
+            "ttft_p50_s": median(succeeded, "ttft"),
+            "total_p50_s": median(succeeded, "total"),
+            "total_mean_s": mean(succeeded, "total"),
+        })
+    return summaries
+
+
+COLUMNS = [
+    ("variant", "variant", "{}"),
+    ("runs", "runs", "{}"),
+    ("errors", "errors", "{}"),
+    ("load_s", "load (s)", "{:.2f}"),
+    ("prompt_tokens_per_s", "prompt tok/s", "{:.1f}"),
+    ("eval_tokens_per_s", "eval tok/s", "{:.1f}"),
+    ("eval_count", "tokens", "{:.0f}"),
+    ("output_chars", "chars", "{:.0f}"),
+    ("ttft_p50_s", "ttft p50 (s)", "{:.2f}"),
+    ("total_p50_s", "total p50 (s)", "{:.2f}"),
+    ("total_mean_s", "total mean (s)", "{:.2f}"),
+]
+
+
+def format_report(summaries):
+    """
+    Format the comparison as a markdown table
+
+    Args:
+        summaries (list): Output of summarize
+
+    Returns:
+        str: The table
+    """
+    lines = ["| " + " | ".join(title for _, title, _ in COLUMNS) + " |",
+             "|" + "|".join("---" for _ in COLUMNS) + "|"]
+    for summary in summaries:
+        cells = [pattern.format(summary[key]) if summary[key] is not None else "-"
+                 for key, _, pattern in COLUMNS]
+        lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines) + "\n"
+
+
+def write_side_by_side(path, results, variants, corpus):
+    """
+    Write the readings as an HTML table, one row per profile
+
+    Only the first repeat of each profile is shown.
+
+    Args:
+        path (str): HTML file to write
+        results (list): Runs from run_matrix
+        variants (list): Variants from make_variants, one column each
+        corpus (list): Profiles, one row each
+    """
+    runs = {(run["variant"], run["profile"]): run for run in results if run["repeat"] == 0}
+    rows = []
+    for index, user_data in enumerate(corpus):
+        cells = [f"<th>{html.escape(user_data['chinese_name'])}<br>"
+                 f"{html.escape(user_data['fortune_type'])}<br>"
+                 f"{html.escape(user_data['focus_area'])}</th>"]
+        for label, _, _ in variants:
+            run = runs.get((label, index), {})
+            if "error" in run:
+                text = f"錯誤：{run['error']}"
+            else:
+                text = run.get("output", "")
+                if run:
+                    text = f"[{run['eval_count']} tokens, {run['total']:.1f} s]\n\n{text}"
+            cells.append(f"<td><pre>{html.escape(text)}</pre></td>")
+        rows.append("<tr>" + "".join(cells) + "</tr>")
+
+    header = "<tr><th></th>" + "".join(f"<th>{html.escape(label)}</th>"
+                                       for label, _, _ in variants) + "</tr>"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+                "<title>CosmicDestiny model comparison</title><style>"
+                "table{border-collapse:collapse}th,td{border:1px solid #ccc;padding:6px;"
+                "vertical-align:top}pre{white-space:pre-wrap;width:40em;margin:0;"
+                "font-family:inherit}</style></head><body><table>\n")
+        f.write(header + "\n" + "\n".join(rows) + "\n</table></body></html>\n")
+
+
+def main():
+    """Run the matrix and write the report and outputs"""
+    parser = argparse.ArgumentParser(description="CosmicDestiny model and settings comparison")
+    parser.add_argument("--model", action="append", default=None,
+                        help="model tag to compare, repeatable (default: the configured model)")
+    parser.add_argument("--option", action="append", type=parse_option, default=[],
+                        metavar="NAME=VALUE[,VALUE...]",
+                        help="generation option values to compare, repeatable")
+    parser.add_argument("--url", default=None, help="Ollama generate endpoint")
+    parser.add_argument("--profiles", type=int, default=len(BIRTHS),
+                        help="number of corpus profiles to run")
+    parser.add_argument("--repeats", type=int, default=1, help="runs of each profile per variant")
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="include the first model load in the measurements")
+    parser.add_argument("--fake", action="store_true", help="run against an in-process fake Ollama")
+    parser.add_argument("--output", "-o", default="bench_models",
+                        help="directory for results.json, report.md and side_by_side.html")
+    args = parser.parse_args()
+
+    url = args.url or current_settings().api_url
+    models = args.model or [current_settings().model]
+    if args.fake:
+        from cosmic_destiny.fake_ollama import FakeOllama
+        fake = FakeOllama(models=models, load_delay=0.2, first_token_latency=0.1,
+                          tokens_per_second=200.0, seed=0)
+        fake.start()
+        url = fake.url
+
+    corpus = make_corpus()[:args.profiles]
+    variants = make_variants(models, args.option)
+    results = run_matrix(url, variants, corpus, args.repeats, warmup=not args.no_warmup)
+    summaries = summarize(results, variants)
+    report = format_report(summaries)
+    print(report)
+
+    os.makedirs(args.output, exist_ok=True)
+    with open(os.path.join(args.output, "results.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "url": url,
+            "repeats": args.repeats,
+            "corpus": corpus,
+            "summary": summaries,
+            "results": results,
+        }, f, indent=2, ensure_ascii=False)
+    with open(os.path.join(args.output, "report.md"), "w", encoding="utf-8") as f:
+        f.write(f"# Model comparison\n\n{len(corpus)} profiles x {args.repeats} repeats "
+                f"against {url}\n\n{report}")
+    write_side_by_side(os.path.join(args.output, "side_by_side.html"), results, variants, corpus)
+    print(f"Results written to {args.output}/")
+
+
+if __name__ == "__main__":
+    main()
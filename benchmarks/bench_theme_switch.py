@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Measure theme and font switching on large results
+
+Run with the offscreen platform on headless machines:
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_theme_switch.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtWidgets import QApplication
+
+from cosmic_destiny.config import UI_RESULT_MAX_SECTIONS
+
+SECTION = "## 命盤總論\n\n" + "- **重點** 這是一段命理分析的測試內容。\n" * 20 + "\n> 開運建議\n\n"
+
+
+def wait_for_render(app, result_tab):
+    """Process events until the latest document is displayed and filled in"""
+    while result_tab.displayed_generation != result_tab.render_generation or \
+            result_tab.section_render_pending:
+        app.processEvents()
+
+
+def fill_window(app, result_tab):
+    """Scroll down until the document holds as many sections as it keeps"""
+    scroll_bar = result_tab.result_text.verticalScrollBar()
+    wanted = min(UI_RESULT_MAX_SECTIONS, len(result_tab.result_sections))
+    while result_tab.rendered_sections - result_tab.first_section < wanted:
+        scroll_bar.setValue(scroll_bar.maximum())
+        wait_for_render(app, result_tab)
+
+
+def main():
+    """Time theme and font switches for results of growing size"""
+    app = QApplication(sys.argv)
+    from cosmic_destiny.ui.result_tab import ResultTab
+
+    result_tab = ResultTab()
+    result_tab.resize(1000, 700)
+    result_tab.show()
+    themes = [result_tab.color_scheme.itemText(i) for i in range(result_tab.color_scheme.count())]
+
+    print(f"{'result size':>12} {'theme switch (ms)':>18} {'font switch (ms)':>17}")
+    for repeats in (10, 100, 1000):
+        text = SECTION * repeats
+        result_tab.set_result(text)
+        wait_for_render(app, result_tab)
+        fill_window(app, result_tab)
+
+        # Cycle through every theme twice, each time until the switched
+        # document is on display
+        start = time.perf_counter()
+        for index in list(range(1, len(themes))) * 2 + [0]:
+            result_tab.color_scheme.setCurrentIndex(index)
+            app.processEvents()
+            wait_for_render(app, result_tab)
+        theme_ms = (time.perf_counter() - start) * 1000 / (2 * (len(themes) - 1) + 1)
+
+        # Step the font size up and back down
+        start = time.perf_counter()
+        for size in (14, 15, 14, 13):
+            result_tab.font_size.setValue(size)
+            app.processEvents()
+            wait_for_render(app, result_tab)
+        font_ms = (time.perf_counter() - start) * 1000 / 4
+
+        print(f"{len(text.encode('utf-8')) // 1024:>9} KB {theme_ms:>18.2f} {font_ms:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test with latency percentiles
+
+Drives N simulated users, each running analyses one after another, either
+straight through DestinyAnalyzer against an Ollama endpoint or through the
+HTTP API server. Reports throughput, time to first token, total latency and
+queueing delay at p50/p95/p99 plus error rates, as a table and as JSON:
+
+    # 8 users against a local fake backend, no GPU needed
+    python benchmarks/load_test.py --users 8 --requests 3 --fake
+
+    # 16 users through a running API server
+    python benchmarks/load_test.py --mode server --url http://127.0.0.1:8765 --users 16
+
+In analyzer mode the queueing delay is estimated as the time to first token
+minus the model load and prompt evaluation time Ollama reports; in server
+mode it is the time the analysis waited for a backend slot.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cosmic_destiny.analyzer import DestinyAnalyzer
+from cosmic_destiny.config import OLLAMA_API_URL, SERVER_HOST, SERVER_PORT, SERVER_SLOTS
+
+PROFILE = {
+    "chinese_name": "測試",
+    "english_name": "Test",
+    "gender": "男",
+    "birth_date": "2000-01-01",
+    "birth_time": "12:00 - 12:59",
+    "zodiac": "摩羯座 (Capricorn)",
+    "chinese_zodiac": "龍 (Dragon)",
+    "mbti": "INTJ",
+    "birthplace": "台北",
+    "fortune_type": "紫微斗數命盤分析",
+    "focus_area": "事業發展與財富軌跡",
+    "life_phases": ["成年早期 (19-30歲)", "成年中期 (31-45歲)"]
+}
+
+PERCENTILES = (50, 95, 99)
+
+
+def make_profile(user, request):
+    """
+    Build a distinct profile for one simulated request
+
+    Args:
+        user (int): Simulated user number
+        request (int): Request number of that user
+
+    Returns:
+        dict: The user data
+    """
+    return dict(PROFILE, chinese_name=f"測試{user}-{request}")
+
+
+def percentile(values, percent):
+    """
+    Get a percentile by the nearest-rank method
+
+    Args:
+        values (list): Sorted values
+        percent (float): Percentile between 0 and 100
+
+    Returns:
+        float: The value, or None without values
+    """
+    if not values:
+        return None
+    rank = max(0, min(len(values) - 1, round(percent / 100 * len(values) + 0.5) - 1))
+    return values[rank]
+
+
+def run_analyzer_request(url, user_data):
+    """
+    Run one analysis straight through DestinyAnalyzer
+
+    Args:
+        url (str): Ollama generate endpoint
+        user_data (dict): Profile to analyze
+
+    Returns:
+        dict: Timings in seconds and the number of tokens generated
+    """
+    analyzer = DestinyAnalyzer(api_url=url)
+    stats = {}
+    start_time = time.perf_counter()
+    first_token = None
+    for _ in analyzer.stream_analysis(user_data, stats=stats):
+        if first_token is None:
+            first_token = time.perf_counter() - start_time
+    total = time.perf_counter() - start_time
+
+    metrics = stats.get("metrics", {})
+    queue = None
+    if first_token is not None and "prompt_eval_duration" in metrics:
+        busy = (metrics.get("load_duration", 0) + metrics["prompt_eval_duration"]) / 1e9
+        queue = max(0.0, first_token - busy)
+    return {"ttft": first_token, "total": total, "queue": queue,
+            "tokens": metrics.get("eval_count", 0)}
+
+
+def run_server_request(url, user_data):
+    """
+    Run one analysis through the HTTP API server
+
+    Submits the profile and follows its event stream until it finishes.
+
+    Args:
+        url (str): Base URL of the API server
+        user_data (dict): Profile to analyze
+
+    Returns:
+        dict: Timings in seconds and the number of tokens generated
+    """
+    import requests
+
+    start_time = time.perf_counter()
+    response = requests.post(f"{url}/api/analyses", json=user_data, timeout=30)
+    if response.status_code != 202:
+        raise Exception(f"HTTP {response.status_code}: {response.json().get('error')}")
+    job_id = response.json()["id"]
+
+    first_token = None
+    event = None
+    with requests.get(f"{url}/api/analyses/{job_id}/events", stream=True, timeout=2000) as events:
+        for line in events.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                if event == "chunk" and first_token is None:
+                    first_token = time.perf_counter() - start_time
+                elif event == "error":
+                    raise Exception(data["error"])
+                elif event == "done":
+                    total = time.perf_counter() - start_time
+                    metrics = data.get("metadata", {}).get("metrics", {})
+                    return {"ttft": first_token, "total": total,
+                            "queue": data["started_at"] - data["created_at"],
+                            "tokens": metrics.get("eval_count", 0)}
+    raise Exception("event stream ended before the analysis finished")
+
+
+def run_load(request, url, users, requests_per_user, ramp_up=0.0, think_time=0.0):
+    """
+    Run simulated users concurrently
+
+    Args:
+        request (callable): Function running one analysis, taking the URL
+            and the user data
+        url (str): Endpoint passed to the function
+        users (int): Number of simulated users
+        requests_per_user (int): Analyses each user runs one after another
+        ramp_up (float): Seconds over which user starts are spread
+        think_time (float): Seconds each user waits between analyses
+
+    Returns:
+        tuple: (list of per-request results, wall time in seconds)
+    """
+    results = []
+    lock = threading.Lock()
+
+    def simulate(user):
+        time.sleep(ramp_up * user / users)
+        for number in range(requests_per_user):
+            try:
+                result = request(url, make_profile(user, number))
+            except Exception as e:
+                result = {"error": str(e).splitlines()[0]}
+            with lock:
+                results.append(result)
+                done = len(results)
+            print(f"\r{done}/{users * requests_per_user} requests finished",
+                  end="", file=sys.stderr, flush=True)
+            if think_time and number < requests_per_user - 1:
+                time.sleep(think_time)
+
+    threads = [threading.Thread(target=simulate, args=(user,)) for user in range(users)]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(file=sys.stderr)
+    return results, time.perf_counter() - start_time
+
+
+def summarize(results, wall_time):
+    """
+    Reduce per-request results to the report
+
+    Args:
+        results (list): Per-request results from run_load
+        wall_time (float): Duration of the whole run in seconds
+
+    Returns:
+        dict: JSON-serializable summary
+    """
+    succeeded = [result for result in results if "error" not in result]
+    errors = Counter(result["error"] for result in results if "error" in result)
+
+    summary = {
+        "requests": len(results),
+        "succeeded": len(succeeded),
+        "errors": sum(errors.values()),
+        "error_rate": sum(errors.values()) / len(results) if results else 0.0,
+        "error_messages": dict(errors.most_common(10)),
+        "wall_time_s": wall_time,
+        "throughput_rps": len(succeeded) / wall_time if wall_time else 0.0,
+        "tokens_per_s": sum(result["tokens"] for result in succeeded) / wall_time if wall_time else 0.0,
+    }
+    for name in ("ttft", "total", "queue"):
+        values = sorted(result[name] for result in succeeded if result[name] is not None)
+        summary[name] = {f"p{percent}": percentile(values, percent) for percent in PERCENTILES}
+        summary[name]["mean"] = statistics.fmean(values) if values else None
+    return summary
+
+
+def print_report(summary):
+    """
+    Print the summary as a table
+
+    Args:
+        summary (dict): Output of summarize
+    """
+    print(f"requests     {summary['requests']} ({summary['succeeded']} succeeded, "
+          f"{summary['errors']} failed, {summary['error_rate']:.1%} error rate)")
+    print(f"wall time    {summary['wall_time_s']:.2f} s")
+    print(f"throughput   {summary['throughput_rps']:.3f} analyses/s, "
+          f"{summary['tokens_per_s']:.1f} tokens/s")
+
+    def seconds(value):
+        return f"{value:.3f}" if value is not None else "-"
+
+    print(f"\n{'latency (s)':<18} {'p50':>9} {'p95':>9} {'p99':>9} {'mean':>9}")
+    for name, label in (("ttft", "first token"), ("total", "total"), ("queue", "queueing delay")):
+        row = summary[name]
+        print(f"{label:<18} {seconds(row['p50']):>9} {seconds(row['p95']):>9} "
+              f"{seconds(row['p99']):>9} {seconds(row['mean']):>9}")
+
+    if summary["error_messages"]:
+        print("\nerrors")
+        for message, count in summary["error_messages"].items():
+            print(f"{count:>6}  {message}")
+
+
+def start_local_server(analyzer_url, slots):
+    """
+    Start an API server on a background thread
+
+    Args:
+        analyzer_url (str): Ollama generate endpoint used by the server
+        slots (int): Backend slots of the server
+
+    Returns:
+        str: Base URL of the server
+    """
+    from cosmic_destiny.server import AnalysisServer
+
+    started = threading.Event()
+    address = []
+
+    async def run():
+        server = AnalysisServer(DestinyAnalyzer(api_url=analyzer_url), slots=slots)
+        address.extend(await server.start("127.0.0.1", 0))
+        started.set()
+        await server.server.serve_forever()
+
+    threading.Thread(target=lambda: asyncio.run(run()), daemon=True).start()
+    started.wait()
+    return f"http://{address[0]}:{address[1]}"
+
+
+def main():
+    """Run the load test, print the report and write the JSON results"""
+    parser = argparse.ArgumentParser(description="CosmicDestiny end-to-end load test")
+    parser.add_argument("--mode", choices=["analyzer", "server"], default="analyzer",
+                        help="drive DestinyAnalyzer directly or go through the API server")
+    parser.add_argument("--url", default=None,
+                        help="Ollama generate endpoint, or API server base URL in server mode")
+    parser.add_argument("--users", type=int, default=4, help="concurrent simulated users")
+    parser.add_argument("--requests", type=int, default=2, help="analyses per user")
+    parser.add_argument("--ramp-up", type=float, default=0.0,
+                        help="seconds over which users start")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="seconds each user waits between analyses")
+    parser.add_argument("--slots", type=int, default=SERVER_SLOTS,
+                        help="backend slots of the local server and fake backend")
+    parser.add_argument("--fake", action="store_true",
+                        help="run against an in-process fake Ollama (and API server in server mode)")
+    parser.add_argument("--fake-tokens-per-second", type=float, default=30.0)
+    parser.add_argument("--fake-first-token-latency", type=float, default=0.5)
+    parser.add_argument("--fake-failure-rate", type=float, default=0.0)
+    parser.add_argument("--output", "-o", default="load_test.json", help="JSON results file")
+    args = parser.parse_args()
+
+    url = args.url
+    if args.fake:
+        from cosmic_destiny.fake_ollama import FakeOllama
+        fake = FakeOllama(load_delay=0, first_token_latency=args.fake_first_token_latency,
+                          tokens_per_second=args.fake_tokens_per_second,
+                          failure_rate=args.fake_failure_rate, slots=args.slots)
+        fake.start()
+        url = fake.url if args.mode == "analyzer" else start_local_server(fake.url, args.slots)
+    elif url is None:
+        url = OLLAMA_API_URL if args.mode == "analyzer" else f"http://{SERVER_HOST}:{SERVER_PORT}"
+
+    request = run_analyzer_request if args.mode == "analyzer" else run_server_request
+    results, wall_time = run_load(request, url.rstrip("/"), args.users, args.requests,
+                                  args.ramp_up, args.think_time)
+    summary = summarize(results, wall_time)
+    print_report(summary)
+
+    output = {
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "mode": args.mode,
+        "url": url,
+        "users": args.users,
+        "requests_per_user": args.requests,
+        "summary": summary,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,154 @@
 Core functionality for destiny analysis using LLM
 """
 
-import requests
 import json
 import logging
-from config import OLLAMA_API_URL, OLLAMA_MODEL, MODEL_SETTINGS
+import threading
+import time
+from cosmic_destiny.profiling import profiled
+from cosmic_destiny.settings import current_settings
+from cosmic_destiny.ladder import get_ladder
+from cosmic_destiny.library import ReadingLibrary, LIBRARY_NOTE
+from cosmic_destiny.config import (MAX_CONTINUATIONS, SECTION_CACHE_ENABLED, SECTION_NUM_PREDICT, SIMILAR_MIN_SCORE,
+                                   SIMILAR_REFERENCE, SIMILAR_REFERENCE_CHARS)
+from cosmic_destiny.timing import Spans
+
+# Timing and token counts reported by Ollama with the final response
+OLLAMA_METRICS = ("total_duration", "load_duration", "prompt_eval_count",
+                  "prompt_eval_duration", "eval_count", "eval_duration")
+
+# Sent with the context of a generation cut off at num_predict
+CONTINUE_PROMPT = "請直接從上文中斷處繼續撰寫，不要重複已寫的內容，也不要加入任何說明。"
+
+# Appended to the prompt to resume a generation that dropped partway
+RESUME_PROMPT = "\n\n以下是你先前已寫好的部分回答，因連線中斷而停止：\n\n{text}\n\n" + CONTINUE_PROMPT
+
+# Characters at the start of a continuation looked up in the text before it
+STITCH_WINDOW = 200
+
+# Shortest overlap with the end of the text that counts as a repeat
+STITCH_MIN_OVERLAP = 8
+
+class BackendUnavailable(Exception):
+    """The Ollama backend could not be reached"""
+
+class GenerationInterrupted(Exception):
+    """A streamed generation stopped partway, with an error or a dropped connection"""
+
+def repeated_length(text, continuation):
+    """
+    Measure how much of a continuation repeats the text before it
+    
+    Models resuming a reading sometimes restate its last sentence, or start
+    over from an earlier point.
+    
+    Args:
+        text (str): Text generated so far
+        continuation (str): Start of the continuation
+        
+    Returns:
+        int: Characters at the start of the continuation to leave out; may
+            be more than it holds yet when it starts over
+    """
+    head = continuation[:STITCH_WINDOW]
+    if not text or len(head) < STITCH_MIN_OVERLAP:
+        return 0
+    position = text.rfind(head)
+    if position >= 0:
+        return len(text) - position
+    for length in range(min(len(head), len(text)), STITCH_MIN_OVERLAP - 1, -1):
+        if text.endswith(head[:length]):
+            return length
+    return 0
+
+def stitch(pieces, text):
+    """
+    Pass a streamed continuation through without what repeats the text
+    
+    The first STITCH_WINDOW characters are held back until it is known how
+    much of them to leave out.
+    
+    Args:
+        pieces (generator): The streamed continuation
+        text (str): Text generated before it
+        
+    Yields:
+        str: Successive pieces of the continuation
+    """
+    head = ""
+    skip = None
+    for piece in pieces:
+        if skip is None:
+            head += piece
+            if len(head) < STITCH_WINDOW:
+                continue
+            skip, piece = repeated_length(text, head), head
+        dropped = min(skip, len(piece))
+        skip -= dropped
+        if piece[dropped:]:
+            yield piece[dropped:]
+    if skip is None:
+        # The continuation ended within the window
+        head = head[repeated_length(text, head):]
+        if head:
+            yield head
 
 class DestinyAnalyzer:
     """Class to handle all destiny analysis operations"""
     
-    def __init__(self):
-        """Initialize the analyzer"""
+    def __init__(self, api_url=None, ladder=None, section_cache=None, library=None,
+                 similar=None, reference=None, max_continuations=MAX_CONTINUATIONS):
+        """
+        Initialize the analyzer
+        
+        Args:
+            api_url (str): Ollama generate endpoint, or None to follow the
+                live settings
+            ladder (ModelLadder): Ladder picking the model under load, default
+                the one shared by the process
+            section_cache (SectionCache): Cache to generate readings section
+                by section with, default one if SECTION_CACHE_ENABLED is set
+            library (ReadingLibrary): Precomputed generic readings for
+                previews and when the backend is unreachable, default the
+                one at LIBRARY_PATH
+            similar (SimilarReadings): Index of past readings for previews
+                and reference passages, default the one at SIMILAR_INDEX_PATH
+                opened on first use
+            reference (bool): Whether to add passages of the closest past
+                reading to the prompt, default SIMILAR_REFERENCE
+            max_continuations (int): Follow-up requests resuming a generation
+                cut off at num_predict or dropped partway
+        """
+        self.api_url = api_url
+        self.ladder = ladder if ladder is not None else get_ladder()
+        if section_cache is None and SECTION_CACHE_ENABLED:
+            from cosmic_destiny.sections import SectionCache
+            section_cache = SectionCache()
+        self.section_cache = section_cache
+        self.library = library if library is not None else ReadingLibrary()
+        # Opened on first use, since it imports numpy
+        self.similar = similar
+        self.similar_lock = threading.Lock()
+        self.reference = SIMILAR_REFERENCE if reference is None else reference
+        self.max_continuations = max_continuations
         self.logger = logging.getLogger(__name__)
     
+    def current_settings(self):
+        """
+        Take the settings for one request
+        
+        The settings can be reloaded at any time, so each request takes
+        them once and uses that snapshot throughout.
+        
+        Returns:
+            BackendSettings: The live settings of the model tier the current
+                load calls for, with this analyzer's endpoint
+        """
+        settings = self.ladder.select(current_settings())
+        if self.api_url is not None:
+            settings = settings._replace(api_url=self.api_url)
+        return settings
+    
     def create_prompt(self, user_data):
         """
         Create a detailed prompt for the LLM based on user data
@@ -100,12 +236,83 @@ class DestinyAnalyzer:
 """
         return prompt
     
-    def analyze(self, user_data):
+    def build_payload(self, prompt, stream, settings):
+        """
+        Build the Ollama generate request for a prompt
+        
+        Args:
+            prompt (str): The prompt to send
+            stream (bool): Whether Ollama should stream the response
+            settings (BackendSettings): Settings of the request
+            
+        Returns:
+            dict: The request payload
+        """
+        return {
+            "model": settings.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": settings.options
+        }
+    
+    def collect_stats(self, stats, settings, response=None):
+        """
+        Record the model, ladder tier, settings and metrics of a generation
+        
+        Args:
+            stats (dict): Dictionary to fill, or None to skip
+            settings (BackendSettings): Settings of the request
+            response (dict): Final Ollama response holding the metrics
+        """
+        if stats is None:
+            return
+        stats["model"] = settings.model
+        stats["tier"] = settings.tier
+        stats["settings"] = dict(settings.options)
+        if response is not None:
+            stats["metrics"] = {key: response[key] for key in OLLAMA_METRICS if key in response}
+    
+    def record_spans(self, stats, response, start_time, first_token_time=None):
+        """
+        Split the time of a generation into its stages
+        
+        Model load and prompt evaluation come from Ollama's metrics; what
+        remains before the first token is counted as connecting and queueing.
+        
+        Args:
+            stats (dict): Metadata to record the spans into, or None to skip
+            response (dict): Final Ollama response holding the metrics
+            start_time (float): perf_counter value when the request was sent
+            first_token_time (float): perf_counter value at the first piece of
+                streamed text, or None for a non-streaming request
+        """
+        if stats is None:
+            return
+        end_time = time.perf_counter()
+        load = response.get("load_duration", 0) / 1e9
+        prompt_eval = response.get("prompt_eval_duration", 0) / 1e9
+        
+        if first_token_time is None:
+            generation = response.get("eval_duration", 0) / 1e9
+            waited = end_time - start_time - generation
+        else:
+            generation = end_time - first_token_time
+            waited = first_token_time - start_time
+        
+        spans = Spans.of(stats)
+        spans.add("connect", waited - load - prompt_eval)
+        spans.add("load", load)
+        spans.add("prompt_eval", prompt_eval)
+        spans.add("generation", generation)
+    
+    @profiled("analyze")
+    def analyze(self, user_data, stats=None):
         """
         Perform destiny analysis by querying the LLM
         
         Args:
             user_data (dict): Dictionary containing all user information
+            stats (dict): Filled with the model, settings and metrics used
             
         Returns:
             str: The analysis result
@@ -113,28 +320,360 @@ class DestinyAnalyzer:
         Raises:
             Exception: If the API call fails
         """
-        # Create the prompt
-        prompt = self.create_prompt(user_data)
+        try:
+            if self.section_cache is not None:
+                return "".join(self.stream_sections(user_data, stats))
+            with Spans.of(stats).span("prompt"):
+                prompt = self.create_prompt(user_data) + self.reference_prompt(user_data, stats)
+            return self.generate(prompt, stats)
+        except BackendUnavailable:
+            fallback = self.library_fallback(user_data, stats)
+            if fallback is None:
+                raise
+            return fallback
+    
+    @profiled("stream_analysis")
+    def stream_analysis(self, user_data, stats=None):
+        """
+        Perform destiny analysis, yielding the result as it is generated
+        
+        Args:
+            user_data (dict): Dictionary containing all user information
+            stats (dict): Filled with the model, settings and metrics used
+            
+        Yields:
+            str: Successive pieces of the analysis result
+            
+        Raises:
+            Exception: If the API call fails
+        """
+        if self.section_cache is not None:
+            pieces = self.stream_sections(user_data, stats)
+        else:
+            with Spans.of(stats).span("prompt"):
+                prompt = self.create_prompt(user_data) + self.reference_prompt(user_data, stats)
+            pieces = self.stream_generate(prompt, stats)
+        return self.stream_with_fallback(pieces, user_data, stats)
+    
+    def stream_with_fallback(self, pieces, user_data, stats=None):
+        """
+        Pass a streamed reading through, falling back to the library
         
-        # Prepare API request
-        payload = {
-            "model": OLLAMA_MODEL,
-            "prompt": prompt,
-            "stream": False,
-            "options": MODEL_SETTINGS
-        }
+        Args:
+            pieces (generator): The streamed reading
+            user_data (dict): Dictionary containing all user information
+            stats (dict): Filled with the library reading's model and settings
+                if it is used
+            
+        Yields:
+            str: Successive pieces of the analysis result
+            
+        Raises:
+            Exception: If the API call fails and the library cannot stand in
+        """
+        started = False
+        try:
+            for text in pieces:
+                started = True
+                yield text
+        except BackendUnavailable:
+            # Text already shown cannot be swapped for a different reading
+            fallback = None if started else self.library_fallback(user_data, stats)
+            if fallback is None:
+                raise
+            yield fallback
+    
+    def library_fallback(self, user_data, stats=None):
+        """
+        Get the library reading to serve while the backend is unreachable
+        
+        Args:
+            user_data (dict): Dictionary containing all user information
+            stats (dict): Filled with the library reading's model and settings
+            
+        Returns:
+            str: The generic reading with a note saying so, or None
+        """
+        record = self.library.lookup(user_data)
+        if record is None:
+            return None
+        self.logger.warning("Backend unreachable, serving the library reading")
+        if stats is not None:
+            stats["model"] = record["model"]
+            stats["settings"] = record["settings"]
+            stats["fallback"] = "library"
+        return LIBRARY_NOTE + record["result"]
+    
+    def nearest_reading(self, user_data):
+        """
+        Find the closest past reading similar enough to use
+        
+        Args:
+            user_data (dict): Dictionary containing all user information
+            
+        Returns:
+            tuple: (cosine similarity, archive record), or None
+        """
+        with self.similar_lock:
+            if self.similar is None:
+                from cosmic_destiny.similar import SimilarReadings
+                self.similar = SimilarReadings()
+        try:
+            found = self.similar.nearest(user_data)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Similar reading lookup failed: {str(e)}")
+            return None
+        if not found or found[0][0] < SIMILAR_MIN_SCORE:
+            return None
+        return found[0]
+    
+    def reference_prompt(self, user_data, stats=None):
+        """
+        Quote the closest past reading for the model to draw on
+        
+        Args:
+            user_data (dict): Dictionary containing all user information
+            stats (dict): Filled with the id of the quoted reading
+            
+        Returns:
+            str: Text to append to the prompt, empty if reference passages
+                are off or no past reading is close enough
+        """
+        if not self.reference:
+            return ""
+        found = self.nearest_reading(user_data)
+        if found is None:
+            return ""
+        from cosmic_destiny.similar import reference_passages
+        
+        passages = reference_passages(found[1], user_data, SIMILAR_REFERENCE_CHARS)
+        if not passages:
+            return ""
+        if stats is not None:
+            stats["reference"] = found[1]["id"]
+        return f"""
+以下節錄自一位命理特徵相近者的過往分析，僅供參考其分析角度與用語。請務必根據上述個人資料重新分析，不要照抄節錄內容：
+
+{passages}
+"""
+    
+    def preview(self, user_data):
+        """
+        Find a reading to show while the real one is generated
+        
+        The closest past reading is preferred, the library reading of the
+        same combination is used otherwise.
+        
+        Args:
+            user_data (dict): Dictionary containing all user information
+            
+        Returns:
+            tuple: (label describing the preview, its text), or None
+        """
+        found = self.nearest_reading(user_data)
+        if found is not None:
+            from cosmic_destiny.similar import redact
+            
+            score, record = found
+            return (f"相似度 {score:.0%} 的過往分析",
+                    redact(record["result"], record["user_data"]))
+        record = self.library.lookup(user_data)
+        if record is None:
+            return None
+        return "同星座、生肖與 MBTI 的通用解讀", record["result"]
+    
+    def stream_sections(self, user_data, stats=None):
+        """
+        Assemble a reading from cached sections, generating the missing ones
+        
+        All sections are generated with one settings snapshot. A generated
+        section is cached only once it is complete.
+        
+        Args:
+            user_data (dict): Dictionary containing all user information
+            stats (dict): Filled with the model, settings and metrics of the
+                generated sections, and the number of cached ones
+            
+        Yields:
+            str: Successive pieces of the analysis result
+            
+        Raises:
+            Exception: If the API call fails
+        """
+        from cosmic_destiny.sections import SECTIONS, section_key, create_section_prompt
+        
+        settings = self.current_settings()
+        budget = min(settings.options.get("num_predict", SECTION_NUM_PREDICT), SECTION_NUM_PREDICT)
+        section_settings = settings._replace(options=dict(settings.options, num_predict=budget))
+        spans = Spans.of(stats)
+        metrics = {}
+        cached = []
+        
+        for number, section in enumerate(SECTIONS, 1):
+            if number > 1:
+                yield "\n\n"
+            key = section_key(section, user_data, settings.model)
+            text = self.section_cache.get(key)
+            if text is not None:
+                cached.append(section.name)
+                yield text
+                continue
+            
+            with spans.span("prompt"):
+                prompt = create_section_prompt(section, number, user_data)
+            # Shares the spans, so the stage times add up over the sections
+            section_stats = {"spans": spans.durations}
+            pieces = []
+            for text in self.stream_generate(prompt, section_stats, section_settings):
+                pieces.append(text)
+                yield text
+            self.section_cache.put(key, section.name, settings.model, "".join(pieces))
+            for name, value in section_stats.get("metrics", {}).items():
+                metrics[name] = metrics.get(name, 0) + value
+        
+        self.logger.info(f"Reading assembled from {len(cached)} cached and "
+                         f"{len(SECTIONS) - len(cached)} generated sections")
+        self.collect_stats(stats, section_settings)
+        if stats is not None:
+            stats["metrics"] = metrics
+            stats["cached_sections"] = cached
+    
+    def continuation_payload(self, prompt, text, context, stream, settings):
+        """
+        Build the request resuming a generation that stopped early
+        
+        With the context Ollama returned, the model picks up its own state
+        and only needs to be told to go on. A dropped stream returns no
+        context, so the prompt is sent again with the text written so far.
+        
+        Args:
+            prompt (str): The original prompt
+            text (str): Text generated so far
+            context (list): Context returned with the last response, or None
+            stream (bool): Whether Ollama should stream the response
+            settings (BackendSettings): Settings of the request
+            
+        Returns:
+            dict: The request payload
+        """
+        if context:
+            payload = self.build_payload(CONTINUE_PROMPT, stream, settings)
+            payload["context"] = context
+            return payload
+        return self.build_payload(prompt + RESUME_PROMPT.format(text=text), stream, settings)
+    
+    def finish_stats(self, stats, settings, parts):
+        """
+        Record the model, settings and metrics of a generation in parts
+        
+        Args:
+            stats (dict): Dictionary to fill, or None to skip
+            settings (BackendSettings): Settings of the request
+            parts (list): Stats of the original request and each continuation
+        """
+        if stats is None:
+            return
+        self.collect_stats(stats, settings)
+        metrics = {}
+        for part in parts:
+            for name, value in part.get("metrics", {}).items():
+                metrics[name] = metrics.get(name, 0) + value
+        stats["metrics"] = metrics
+        if len(parts) > 1:
+            stats["continuations"] = len(parts) - 1
+    
+    def generate(self, prompt, stats=None, settings=None):
+        """
+        Query the LLM with a prompt
+        
+        A response cut off at num_predict is continued from its context, and
+        a failed continuation is resumed from the text received so far, up to
+        max_continuations times in all. If the last attempt fails, the text
+        generated before it is returned.
+        
+        Args:
+            prompt (str): The prompt to send
+            stats (dict): Filled with the model, settings and metrics used
+            settings (BackendSettings): Settings to use instead of the live
+                ones and the model ladder
+            
+        Returns:
+            str: The generated text
+            
+        Raises:
+            Exception: If the API call fails
+        """
+        settings = settings or self.current_settings()
+        spans = Spans.of(stats)
+        payload = self.build_payload(prompt, False, settings)
+        text = ""
+        parts = []
+        
+        while True:
+            part = {"spans": spans.durations}
+            parts.append(part)
+            try:
+                result = self.post_generate(payload, settings, part)
+            except Exception as e:
+                # A failed continuation keeps the text generated before it
+                if not text:
+                    raise
+                if len(parts) > self.max_continuations:
+                    self.logger.warning("Continuation failed, returning the text generated "
+                                        f"so far: {str(e)}")
+                    break
+                self.logger.warning(f"Continuation failed, resuming: {str(e)}")
+                payload = self.continuation_payload(prompt, text, None, False, settings)
+                continue
+            piece = result.get("response", "")
+            text += piece[repeated_length(text, piece):]
+            if result.get("done_reason") != "length" or not result.get("context"):
+                break
+            if len(parts) > self.max_continuations:
+                self.logger.warning("Generation still cut off at num_predict after "
+                                    f"{self.max_continuations} continuations")
+                break
+            self.logger.info("Generation cut off at num_predict, continuing")
+            payload = self.continuation_payload(prompt, text, result["context"], False, settings)
+        
+        self.finish_stats(stats, settings, parts)
+        return text or "未能生成分析結果"
+    
+    def post_generate(self, payload, settings, stats):
+        """
+        Send one non-streaming generate request
+        
+        Args:
+            payload (dict): The request payload
+            settings (BackendSettings): Settings of the request
+            stats (dict): Filled with the metrics and spans of the request
+            
+        Returns:
+            dict: The Ollama response
+            
+        Raises:
+            Exception: If the API call fails
+        """
+        # Imported here since requests is slow to import and only needed once
+        # an analysis actually runs
+        import requests
         
         headers = {"Content-Type": "application/json"}
         
         try:
             # Call the API
             self.logger.info("Calling Ollama API for analysis")
-            response = requests.post(OLLAMA_API_URL, json=payload, headers=headers, timeout=2000)
+            start_time = time.perf_counter()
+            response = requests.post(settings.api_url, json=payload, headers=headers, timeout=2000)
             
             # Check for successful response
             if response.status_code == 200:
                 result = response.json()
-                return result.get("response", "未能生成分析結果")
+                self.ladder.observe_latency(
+                    time.perf_counter() - start_time - result.get("eval_duration", 0) / 1e9)
+                self.collect_stats(stats, settings, result)
+                self.record_spans(stats, result, start_time)
+                return result
             else:
                 error_msg = f"API 調用失敗：HTTP {response.status_code}\n{response.text}"
                 self.logger.error(error_msg)
@@ -143,9 +682,139 @@ class DestinyAnalyzer:
         except requests.RequestException as e:
             error_msg = f"連接 Ollama API 失敗: {str(e)}"
             self.logger.error(error_msg)
+            raise BackendUnavailable(error_msg)
+        
+        except Exception as e:
+            error_msg = f"分析過程中發生錯誤: {str(e)}"
+            self.logger.error(error_msg)
             raise Exception(error_msg)
+    
+    def stream_generate(self, prompt, stats=None, settings=None):
+        """
+        Query the LLM with a prompt, yielding the text as it is generated
+        
+        A response cut off at num_predict is continued from its context, and
+        one that drops partway is resumed from the text received so far, up
+        to max_continuations times in all. The start of a continuation that
+        repeats text already yielded is left out.
+        
+        Args:
+            prompt (str): The prompt to send
+            stats (dict): Filled with the model, settings and metrics used
+                once generation is done
+            settings (BackendSettings): Settings to use instead of the live
+                ones and the model ladder
+            
+        Yields:
+            str: Successive pieces of the generated text
+            
+        Raises:
+            Exception: If the API call fails
+        """
+        settings = settings or self.current_settings()
+        spans = Spans.of(stats)
+        payload = self.build_payload(prompt, True, settings)
+        written = []
+        parts = []
+        
+        while True:
+            part = {"spans": spans.durations}
+            parts.append(part)
+            text = "".join(written)
+            pieces = self.stream_request(payload, settings, part)
+            if len(parts) > 1:
+                pieces = stitch(pieces, text)
+            try:
+                for piece in pieces:
+                    written.append(piece)
+                    yield piece
+            except (BackendUnavailable, GenerationInterrupted) as e:
+                # Nothing to resume from, or out of attempts
+                if not written or len(parts) > self.max_continuations:
+                    raise
+                self.logger.warning(f"Generation interrupted, resuming: {str(e)}")
+                payload = self.continuation_payload(prompt, "".join(written), None, True, settings)
+                continue
+            
+            if part.get("done_reason") != "length" or not part.get("context"):
+                break
+            if len(parts) > self.max_continuations:
+                self.logger.warning("Generation still cut off at num_predict after "
+                                    f"{self.max_continuations} continuations")
+                break
+            self.logger.info("Generation cut off at num_predict, continuing")
+            payload = self.continuation_payload(prompt, "".join(written), part["context"], True,
+                                                settings)
+        
+        self.finish_stats(stats, settings, parts)
+    
+    def stream_request(self, payload, settings, stats):
+        """
+        Send one streaming generate request
+        
+        Args:
+            payload (dict): The request payload
+            settings (BackendSettings): Settings of the request
+            stats (dict): Filled with the metrics and spans of the request,
+                and the done_reason and context of its final response
+            
+        Yields:
+            str: Successive pieces of the generated text
+            
+        Raises:
+            BackendUnavailable: If the connection fails or drops
+            GenerationInterrupted: If Ollama reports an error in the stream,
+                or it ends before the final response
+            Exception: If the API call fails otherwise
+        """
+        import requests
+        
+        headers = {"Content-Type": "application/json"}
+        
+        try:
+            self.logger.info("Calling Ollama API for streaming analysis")
+            start_time = time.perf_counter()
+            first_token_time = None
+            with requests.post(settings.api_url, json=payload, headers=headers,
+                               timeout=2000, stream=True) as response:
+                if response.status_code != 200:
+                    error_msg = f"API 調用失敗：HTTP {response.status_code}\n{response.text}"
+                    self.logger.error(error_msg)
+                    raise Exception(error_msg)
+                
+                # Ollama streams one JSON object per line
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise GenerationInterrupted(chunk["error"])
+                    if chunk.get("response"):
+                        if first_token_time is None:
+                            first_token_time = time.perf_counter()
+                            self.ladder.observe_latency(first_token_time - start_time)
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        self.collect_stats(stats, settings, chunk)
+                        self.record_spans(stats, chunk, start_time, first_token_time)
+                        stats["done_reason"] = chunk.get("done_reason")
+                        stats["context"] = chunk.get("context")
+                        break
+                else:
+                    # The connection closed without the final response
+                    raise GenerationInterrupted("stream ended before done")
+                    
+        except requests.RequestException as e:
+            error_msg = f"連接 Ollama API 失敗: {str(e)}"
+            self.logger.error(error_msg)
+            raise BackendUnavailable(error_msg)
+        
+        except GenerationInterrupted as e:
+            error_msg = f"分析過程中發生錯誤: {str(e)}"
+            self.logger.error(error_msg)
+            raise GenerationInterrupted(error_msg)
         
         except Exception as e:
             error_msg = f"分析過程中發生錯誤: {str(e)}"
             self.logger.error(error_msg)
-            raise Exception(error_msg)
\ No newline at end of file
+            raise Exception(error_msg)
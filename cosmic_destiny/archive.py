@@ -0,0 +1,259 @@
+"""
+Append-only archive of analysis results
+
+Each finished reading is stored as one JSON line holding the input profile
+exactly as it was submitted, the generated text, and the model, settings
+and metrics of the generation. Records are never rewritten, so the archive
+can be bulk-loaded and re-rendered without parsing the text reports.
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from cosmic_destiny.config import APP_NAME, RESULT_ARCHIVE_PATH
+from cosmic_destiny.timing import format_spans
+
+# Version of the record layout, stored with every record
+RECORD_FORMAT = 1
+
+
+def make_record(record_id, user_data, result, metadata=None, source="", created_at=None):
+    """
+    Build an archive record
+
+    Args:
+        record_id (str): Id of the analysis
+        user_data (dict): Input profile as submitted for generation
+        result (str): The analysis result
+        metadata (dict): Model, ladder tier, settings and metrics of the
+            generation
+        source (str): Where the analysis was requested, e.g. gui or batch
+        created_at (float): Time the result was generated, default now
+
+    Returns:
+        dict: The record
+    """
+    metadata = metadata or {}
+    return {
+        "format": RECORD_FORMAT,
+        "id": record_id,
+        "created_at": created_at if created_at is not None else time.time(),
+        "source": source,
+        "user_data": user_data,
+        "result": result,
+        "model": metadata.get("model"),
+        "tier": metadata.get("tier", 0),
+        "settings": metadata.get("settings", {}),
+        "metrics": metadata.get("metrics", {}),
+        "spans": metadata.get("spans", {}),
+    }
+
+
+def record_from_job(job):
+    """
+    Build an archive record from a finished job queue entry
+
+    Args:
+        job (dict): Job returned by JobQueue.get
+
+    Returns:
+        dict: The record
+    """
+    return make_record(job["id"], job["user_data"], job["result"], job["metadata"],
+                       job["source"], job["finished_at"])
+
+
+def render_report(record):
+    """
+    Format a record as the human-readable text report
+
+    Args:
+        record (dict): Archive record
+
+    Returns:
+        str: The report
+    """
+    user_data = record["user_data"]
+    created = datetime.fromtimestamp(record["created_at"]).strftime('%Y-%m-%d %H:%M:%S')
+
+    lines = [
+        f"{APP_NAME} 命理分析報告",
+        f"生成日期：{created}",
+    ]
+    if record.get("model"):
+        tier = f"（負載降級第 {record['tier']} 級）" if record.get("tier") else ""
+        lines.append(f"分析模型：{record['model']}{tier}")
+    if record.get("spans"):
+        lines.append(f"各階段耗時：{format_spans(record['spans'])}")
+    lines += [
+        "=" * 50,
+        "",
+        "個人資料：",
+        f"- 姓名（中文）：{user_data.get('chinese_name', '')}",
+        f"- 姓名（英文）：{user_data.get('english_name', '')}",
+        f"- 性別：{user_data.get('gender', '')}",
+        f"- 生辰年月日：{user_data.get('birth_date', '')}",
+        f"- 出生時辰：{user_data.get('birth_time', '')}",
+        f"- 星座：{user_data.get('zodiac', '')}",
+        f"- 生肖：{user_data.get('chinese_zodiac', '')}",
+        f"- MBTI 人格：{user_data.get('mbti', '')}",
+        f"- 出生地：{user_data.get('birthplace', '')}",
+        "",
+        f"分析類型：{user_data.get('fortune_type', '')}",
+        f"分析重點：{user_data.get('focus_area', '')}",
+        "",
+    ]
+
+    if user_data.get('life_phases'):
+        lines.append("特別關注的人生階段：")
+        lines += [f"- {phase}" for phase in user_data['life_phases']]
+        lines.append("")
+
+    lines += [
+        "命理分析結果：",
+        "=" * 50,
+        "",
+        record["result"],
+    ]
+    return "\n".join(lines)
+
+
+class ResultArchive:
+    """Append-only JSON lines file of analysis records"""
+
+    def __init__(self, path=RESULT_ARCHIVE_PATH):
+        """
+        Initialize the archive
+
+        Args:
+            path (str): Path of the JSON lines file, created on first append
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def append(self, record):
+        """
+        Add a record to the end of the archive
+
+        Args:
+            record (dict): Record from make_record
+        """
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+        # One write per record in append mode keeps concurrent writers from
+        # interleaving within a line
+        with self.lock:
+            with open(self.path, "a+b") as f:
+                # End a partly written line left by a crash, so this record
+                # is not joined to it and lost with it
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        line = b"\n" + line
+                f.write(line)
+        self.logger.info(f"Archived result {record['id']}")
+
+    def append_job(self, job):
+        """
+        Add a finished job queue entry to the archive
+
+        Args:
+            job (dict): Job returned by JobQueue.get
+        """
+        self.append(record_from_job(job))
+
+    def __iter__(self):
+        """
+        Iterate over the records, oldest first
+
+        A partly written last line, left by a crash, is skipped.
+
+        Yields:
+            dict: Each record
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    self.logger.warning(f"Skipping damaged record in {self.path}")
+
+    def load_all(self):
+        """
+        Load every record
+
+        Returns:
+            list: The records, oldest first
+        """
+        return list(self)
+
+    def get(self, record_id):
+        """
+        Find a record by id
+
+        Args:
+            record_id (str): Id of the analysis, or a unique prefix of it
+
+        Returns:
+            dict: The latest record with that id, or None
+        """
+        found = None
+        for record in self:
+            if record["id"].startswith(record_id):
+                found = record
+        return found
+
+
+def main(argv=None):
+    """
+    Command line interface for the result archive
+
+    Args:
+        argv (list): Arguments without the program name, or None for sys.argv
+    """
+    parser = argparse.ArgumentParser(description="CosmicDestiny 分析結果封存")
+    parser.add_argument("--archive", default=RESULT_ARCHIVE_PATH, help="archive file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="list archived results")
+
+    show_parser = commands.add_parser("show", help="print a result as a text report")
+    show_parser.add_argument("record_id")
+
+    export_parser = commands.add_parser("export", help="write every result as a text report")
+    export_parser.add_argument("--output", "-o", default="reports", help="output directory")
+
+    args = parser.parse_args(argv)
+    archive = ResultArchive(args.archive)
+
+    if args.command == "list":
+        for record in archive:
+            created = datetime.fromtimestamp(record["created_at"]).strftime('%Y-%m-%d %H:%M')
+            print(f"{record['id']}  {created}  {record.get('model') or '-':<18} "
+                  f"{record['user_data'].get('chinese_name', '')}")
+
+    elif args.command == "show":
+        record = archive.get(args.record_id)
+        if record is None:
+            parser.error(f"no such record: {args.record_id}")
+        print(render_report(record))
+
+    elif args.command == "export":
+        os.makedirs(args.output, exist_ok=True)
+        for record in archive:
+            path = os.path.join(args.output, f"{record['id']}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(render_report(record))
+            print(path)
+
+
+if __name__ == "__main__":
+    main()
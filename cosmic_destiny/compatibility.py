@@ -0,0 +1,395 @@
+"""
+Pairwise compatibility (合盤) analysis for groups of profiles
+
+Each profile's chart data is computed once and cached, then every pair in the
+group is scored locally with vectorized NumPy code. Only the best or the
+selected pairs are narrated by the LLM, and all of their prompts start with
+the same group description so Ollama can reuse the evaluated prefix.
+"""
+
+import argparse
+import json
+import logging
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from cosmic_destiny.log import setup_logging
+from cosmic_destiny.config import (CHINESE_ZODIACS, WESTERN_ZODIACS, MBTI_TYPES,
+                                   COMPATIBILITY_WEIGHTS, COMPATIBILITY_TOP_K)
+
+# Five elements in generating order: each one generates the next
+FIVE_ELEMENTS = ["木", "火", "土", "金", "水"]
+
+# Western zodiac elements, repeating from Aries
+WESTERN_ELEMENTS = ["火", "土", "風", "水"]
+
+# Weight of each MBTI axis: negative rewards opposite preferences
+MBTI_AXIS_WEIGHTS = np.array([-0.5, 1.0, -0.5, 0.5])
+
+# Profile fields the chart is computed from
+CHART_FIELDS = ("birth_date", "zodiac", "chinese_zodiac", "mbti")
+
+# Chart data of one profile; -1 marks an unknown index
+Chart = namedtuple("Chart", ["chinese_zodiac", "western_zodiac", "element", "mbti"])
+
+# Compatibility of one pair in a group
+Pair = namedtuple("Pair", ["first", "second", "score", "components"])
+
+
+def profile_key(user_data):
+    """
+    Get the cache key of a profile's chart
+
+    Values that are not strings, such as lists from a group file, count as
+    unknown, which also keeps the key hashable.
+
+    Args:
+        user_data (dict): Profile of one person
+
+    Returns:
+        tuple: Values of the fields the chart depends on
+    """
+    values = (user_data.get(field, "") for field in CHART_FIELDS)
+    return tuple(value if isinstance(value, str) else "" for value in values)
+
+
+@lru_cache(maxsize=1024)
+def chart_for_key(key):
+    """
+    Compute the chart data for a profile key
+
+    The five elements phase follows the heavenly stem of the Gregorian birth
+    year, which is an approximation for births before the Lunar New Year.
+
+    Args:
+        key (tuple): Result of profile_key
+
+    Returns:
+        Chart: The chart data
+    """
+    birth_date, zodiac, chinese_zodiac, mbti = key
+
+    # Missing or malformed birth dates leave the element unknown
+    try:
+        year = int(birth_date[:4]) if birth_date and isinstance(birth_date, str) else None
+    except ValueError:
+        year = None
+    element = (year - 4) % 10 // 2 if year is not None else -1
+
+    if mbti in MBTI_TYPES:
+        mbti_vector = tuple(1.0 if letter in "ENTJ" else -1.0 for letter in mbti)
+    else:
+        mbti_vector = (0.0, 0.0, 0.0, 0.0)
+
+    return Chart(
+        chinese_zodiac=CHINESE_ZODIACS.index(chinese_zodiac) if chinese_zodiac in CHINESE_ZODIACS else -1,
+        western_zodiac=WESTERN_ZODIACS.index(zodiac) if zodiac in WESTERN_ZODIACS else -1,
+        element=element,
+        mbti=mbti_vector,
+    )
+
+
+def compute_chart(user_data):
+    """
+    Get the chart data of a profile, computing it only once per profile
+
+    Args:
+        user_data (dict): Profile of one person
+
+    Returns:
+        Chart: The chart data
+    """
+    return chart_for_key(profile_key(user_data))
+
+
+def chinese_zodiac_scores(a, b):
+    """
+    Score Chinese zodiac pairs: 六合 and 三合 match well, 六沖 and 六害 clash
+
+    Args:
+        a, b (numpy.ndarray): Zodiac indices, broadcast against each other
+
+    Returns:
+        numpy.ndarray: Scores between 0 and 1
+    """
+    scores = np.full(np.broadcast(a, b).shape, 0.6)
+    scores[(a % 4) == (b % 4)] = 0.85
+    scores[(a + b) % 12 == 1] = 1.0
+    scores[(a + b) % 12 == 7] = 0.3
+    scores[np.abs(a - b) == 6] = 0.2
+    return scores
+
+
+def western_zodiac_scores(a, b):
+    """
+    Score western zodiac pairs by element: the same or a complementary
+    element matches well, opposite signs attract
+
+    Args:
+        a, b (numpy.ndarray): Zodiac indices, broadcast against each other
+
+    Returns:
+        numpy.ndarray: Scores between 0 and 1
+    """
+    element_a, element_b = a % 4, b % 4
+    scores = np.full(np.broadcast(a, b).shape, 0.4)
+    scores[(element_a + element_b) % 2 == 0] = 0.8
+    scores[element_a == element_b] = 0.9
+    scores[np.abs(a - b) == 6] = 0.7
+    return scores
+
+
+def element_scores(a, b):
+    """
+    Score five elements pairs: 相生 over 比和 over 相剋
+
+    Args:
+        a, b (numpy.ndarray): Element indices, broadcast against each other
+
+    Returns:
+        numpy.ndarray: Scores between 0 and 1
+    """
+    step = (b - a) % 5
+    scores = np.full(np.broadcast(a, b).shape, 0.3)
+    scores[step == 0] = 0.7
+    scores[(step == 1) | (step == 4)] = 1.0
+    return scores
+
+
+def score_matrix(charts):
+    """
+    Score every pair of charts at once
+
+    Components with an unknown value on either side score a neutral 0.5.
+
+    Args:
+        charts (list): Chart of each person
+
+    Returns:
+        tuple: (N x N total scores from 0 to 100, dict of N x N component
+            scores from 0 to 1)
+    """
+    chinese = np.array([chart.chinese_zodiac for chart in charts])
+    western = np.array([chart.western_zodiac for chart in charts])
+    element = np.array([chart.element for chart in charts])
+    mbti = np.array([chart.mbti for chart in charts]).reshape(len(charts), 4)
+
+    def score(values, function):
+        matrix = function(values[:, None], values[None, :])
+        unknown = (values[:, None] < 0) | (values[None, :] < 0)
+        matrix[unknown] = 0.5
+        return matrix
+
+    # Agreement of each MBTI axis is +1 or -1, or 0 when a type is unknown
+    agreement = mbti[:, None, :] * mbti[None, :, :]
+    mbti_scores = 0.5 + agreement @ MBTI_AXIS_WEIGHTS / (2 * np.abs(MBTI_AXIS_WEIGHTS).sum())
+
+    components = {
+        "chinese_zodiac": score(chinese, chinese_zodiac_scores),
+        "western_zodiac": score(western, western_zodiac_scores),
+        "element": score(element, element_scores),
+        "mbti": mbti_scores,
+    }
+
+    total_weight = sum(COMPATIBILITY_WEIGHTS.values())
+    total = sum(COMPATIBILITY_WEIGHTS[name] * matrix for name, matrix in components.items())
+    return total * 100 / total_weight, components
+
+
+def rank_pairs(scores, components, k=None):
+    """
+    List the pairs of a group from best to worst
+
+    Args:
+        scores (numpy.ndarray): Total score matrix from score_matrix
+        components (dict): Component matrices from score_matrix
+        k (int): Number of pairs to return, or None for all of them
+
+    Returns:
+        list: Pair tuples holding the indices of both people
+    """
+    first, second = np.triu_indices(len(scores), k=1)
+    pair_scores = scores[first, second]
+    order = np.argsort(-pair_scores, kind="stable")[:k]
+    return [
+        Pair(int(first[i]), int(second[i]), float(pair_scores[i]),
+             {name: float(matrix[first[i], second[i]]) for name, matrix in components.items()})
+        for i in order
+    ]
+
+
+class CompatibilityAnalyzer:
+    """Scores groups of profiles and narrates selected pairs"""
+
+    def __init__(self, analyzer=None):
+        """
+        Initialize the compatibility analyzer
+
+        Args:
+            analyzer (DestinyAnalyzer): Analyzer used for narration, created
+                on first use if not given
+        """
+        self.analyzer = analyzer
+        self.logger = logging.getLogger(__name__)
+
+    def score_group(self, profiles):
+        """
+        Score every pair in a group
+
+        Args:
+            profiles (list): Profile of each person
+
+        Returns:
+            tuple: (total score matrix, component score matrices)
+        """
+        charts = [compute_chart(user_data) for user_data in profiles]
+        return score_matrix(charts)
+
+    def create_group_prefix(self, profiles):
+        """
+        Create the prompt text shared by every pair of a group
+
+        Args:
+            profiles (list): Profile of each person
+
+        Returns:
+            str: Group description and instructions
+        """
+        lines = ["請以頂尖命理大師的專業角度，為以下成員進行合盤分析。", "", "成員資料："]
+        for number, user_data in enumerate(profiles, 1):
+            chart = compute_chart(user_data)
+            element = FIVE_ELEMENTS[chart.element] if chart.element >= 0 else "未知"
+            western_element = WESTERN_ELEMENTS[chart.western_zodiac % 4] \
+                if chart.western_zodiac >= 0 else "未知"
+            lines.append(
+                f"{number}. {user_data.get('chinese_name', '')}："
+                f"{user_data.get('gender', '')}，生於 {user_data.get('birth_date', '')} "
+                f"{user_data.get('birth_time', '')}，{user_data.get('zodiac', '')}"
+                f"（{western_element}象），生肖{user_data.get('chinese_zodiac', '')}，"
+                f"年干五行屬{element}，MBTI {user_data.get('mbti', '')}"
+            )
+        lines += [
+            "",
+            "請針對指定的兩位成員，從生肖合沖、星座元素、五行生剋與人格互動四個面向解讀兩人的相處模式，",
+            "指出彼此的互補之處與潛在摩擦，並提供具體的相處與溝通建議。",
+            "回答請使用繁體中文，分段落、小標題清楚呈現。",
+            "",
+        ]
+        return "\n".join(lines)
+
+    def create_pair_prompt(self, prefix, profiles, pair):
+        """
+        Create the prompt for one pair, starting with the shared group prefix
+
+        Args:
+            prefix (str): Result of create_group_prefix
+            profiles (list): Profile of each person
+            pair (Pair): The pair to narrate
+
+        Returns:
+            str: The full prompt
+        """
+        first = profiles[pair.first].get("chinese_name", "")
+        second = profiles[pair.second].get("chinese_name", "")
+        return (f"{prefix}指定成員：{pair.first + 1}. {first} 與 {pair.second + 1}. {second}"
+                f"（綜合契合度 {pair.score:.0f} 分）\n")
+
+    def narrate_pairs(self, profiles, pairs):
+        """
+        Have the LLM narrate the given pairs
+
+        The pairs are sent one after another with a common prompt prefix, so
+        the backend only evaluates the group description once.
+
+        Args:
+            profiles (list): Profile of each person
+            pairs (list): Pair tuples to narrate
+
+        Returns:
+            list: Narration text of each pair
+
+        Raises:
+            Exception: If the API call fails
+        """
+        if self.analyzer is None:
+            from cosmic_destiny.analyzer import DestinyAnalyzer
+            self.analyzer = DestinyAnalyzer()
+
+        prefix = self.create_group_prefix(profiles)
+        narrations = []
+        for pair in pairs:
+            self.logger.info(f"Narrating pair {pair.first + 1}-{pair.second + 1}")
+            narrations.append(self.analyzer.generate(self.create_pair_prompt(prefix, profiles, pair)))
+        return narrations
+
+
+def format_matrix(profiles, scores):
+    """
+    Format the total score matrix as a text table
+
+    Args:
+        profiles (list): Profile of each person
+        scores (numpy.ndarray): Total score matrix
+
+    Returns:
+        str: The table
+    """
+    names = [user_data.get("chinese_name", "") or str(i + 1) for i, user_data in enumerate(profiles)]
+    lines = ["\t" + "\t".join(names)]
+    for i, (name, row) in enumerate(zip(names, scores)):
+        lines.append(name + "\t" + "\t".join(
+            "-" if i == j else f"{value:.0f}" for j, value in enumerate(row)))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """
+    Command line interface for compatibility analysis
+
+    Args:
+        argv (list): Arguments without the program name, or None for sys.argv
+    """
+    parser = argparse.ArgumentParser(description="CosmicDestiny 合盤分析")
+    parser.add_argument("file", help="JSON file holding a list of profiles")
+    parser.add_argument("--top", type=int, default=COMPATIBILITY_TOP_K,
+                        help="number of best pairs to narrate")
+    parser.add_argument("--pair", action="append", default=[], metavar="I-J",
+                        help="narrate this pair (1-based numbers) instead of the best ones")
+    parser.add_argument("--no-narrate", action="store_true",
+                        help="only print the score matrix")
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    with open(args.file, encoding="utf-8") as f:
+        profiles = json.load(f)
+    if len(profiles) < 2:
+        parser.error("at least two profiles are needed")
+
+    compatibility = CompatibilityAnalyzer()
+    scores, components = compatibility.score_group(profiles)
+    print(format_matrix(profiles, scores))
+
+    ranked = rank_pairs(scores, components)
+    if args.pair:
+        selected = set()
+        for text in args.pair:
+            first, _, second = text.partition("-")
+            selected.add(tuple(sorted((int(first) - 1, int(second) - 1))))
+        pairs = [pair for pair in ranked if (pair.first, pair.second) in selected]
+    else:
+        pairs = ranked[:args.top]
+
+    if args.no_narrate:
+        return
+
+    for pair, narration in zip(pairs, compatibility.narrate_pairs(profiles, pairs)):
+        first = profiles[pair.first].get("chinese_name", "")
+        second = profiles[pair.second].get("chinese_name", "")
+        print(f"\n# {first} × {second}（{pair.score:.0f} 分）\n")
+        print(narration)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,14 +14,120 @@ MODEL_SETTINGS = {
     "temperature": 0.7,
     "top_p": 0.9,
     "top_k": 40,
-    "max_tokens": 4000
+    "num_predict": 4000
 }
+MAX_CONTINUATIONS = 2               # Follow-up requests resuming a cut-off or dropped generation
+
+# Smaller models stepped down to under load, see ladder.py; OLLAMA_MODEL with
+# MODEL_SETTINGS is tier 0, and other keys of a step override MODEL_SETTINGS
+MODEL_LADDER = [
+    {"model": "deepseek-r1:7b", "num_predict": 3000},
+    {"model": "deepseek-r1:1.5b", "num_predict": 2000}
+]
+LADDER_DEPTH_DOWN = 4               # Waiting analyses at which to step down a tier
+LADDER_DEPTH_UP = 1                 # Waiting analyses at or below which to step up
+LADDER_LATENCY_DOWN = 30.0          # Average seconds to first token to step down
+LADDER_LATENCY_UP = 10.0            # Average seconds to first token to step up
+LADDER_HOLD = 60.0                  # Minimum seconds between tier changes
+LADDER_SMOOTHING = 0.3              # Weight of the newest latency in the average
+
+# Section cache settings, see sections.py
+SECTION_CACHE_ENABLED = False       # Generate readings section by section, reusing cached sections
+SECTION_CACHE_DB = "cosmic_destiny_sections.db"
+SECTION_CACHE_MAX_ENTRIES = 20000   # Sections kept; the least recently used are dropped
+SECTION_NUM_PREDICT = 1200          # num_predict limit of each generated section
+
+# Precomputed generic readings, see library.py
+LIBRARY_PATH = "reading_library"    # Library path without the .dict/.zst/.idx extension
+
+# Similar past readings, see similar.py
+SIMILAR_INDEX_PATH = "cosmic_destiny_similar"   # Index path without the .vec/.off/.json extension
+SIMILAR_TEXT_DIMS = 256             # Hash buckets of the reading text embedding
+SIMILAR_TEXT_WEIGHT = 0.3           # Share of the reading text in the similarity, 0 to 1
+SIMILAR_MIN_SCORE = 0.6             # Cosine similarity needed to show a past reading
+SIMILAR_REFERENCE = False           # Add passages of the closest past reading to the prompt
+SIMILAR_REFERENCE_CHARS = 1500      # Characters of reference passages added to the prompt
+
+# Live settings overrides, see settings.py
+SETTINGS_FILE = "cosmic_destiny.toml"   # TOML file overriding the settings above
+SETTINGS_CHECK_INTERVAL = 2.0       # Seconds between checks of the file for changes
+
+# HTTP API server settings
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+SERVER_SLOTS = 2                    # Analyses sent to the backend at the same time
+SERVER_MAX_PENDING = 100            # Queued analyses before new ones are refused
+SERVER_MAX_FINISHED = 200           # Finished analyses kept for later retrieval
+
+# Fake Ollama settings, for offline testing
+FAKE_OLLAMA_PORT = 11434            # Ollama's own port, so the app needs no changes
+FAKE_OLLAMA_LOAD_DELAY = 2.0        # Seconds to load a model that is not loaded
+FAKE_OLLAMA_FIRST_TOKEN_LATENCY = 0.5   # Seconds of prompt evaluation
+FAKE_OLLAMA_TOKENS_PER_SECOND = 30.0    # Generation speed of the fake model
+
+# Persistent job queue settings
+JOB_QUEUE_DB = "cosmic_destiny_jobs.db"
+JOB_QUEUE_CONCURRENCY = 1           # Jobs run at the same time by the queue runner
+JOB_MAX_ATTEMPTS = 3                # Attempts before a batch job is marked failed
+JOB_RETRY_DELAY = 30                # Seconds before the first retry, doubled each time
+JOB_HEARTBEAT_INTERVAL = 2          # Seconds between heartbeats of a running job
+JOB_STALE_AFTER = 30                # Seconds without heartbeat before a job is recovered
+JOB_MAX_INTERRUPTIONS = 3           # Times a job is requeued after its worker stopped, then failed
+
+# Result archive settings
+RESULT_ARCHIVE_PATH = "cosmic_destiny_results.jsonl"
+ARCHIVE_DICT_SIZE = 112640          # Bytes of the zstd dictionary of packed archives
+ARCHIVE_ZSTD_LEVEL = 19             # zstd level used when packing records
+
+# Compatibility (合盤) settings
+COMPATIBILITY_TOP_K = 3             # Best pairs narrated by the LLM
+COMPATIBILITY_WEIGHTS = {           # Weight of each component in the total score
+    "chinese_zodiac": 3,
+    "western_zodiac": 2,
+    "element": 3,
+    "mbti": 2
+}
+
+# Logging settings
+LOG_FILE = "cosmic_destiny.log"
+LOG_MAX_BYTES = 5 * 1024 * 1024     # Size at which the log file is rotated
+LOG_BACKUP_COUNT = 5                # Rotated log files kept
+LOG_JSON = False                    # Write the log file as JSON lines
+
+# Profiling settings, used with --profile or COSMIC_DESTINY_PROFILE
+PROFILE_DIR = "profiles"
+PROFILE_KEEP = 50                   # Profiled calls kept; older ones are deleted
+PROFILE_TOP_FUNCTIONS = 30          # Functions listed in each profile summary
+PROFILE_TOP_ALLOCATIONS = 20        # Allocation sites listed in each summary
+PROFILE_TRACEMALLOC_FRAMES = 1      # Stack frames kept per traced allocation
 
 # UI settings
 UI_WINDOW_WIDTH = 1000
 UI_WINDOW_HEIGHT = 700
 UI_TABS = ["個人資料輸入", "命理分析結果"]
 
+# Result rendering settings
+UI_RESULT_SECTION_CHARS = 4000      # Target size of a lazily rendered section
+UI_RESULT_INITIAL_SECTIONS = 3      # Sections rendered before first display
+UI_RESULT_LOOKAHEAD_PAGES = 1.0     # Viewport heights rendered ahead of scrolling
+UI_RESULT_MAX_SECTIONS = 12         # Sections kept rendered; those far out of view are dropped
+
+# PDF export settings
+EXPORT_PDF_RESOLUTION = 300         # Layout resolution of exported PDFs in dpi
+EXPORT_PAGE_MARGIN_MM = 15          # Page margin of exported PDFs
+EXPORT_FONT_FAMILIES = ["Microsoft JhengHei UI", "PingFang TC", "Noto Sans TC"]
+EXPORT_FONT_SIZE = 11               # Font size of batch exported PDFs in points
+EXPORT_PROCESSES = 0                # Batch export processes; 0 uses every CPU
+
+# Analysis pool settings
+UI_ANALYSIS_SLOTS = 2               # Analyses run at once; match OLLAMA_NUM_PARALLEL
+UI_CLOSE_TIMEOUT = 3.0              # Seconds closing the window waits for analyses to stop
+
+# Generation progress settings
+UI_PROGRESS_INTERVAL = 0.5          # Seconds between progress updates of the overlay
+UI_PROGRESS_WINDOW = 10.0           # Seconds of recent throughput the ETA is based on
+UI_PROGRESS_HISTORY = 20            # Recent readings whose length predicts the next
+
 # Analysis types
 FORTUNE_TYPES = [
     "紫微斗數命盤分析",
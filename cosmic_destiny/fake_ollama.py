@@ -0,0 +1,422 @@
+"""
+Stand-in for the Ollama API, for offline testing and load simulation
+
+Implements /api/generate (streaming and non-streaming), /api/tags and
+/api/ps with canned Traditional Chinese output. Model loading, prompt
+evaluation and generation speed are simulated with configurable delays, and
+failures can be injected at a given rate:
+
+    python -m cosmic_destiny.fake_ollama --port 11434 --tokens-per-second 30
+
+Point the application at it by running it on Ollama's port, or pass its URL
+to DestinyAnalyzer(api_url=...).
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cosmic_destiny.config import (OLLAMA_MODEL, FAKE_OLLAMA_PORT, FAKE_OLLAMA_LOAD_DELAY,
+                                   FAKE_OLLAMA_FIRST_TOKEN_LATENCY,
+                                   FAKE_OLLAMA_TOKENS_PER_SECOND)
+
+# Models reported by /api/tags
+FAKE_MODELS = [OLLAMA_MODEL, "deepseek-r1:7b", "deepseek-r1:1.5b"]
+
+# First element of the context returned by the fake; the last one holds the
+# position in the canned reading, so a request passing it back continues there
+CONTEXT_MARKER = 0x636F736D
+
+CANNED_READING = """## 一、命盤總論
+
+八字四柱解析顯示，日主屬木，生於冬月，水旺木浮，需以火土調候。紫微斗數命宮主星為天機，輔以左輔右弼，主聰慧機敏、善於謀劃。先天命盤五行以水木為主，火土偏弱，整體格局清秀。
+
+## 二、人格特質與性格剖析
+
+- **內在性格**：思慮周密，重視原則，對自己要求甚高。
+- **外在表現**：待人溫和有禮，初識時略顯拘謹，熟識後真誠可靠。
+- **決策風格**：習慣蒐集充分資訊後再下判斷，偶有猶豫不決之時。
+
+## 三、人生全程發展軌跡
+
+成長期求學順遂，貴人多為長輩師長。成年早期事業起步穩健但步調較慢，三十五歲前後迎來第一個事業高峰。四十五歲左右為重要轉折，宜把握時機調整方向。
+
+## 四、專項深度分析
+
+- **事業**：適合需要長期規劃與專業知識的工作，如研究、顧問或管理。
+- **財運**：正財穩定，偏財宜守不宜攻，中年後累積漸豐。
+- **感情**：重視精神契合，晚婚較為有利，伴侶宜選性格開朗者。
+- **健康**：留意肝膽與睡眠品質，作息規律為養生之本。
+- **人際**：朋友不在多而在精，與長輩及同業前輩緣分深厚。
+
+## 五、命理衝突與人生挑戰
+
+命盤水旺而火弱，容易思慮過多、行動遲緩。人際上偶因過於直言而生誤會，宜多以柔克剛。
+
+## 六、開運化解建議
+
+> 多接觸紅色與黃色以補火土之氣，居家與辦公宜朝南。可配戴紅瑪瑙或黃水晶，並多從事戶外運動，平衡五行能量。
+
+整體而言，命主先天條件良好，只要掌握時機、穩健前行，必能開創圓滿人生。
+"""
+
+
+def tokenize(text):
+    """
+    Split text into fake tokens of about the size Ollama produces
+
+    Args:
+        text (str): Text to split
+
+    Returns:
+        list: Pieces of two characters
+    """
+    return [text[i:i + 2] for i in range(0, len(text), 2)]
+
+
+CANNED_TOKENS = tokenize(CANNED_READING)
+
+
+def timestamp():
+    """
+    Get the current time in Ollama's format
+
+    Returns:
+        str: ISO 8601 time in UTC
+    """
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class FakeOllama:
+    """Simulated Ollama backend served over HTTP"""
+
+    def __init__(self, models=None, load_delay=FAKE_OLLAMA_LOAD_DELAY,
+                 first_token_latency=FAKE_OLLAMA_FIRST_TOKEN_LATENCY,
+                 tokens_per_second=FAKE_OLLAMA_TOKENS_PER_SECOND, failure_rate=0.0,
+                 failure_mode="http", slots=1, keep_alive=300, seed=None):
+        """
+        Initialize the backend
+
+        Args:
+            models (list): Model names to offer, default FAKE_MODELS
+            load_delay (float): Seconds to load a model that is not loaded
+            first_token_latency (float): Seconds of prompt evaluation
+            tokens_per_second (float): Generation speed
+            failure_rate (float): Fraction of requests that fail
+            failure_mode (str): "http" fails with a 500 before generating,
+                "stream" fails halfway through the output, "drop" closes the
+                connection halfway without a final response
+            slots (int): Requests generated at the same time, like
+                OLLAMA_NUM_PARALLEL; others wait
+            keep_alive (float): Seconds a model stays loaded after use
+            seed (int): Random seed for reproducible failure injection
+        """
+        self.models = list(models or FAKE_MODELS)
+        self.load_delay = load_delay
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self.failure_mode = failure_mode
+        self.keep_alive = keep_alive
+        self.random = random.Random(seed)
+        self.logger = logging.getLogger(__name__)
+
+        self.slots = threading.Semaphore(slots)
+        self.load_lock = threading.Lock()
+        self.loaded = {}
+        self.requests = 0
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self):
+        """URL of the generate endpoint, for DestinyAnalyzer(api_url=...)"""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/generate"
+
+    def start(self, host="127.0.0.1", port=0):
+        """
+        Start serving on a background thread
+
+        Args:
+            host (str): Interface to bind to
+            port (int): Port to listen on, 0 for any free port
+
+        Returns:
+            tuple: The (host, port) actually bound
+        """
+        self.server = ThreadingHTTPServer((host, port), FakeOllamaHandler)
+        self.server.daemon_threads = True
+        self.server.backend = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.logger.info(f"Fake Ollama listening on {self.url}")
+        return self.server.server_address[:2]
+
+    def stop(self):
+        """Stop serving"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def load_model(self, model):
+        """
+        Simulate loading a model if it is not loaded yet
+
+        Args:
+            model (str): The model name
+
+        Returns:
+            float: Seconds spent loading
+        """
+        with self.load_lock:
+            now = time.time()
+            if self.loaded.get(model, 0) > now:
+                self.loaded[model] = now + self.keep_alive
+                return 0.0
+            time.sleep(self.load_delay)
+            self.loaded[model] = time.time() + self.keep_alive
+            return self.load_delay
+
+    def should_fail(self):
+        """
+        Decide whether to inject a failure into a request
+
+        Returns:
+            bool: Whether this request fails
+        """
+        self.requests += 1
+        return self.failure_rate > 0 and self.random.random() < self.failure_rate
+
+    def tags(self):
+        """
+        Describe the available models
+
+        Returns:
+            dict: Response of /api/tags
+        """
+        return {"models": [
+            {
+                "name": model,
+                "model": model,
+                "modified_at": timestamp(),
+                "size": 1_000_000_000,
+                "digest": hashlib.sha256(model.encode("utf-8")).hexdigest(),
+                "details": {"format": "gguf", "family": "fake"},
+            }
+            for model in self.models
+        ]}
+
+    def ps(self):
+        """
+        Describe the loaded models
+
+        Returns:
+            dict: Response of /api/ps
+        """
+        now = time.time()
+        return {"models": [
+            {
+                "name": model,
+                "model": model,
+                "size": 1_000_000_000,
+                "size_vram": 1_000_000_000,
+                "expires_at": datetime.fromtimestamp(expires_at, timezone.utc).isoformat(),
+            }
+            for model, expires_at in self.loaded.items() if expires_at > now
+        ]}
+
+    def generate(self, request):
+        """
+        Produce the responses of one generate request
+
+        Args:
+            request (dict): Decoded request body
+
+        Yields:
+            dict: Response objects; the last one has done set, or error set
+                when a failure is injected mid-stream
+        """
+        start_time = time.perf_counter()
+        model = request.get("model")
+        prompt = request.get("prompt", "")
+        options = request.get("options") or {}
+        fail = self.should_fail() and self.failure_mode in ("stream", "drop")
+
+        with self.slots:
+            load_duration = self.load_model(model)
+            time.sleep(self.first_token_latency)
+            prompt_eval_duration = self.first_token_latency
+
+            # Continue where a returned context left off
+            context = request.get("context") or []
+            position = context[-1] if len(context) >= 2 and context[0] == CONTEXT_MARKER else 0
+            tokens = CANNED_TOKENS[position:]
+
+            num_predict = options.get("num_predict", -1)
+            done_reason = "stop"
+            if num_predict is not None and 0 < num_predict < len(tokens):
+                tokens = tokens[:num_predict]
+                done_reason = "length"
+
+            eval_start = time.perf_counter()
+            for index, token in enumerate(tokens):
+                if fail and index == len(tokens) // 2:
+                    if self.failure_mode == "stream":
+                        yield {"error": "fake Ollama injected failure"}
+                    return
+                if self.tokens_per_second > 0:
+                    time.sleep(1 / self.tokens_per_second)
+                yield {"model": model, "created_at": timestamp(), "response": token, "done": False}
+            eval_duration = time.perf_counter() - eval_start
+
+        yield {
+            "model": model,
+            "created_at": timestamp(),
+            "response": "",
+            "done": True,
+            "done_reason": done_reason,
+            "context": [CONTEXT_MARKER, position + len(tokens)],
+            "total_duration": int((time.perf_counter() - start_time) * 1e9),
+            "load_duration": int(load_duration * 1e9),
+            "prompt_eval_count": max(1, len(prompt) // 2),
+            "prompt_eval_duration": int(prompt_eval_duration * 1e9),
+            "eval_count": len(tokens),
+            "eval_duration": int(eval_duration * 1e9),
+        }
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """HTTP handler routing requests to the FakeOllama on its server"""
+
+    # Streams end when the connection closes, like a chunked Ollama response
+    protocol_version = "HTTP/1.0"
+
+    def log_message(self, format, *args):
+        """Send request logs to logging instead of stderr"""
+        logging.getLogger(__name__).debug(format % args)
+
+    def send_json(self, status, data):
+        """
+        Send a complete JSON response
+
+        Args:
+            status (int): HTTP status code
+            data (dict): Response body
+        """
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        """Serve /api/tags and /api/ps"""
+        backend = self.server.backend
+        if self.path == "/api/tags":
+            self.send_json(200, backend.tags())
+        elif self.path == "/api/ps":
+            self.send_json(200, backend.ps())
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        """Serve /api/generate"""
+        backend = self.server.backend
+        if self.path != "/api/generate":
+            self.send_json(404, {"error": "not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length).decode("utf-8"))
+        except (ValueError, UnicodeDecodeError):
+            self.send_json(400, {"error": "invalid JSON body"})
+            return
+
+        if request.get("model") not in backend.models:
+            self.send_json(404, {"error": f"model '{request.get('model')}' not found"})
+            return
+
+        stream = request.get("stream", True)
+        if backend.failure_mode == "http" and backend.should_fail():
+            self.send_json(500, {"error": "fake Ollama injected failure"})
+            return
+
+        if not stream:
+            text = []
+            for response in backend.generate(request):
+                if "error" in response:
+                    self.send_json(500, response)
+                    return
+                text.append(response["response"])
+            if not response.get("done"):
+                # Dropped halfway; close without a response
+                return
+            response["response"] = "".join(text)
+            self.send_json(200, response)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            for response in backend.generate(request):
+                self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away; stop generating for it
+            pass
+
+
+def main(argv=None):
+    """
+    Command line entry point for the fake backend
+
+    Args:
+        argv (list): Arguments without the program name, or None for sys.argv
+    """
+    parser = argparse.ArgumentParser(description="CosmicDestiny 模擬 Ollama 服務")
+    parser.add_argument("--host", default="127.0.0.1", help="address to bind to")
+    parser.add_argument("--port", type=int, default=FAKE_OLLAMA_PORT, help="port to listen on")
+    parser.add_argument("--load-delay", type=float, default=FAKE_OLLAMA_LOAD_DELAY,
+                        help="seconds to load a model")
+    parser.add_argument("--first-token-latency", type=float,
+                        default=FAKE_OLLAMA_FIRST_TOKEN_LATENCY,
+                        help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=FAKE_OLLAMA_TOKENS_PER_SECOND,
+                        help="generation speed, 0 for no delay")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="fraction of requests that fail")
+    parser.add_argument("--failure-mode", choices=["http", "stream", "drop"], default="http",
+                        help="fail with HTTP 500 up front, halfway through the stream, "
+                             "or by closing the connection halfway")
+    parser.add_argument("--slots", type=int, default=1,
+                        help="requests generated at once, like OLLAMA_NUM_PARALLEL")
+    parser.add_argument("--model", action="append", default=None,
+                        help="model name to offer; repeat for several")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for failures")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    backend = FakeOllama(args.model, args.load_delay, args.first_token_latency,
+                         args.tokens_per_second, args.failure_rate, args.failure_mode,
+                         args.slots, seed=args.seed)
+    backend.start(args.host, args.port)
+    try:
+        backend.thread.join()
+    except KeyboardInterrupt:
+        backend.stop()
+
+
+if __name__ == "__main__":
+    main()
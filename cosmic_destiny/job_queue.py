@@ -0,0 +1,747 @@
+"""
+Persistent priority job queue for analyses
+
+Jobs are stored in SQLite, so queued, running and finished analyses survive
+the application closing or crashing. Interactive requests from the GUI use
+a higher priority than batch jobs and are always claimed first.
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import sqlite3
+import statistics
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from cosmic_destiny.log import log_context, setup_logging
+from cosmic_destiny.config import (JOB_QUEUE_DB, JOB_QUEUE_CONCURRENCY, JOB_MAX_ATTEMPTS,
+                                   JOB_RETRY_DELAY, JOB_HEARTBEAT_INTERVAL, JOB_STALE_AFTER,
+                                   JOB_MAX_INTERRUPTIONS)
+
+# Job priorities; higher values are claimed first
+PRIORITY_INTERACTIVE = 100
+PRIORITY_BATCH = 0
+
+# Job states
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+FINISHED_STATUSES = (STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    source TEXT NOT NULL,
+    user_data TEXT NOT NULL,
+    result TEXT NOT NULL DEFAULT '',
+    metadata TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    interruptions INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    delivered INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL,
+    next_attempt_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim_order
+    ON jobs (status, priority DESC, created_at);
+"""
+
+
+def make_owner_id():
+    """
+    Create an id identifying the process and thread running a job
+
+    Returns:
+        str: Owner id
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class JobQueue:
+    """SQLite-backed queue of analysis jobs"""
+
+    def __init__(self, path=JOB_QUEUE_DB):
+        """
+        Open the queue, creating the database if needed
+
+        Args:
+            path (str): Path of the SQLite database file
+        """
+        self.path = path
+        self.logger = logging.getLogger(__name__)
+
+        with self.connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+
+            # Databases created before results carried metadata
+            columns = [row["name"] for row in connection.execute("PRAGMA table_info(jobs)")]
+            if "metadata" not in columns:
+                connection.execute("ALTER TABLE jobs ADD COLUMN metadata TEXT")
+            # and before interruptions were counted
+            if "interruptions" not in columns:
+                connection.execute(
+                    "ALTER TABLE jobs ADD COLUMN interruptions INTEGER NOT NULL DEFAULT 0")
+
+    @contextmanager
+    def connect(self):
+        """
+        Open a connection for one operation
+
+        A connection per operation keeps the queue safe to use from any
+        thread and from several processes at once.
+
+        Yields:
+            sqlite3.Connection: Connection in autocommit mode
+        """
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    @staticmethod
+    def row_to_job(row):
+        """
+        Convert a database row to a job dictionary
+
+        Args:
+            row (sqlite3.Row): Row of the jobs table
+
+        Returns:
+            dict: The job, with user_data and metadata decoded
+        """
+        if row is None:
+            return None
+        job = dict(row)
+        job["user_data"] = json.loads(job["user_data"])
+        job["metadata"] = json.loads(job["metadata"]) if job["metadata"] else {}
+        job["delivered"] = bool(job["delivered"])
+        return job
+
+    def submit(self, user_data, priority=PRIORITY_BATCH, source="batch",
+               max_attempts=JOB_MAX_ATTEMPTS, metadata=None):
+        """
+        Add a job to the queue
+
+        Args:
+            user_data (dict): Dictionary containing all user information
+            priority (int): Claim priority, higher first
+            source (str): Where the job came from, e.g. "gui" or "batch"
+            max_attempts (int): Attempts before the job is marked failed
+            metadata (dict): Initial metadata, such as the time spent
+                before submission, kept through to the result
+
+        Returns:
+            str: The job id
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self.connect() as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, priority, status, source, user_data, metadata, "
+                "max_attempts, created_at, updated_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, priority, STATUS_QUEUED, source,
+                 json.dumps(user_data, ensure_ascii=False),
+                 json.dumps(metadata or {}, ensure_ascii=False), max_attempts, now, now, now))
+        self.logger.info(f"Queued job {job_id} ({source}, priority {priority})")
+        return job_id
+
+    def claim(self, owner, job_id=None):
+        """
+        Atomically take a queued job for running
+
+        Args:
+            owner (str): Id of the claiming worker
+            job_id (str): Specific job to claim, or None for the next job by
+                priority and age
+
+        Returns:
+            dict: The claimed job, or None if nothing could be claimed
+        """
+        now = time.time()
+        with self.connect() as connection:
+            # Take the write lock before reading so two workers never claim
+            # the same job
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                if job_id is None:
+                    row = connection.execute(
+                        "SELECT id FROM jobs WHERE status = ? AND next_attempt_at <= ? "
+                        "ORDER BY priority DESC, created_at LIMIT 1",
+                        (STATUS_QUEUED, now)).fetchone()
+                else:
+                    row = connection.execute(
+                        "SELECT id FROM jobs WHERE id = ? AND status = ?",
+                        (job_id, STATUS_QUEUED)).fetchone()
+
+                if row is None:
+                    connection.execute("COMMIT")
+                    return None
+
+                connection.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, attempts = attempts + 1, "
+                    "result = '', error = NULL, started_at = ?, heartbeat_at = ?, "
+                    "updated_at = ? WHERE id = ?",
+                    (STATUS_RUNNING, owner, now, now, now, row["id"]))
+                job = connection.execute("SELECT * FROM jobs WHERE id = ?",
+                                         (row["id"],)).fetchone()
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+        return self.row_to_job(job)
+
+    def heartbeat(self, job_id, owner, partial=None):
+        """
+        Record that a running job is still alive
+
+        Args:
+            job_id (str): The job id
+            owner (str): Id of the worker running the job
+            partial (str): Text generated so far, or None to leave it unchanged
+
+        Returns:
+            bool: False if the job is no longer owned by this worker
+        """
+        now = time.time()
+        with self.connect() as connection:
+            if partial is None:
+                cursor = connection.execute(
+                    "UPDATE jobs SET heartbeat_at = ?, updated_at = ? "
+                    "WHERE id = ? AND owner = ? AND status = ?",
+                    (now, now, job_id, owner, STATUS_RUNNING))
+            else:
+                cursor = connection.execute(
+                    "UPDATE jobs SET heartbeat_at = ?, updated_at = ?, result = ? "
+                    "WHERE id = ? AND owner = ? AND status = ?",
+                    (now, now, partial, job_id, owner, STATUS_RUNNING))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, owner, result, metadata=None):
+        """
+        Mark a running job as done
+
+        Args:
+            job_id (str): The job id
+            owner (str): Id of the worker running the job
+            result (str): The analysis result
+            metadata (dict): Model, settings and metrics of the generation
+
+        Returns:
+            bool: False if the job was cancelled or taken over meanwhile
+        """
+        now = time.time()
+        with self.connect() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, metadata = ?, finished_at = ?, "
+                "updated_at = ? WHERE id = ? AND owner = ? AND status = ?",
+                (STATUS_DONE, result, json.dumps(metadata or {}, ensure_ascii=False),
+                 now, now, job_id, owner, STATUS_RUNNING))
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, owner, error):
+        """
+        Record a failed attempt, requeueing the job while attempts remain
+
+        Retries are delayed exponentially, starting at JOB_RETRY_DELAY.
+
+        Args:
+            job_id (str): The job id
+            owner (str): Id of the worker running the job
+            error (str): Description of the failure
+
+        Returns:
+            bool: True if the job will be retried
+        """
+        now = time.time()
+        with self.connect() as connection:
+            row = connection.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ?",
+                                     (job_id,)).fetchone()
+            if row is None:
+                return False
+
+            # A job cancelled or taken over meanwhile is left as it is
+            retry = row["attempts"] < row["max_attempts"]
+            if retry:
+                delay = JOB_RETRY_DELAY * (2 ** (row["attempts"] - 1))
+                cursor = connection.execute(
+                    "UPDATE jobs SET status = ?, error = ?, owner = NULL, "
+                    "next_attempt_at = ?, updated_at = ? WHERE id = ? AND owner = ? AND status = ?",
+                    (STATUS_QUEUED, error, now + delay, now, job_id, owner, STATUS_RUNNING))
+            else:
+                cursor = connection.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ?, updated_at = ? "
+                    "WHERE id = ? AND owner = ? AND status = ?",
+                    (STATUS_FAILED, error, now, now, job_id, owner, STATUS_RUNNING))
+        return retry and cursor.rowcount == 1
+
+    def release(self, job_id, owner):
+        """
+        Hand a running job back to the queue without counting the attempt
+
+        Used when a worker shuts down in the middle of a job, so the job is
+        resumed right away by the next worker instead of waiting to go stale.
+        The interruption is counted, see requeue_interrupted.
+
+        Args:
+            job_id (str): The job id
+            owner (str): Id of the worker running the job
+        """
+        self.requeue_interrupted("id = ? AND owner = ?", (job_id, owner))
+
+    def requeue_interrupted(self, condition, parameters):
+        """
+        Requeue running jobs whose worker stopped, failing repeat offenders
+
+        An interruption is not counted against max_attempts, since it is
+        usually not the job's fault. A job that keeps taking its worker down
+        would then be requeued forever, so after JOB_MAX_INTERRUPTIONS
+        interruptions it is marked failed instead.
+
+        Args:
+            condition (str): SQL condition selecting the running jobs
+            parameters (tuple): Parameters of the condition
+
+        Returns:
+            tuple: (jobs requeued, jobs failed)
+        """
+        now = time.time()
+        with self.connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                failed = connection.execute(
+                    "UPDATE jobs SET status = ?, owner = NULL, error = ?, finished_at = ?, "
+                    f"updated_at = ? WHERE status = ? AND interruptions >= ? AND {condition}",
+                    (STATUS_FAILED, "分析多次中斷，已停止重試", now, now, STATUS_RUNNING,
+                     JOB_MAX_INTERRUPTIONS) + parameters).rowcount
+                requeued = connection.execute(
+                    "UPDATE jobs SET status = ?, owner = NULL, attempts = attempts - 1, "
+                    "interruptions = interruptions + 1, next_attempt_at = ?, updated_at = ? "
+                    f"WHERE status = ? AND {condition}",
+                    (STATUS_QUEUED, now, now, STATUS_RUNNING) + parameters).rowcount
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        return requeued, failed
+
+    def cancel(self, job_id):
+        """
+        Cancel a job that has not finished
+
+        A running job is only marked cancelled; its worker notices on the
+        next heartbeat and stops.
+
+        Args:
+            job_id (str): The job id
+        """
+        now = time.time()
+        with self.connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, updated_at = ? "
+                "WHERE id = ? AND status IN (?, ?)",
+                (STATUS_CANCELLED, now, now, job_id, STATUS_QUEUED, STATUS_RUNNING))
+
+    def update_spans(self, job_id, durations):
+        """
+        Add stage timings measured after a job finished, e.g. while displaying it
+
+        Args:
+            job_id (str): The job id
+            durations (dict): Seconds per stage, replacing earlier values
+        """
+        with self.connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute("SELECT metadata FROM jobs WHERE id = ?",
+                                         (job_id,)).fetchone()
+                if row is not None:
+                    metadata = json.loads(row["metadata"]) if row["metadata"] else {}
+                    metadata.setdefault("spans", {}).update(durations)
+                    connection.execute("UPDATE jobs SET metadata = ? WHERE id = ?",
+                                       (json.dumps(metadata, ensure_ascii=False), job_id))
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+    def mark_delivered(self, job_id):
+        """
+        Record that a finished job's result has been shown to the user
+
+        Args:
+            job_id (str): The job id
+        """
+        with self.connect() as connection:
+            connection.execute("UPDATE jobs SET delivered = 1 WHERE id = ?", (job_id,))
+
+    def recover_stale(self, stale_after=JOB_STALE_AFTER):
+        """
+        Requeue running jobs whose worker stopped sending heartbeats
+
+        Called at startup to pick up jobs interrupted by a crash or by the
+        application closing. The interruption is counted separately from the
+        attempts, see requeue_interrupted.
+
+        Args:
+            stale_after (float): Seconds without a heartbeat before a job
+                counts as abandoned
+
+        Returns:
+            int: Number of jobs recovered
+        """
+        requeued, failed = self.requeue_interrupted("heartbeat_at < ?",
+                                                    (time.time() - stale_after,))
+        if requeued:
+            self.logger.info(f"Requeued {requeued} interrupted job(s)")
+        if failed:
+            self.logger.warning(f"Failed {failed} job(s) interrupted too many times")
+        return requeued
+
+    def get(self, job_id):
+        """
+        Look up a job
+
+        Args:
+            job_id (str): The job id
+
+        Returns:
+            dict: The job, or None if it does not exist
+        """
+        with self.connect() as connection:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self.row_to_job(row)
+
+    def typical_token_count(self, limit):
+        """
+        Get the usual length of a reading from recent finished jobs
+
+        Args:
+            limit (int): Number of recent jobs to consider
+
+        Returns:
+            int: Median number of generated tokens, or None without data
+        """
+        with self.connect() as connection:
+            rows = connection.execute(
+                "SELECT json_extract(metadata, '$.metrics.eval_count') FROM jobs "
+                "WHERE status = ? ORDER BY finished_at DESC LIMIT ?",
+                (STATUS_DONE, limit)).fetchall()
+        counts = [row[0] for row in rows if row[0]]
+        return int(statistics.median(counts)) if counts else None
+
+    def list_jobs(self, status=None, source=None, undelivered=False, limit=100):
+        """
+        List jobs, newest first
+
+        Args:
+            status (str): Only jobs in this state, or None for all
+            source (str): Only jobs from this source, or None for all
+            undelivered (bool): Only jobs whose result was not yet shown
+            limit (int): Maximum number of jobs returned
+
+        Returns:
+            list: Job dictionaries
+        """
+        conditions = []
+        params = []
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if source is not None:
+            conditions.append("source = ?")
+            params.append(source)
+        if undelivered:
+            conditions.append("delivered = 0")
+
+        query = "SELECT * FROM jobs"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+
+        with self.connect() as connection:
+            rows = connection.execute(query, params).fetchall()
+        return [self.row_to_job(row) for row in rows]
+
+    def stats(self):
+        """
+        Count jobs per state
+
+        Returns:
+            dict: Mapping of status to job count
+        """
+        with self.connect() as connection:
+            rows = connection.execute(
+                "SELECT status, COUNT(*) AS count FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (STATUS_QUEUED, STATUS_RUNNING) + FINISHED_STATUSES}
+        counts.update({row["status"]: row["count"] for row in rows})
+        return counts
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once it has been cancelled or taken over"""
+
+
+class JobInterrupted(Exception):
+    """Raised inside a running job when its worker is shutting down"""
+
+
+def execute_job(job_queue, job, analyzer, owner, on_chunk=None, stop_event=None, archive=None):
+    """
+    Run a claimed job to completion
+
+    A heartbeat thread keeps the job alive in the database, including while
+    the backend is still loading the model, and saves the text generated so
+    far so other processes can follow the job.
+
+    Args:
+        job_queue (JobQueue): The queue the job was claimed from
+        job (dict): The claimed job
+        analyzer (DestinyAnalyzer): Analyzer used to generate the reading
+        owner (str): Id of the worker that claimed the job
+        on_chunk (callable): Called with each piece of generated text
+        stop_event (threading.Event): Set to hand the job back to the queue
+            and stop at the next piece of text
+        archive (ResultArchive): Archive the finished result is appended to
+
+    Returns:
+        str: The analysis result
+
+    Raises:
+        JobCancelled: If the job was cancelled while running
+        JobInterrupted: If stop_event was set; the job is queued again
+        Exception: If the analysis failed; the failure is already recorded
+    """
+    logger = logging.getLogger(__name__)
+    chunks = []
+    stop = threading.Event()
+    cancelled = threading.Event()
+
+    def send_heartbeats():
+        while not stop.wait(JOB_HEARTBEAT_INTERVAL):
+            if not job_queue.heartbeat(job["id"], owner, "".join(chunks)):
+                cancelled.set()
+                return
+
+    # Tag everything logged while running with the job id
+    with log_context(job["id"]):
+        heartbeat_thread = threading.Thread(target=send_heartbeats, daemon=True)
+        heartbeat_thread.start()
+
+        try:
+            # Start from the submitted metadata, so earlier stage timings are kept
+            stats = dict(job["metadata"])
+            for text in analyzer.stream_analysis(job["user_data"], stats=stats):
+                if cancelled.is_set():
+                    raise JobCancelled(job["id"])
+                if stop_event is not None and stop_event.is_set():
+                    job_queue.release(job["id"], owner)
+                    raise JobInterrupted(job["id"])
+                chunks.append(text)
+                if on_chunk is not None:
+                    on_chunk(text)
+
+            result = "".join(chunks)
+            if not job_queue.complete(job["id"], owner, result, stats):
+                raise JobCancelled(job["id"])
+            logger.info(f"Job {job['id']} finished",
+                        extra={"spans": stats.get("spans", {}), "metrics": stats.get("metrics", {}),
+                               "tier": stats.get("tier")})
+            if archive is not None:
+                archive.append_job(job_queue.get(job["id"]))
+            return result
+
+        except JobCancelled:
+            logger.info(f"Job {job['id']} was cancelled")
+            raise
+
+        except JobInterrupted:
+            logger.info(f"Job {job['id']} was interrupted and requeued")
+            raise
+
+        except Exception as e:
+            retry = job_queue.fail(job["id"], owner, str(e))
+            logger.error(f"Job {job['id']} failed{' (will retry)' if retry else ''}: {str(e)}")
+            raise
+
+        finally:
+            stop.set()
+            heartbeat_thread.join()
+
+
+class JobRunner:
+    """Worker loop draining the queue with a fixed number of threads"""
+
+    def __init__(self, job_queue, analyzer, concurrency=JOB_QUEUE_CONCURRENCY,
+                 poll_interval=1.0, archive=None):
+        """
+        Initialize the runner
+
+        Args:
+            job_queue (JobQueue): The queue to drain
+            analyzer (DestinyAnalyzer): Analyzer used to generate readings
+            concurrency (int): Number of jobs run at the same time
+            poll_interval (float): Seconds between checks of an empty queue
+            archive (ResultArchive): Archive finished results are appended to
+        """
+        self.job_queue = job_queue
+        self.analyzer = analyzer
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.archive = archive
+        self.logger = logging.getLogger(__name__)
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    def start(self):
+        """Start the worker threads"""
+        self.job_queue.recover_stale()
+        for index in range(self.concurrency):
+            thread = threading.Thread(target=self.work, name=f"job-runner-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self, wait=True):
+        """
+        Stop claiming new jobs
+
+        Running jobs are handed back to the queue at their next piece of
+        generated text.
+
+        Args:
+            wait (bool): Whether to wait for running jobs to stop
+        """
+        self.stop_event.set()
+        if wait:
+            for thread in self.threads:
+                thread.join()
+
+    def work(self):
+        """Claim and run jobs until stopped"""
+        owner = make_owner_id()
+        while not self.stop_event.is_set():
+            job = self.job_queue.claim(owner)
+            if job is None:
+                self.stop_event.wait(self.poll_interval)
+                continue
+
+            self.logger.info(f"Running job {job['id']}")
+            try:
+                execute_job(self.job_queue, job, self.analyzer, owner,
+                            stop_event=self.stop_event, archive=self.archive)
+            except Exception:
+                # Already recorded in the queue by execute_job
+                pass
+
+    def run_until_empty(self):
+        """Run jobs until nothing is left to claim, then stop"""
+        self.start()
+        while not self.stop_event.is_set():
+            stats = self.job_queue.stats()
+            if stats[STATUS_QUEUED] == 0 and stats[STATUS_RUNNING] == 0:
+                break
+            time.sleep(self.poll_interval)
+        self.stop()
+
+
+def main(argv=None):
+    """
+    Command line interface for the job queue
+
+    Args:
+        argv (list): Arguments without the program name, or None for sys.argv
+    """
+    parser = argparse.ArgumentParser(description="CosmicDestiny 分析工作佇列")
+    parser.add_argument("--db", default=JOB_QUEUE_DB, help="queue database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit_parser = commands.add_parser("submit", help="queue profiles from JSON files")
+    submit_parser.add_argument("files", nargs="+",
+                               help="JSON files holding a profile or a list of profiles")
+    submit_parser.add_argument("--interactive", action="store_true",
+                               help="use interactive priority instead of batch")
+
+    run_parser = commands.add_parser("run", help="drain the queue")
+    run_parser.add_argument("--concurrency", type=int, default=JOB_QUEUE_CONCURRENCY)
+    run_parser.add_argument("--forever", action="store_true",
+                            help="keep waiting for new jobs instead of stopping when empty")
+
+    list_parser = commands.add_parser("list", help="list jobs")
+    list_parser.add_argument("--status", default=None)
+    list_parser.add_argument("--limit", type=int, default=50)
+
+    show_parser = commands.add_parser("show", help="print a job's result")
+    show_parser.add_argument("job_id")
+
+    cancel_parser = commands.add_parser("cancel", help="cancel a job")
+    cancel_parser.add_argument("job_id")
+
+    args = parser.parse_args(argv)
+    setup_logging()
+    job_queue = JobQueue(args.db)
+
+    if args.command == "submit":
+        priority = PRIORITY_INTERACTIVE if args.interactive else PRIORITY_BATCH
+        for path in args.files:
+            with open(path, encoding="utf-8") as f:
+                profiles = json.load(f)
+            if isinstance(profiles, dict):
+                profiles = [profiles]
+            for user_data in profiles:
+                print(job_queue.submit(user_data, priority=priority))
+
+    elif args.command == "run":
+        from cosmic_destiny.analyzer import DestinyAnalyzer
+        from cosmic_destiny.archive import ResultArchive
+        runner = JobRunner(job_queue, DestinyAnalyzer(), args.concurrency,
+                           archive=ResultArchive())
+        try:
+            if args.forever:
+                runner.start()
+                while True:
+                    time.sleep(1)
+            else:
+                runner.run_until_empty()
+        except KeyboardInterrupt:
+            runner.stop(wait=False)
+
+    elif args.command == "list":
+        for job in job_queue.list_jobs(status=args.status, limit=args.limit):
+            name = job["user_data"].get("chinese_name", "")
+            print(f"{job['id']}  {job['status']:<9}  p{job['priority']:<4} "
+                  f"{job['attempts']}/{job['max_attempts']}  {job['source']:<6} {name}")
+
+    elif args.command == "show":
+        job = job_queue.get(args.job_id)
+        if job is None:
+            parser.error(f"no such job: {args.job_id}")
+        print(job["result"] if job["status"] == STATUS_DONE else json.dumps(
+            {key: job[key] for key in ("status", "error", "attempts")}, ensure_ascii=False))
+
+    elif args.command == "cancel":
+        job_queue.cancel(args.job_id)
+
+
+if __name__ == "__main__":
+    main()
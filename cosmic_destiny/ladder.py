@@ -0,0 +1,162 @@
+"""
+Load-adaptive model ladder
+
+Under load, analyses step down from the configured model to the smaller
+models of the ladder, each with its own num_predict limit:
+
+    tier 0  OLLAMA_MODEL with MODEL_SETTINGS     (e.g. deepseek-r1:14b)
+    tier 1  MODEL_LADDER[0]                      (e.g. deepseek-r1:7b)
+    tier 2  MODEL_LADDER[1]                      (e.g. deepseek-r1:1.5b)
+
+Load is judged from the number of analyses waiting for a backend slot,
+reported by whoever queues them, and from a moving average of the time to
+first token the analyzer observes. Crossing the down thresholds steps one
+tier down; falling below the lower up thresholds steps one tier up. At most
+one step is taken per LADDER_HOLD seconds, so the tier does not flap while
+load hovers around a threshold.
+"""
+
+import logging
+import threading
+import time
+
+from cosmic_destiny.config import (LADDER_DEPTH_DOWN, LADDER_DEPTH_UP, LADDER_LATENCY_DOWN,
+                                   LADDER_LATENCY_UP, LADDER_HOLD, LADDER_SMOOTHING)
+
+logger = logging.getLogger(__name__)
+
+
+def tier_settings(settings, tier):
+    """
+    Get the settings of a ladder tier
+
+    Args:
+        settings (BackendSettings): Settings of tier 0, holding the ladder
+        tier (int): The tier, 0 for the configured model
+
+    Returns:
+        BackendSettings: Settings with the tier's model and options
+    """
+    if tier == 0:
+        return settings
+    step = settings.ladder[tier - 1]
+    options = dict(settings.options)
+    options.update((key, value) for key, value in step.items() if key != "model")
+    return settings._replace(model=step["model"], options=options, tier=tier)
+
+
+class ModelLadder:
+    """Picks the ladder tier of each analysis from the observed load"""
+
+    def __init__(self, depth_down=LADDER_DEPTH_DOWN, depth_up=LADDER_DEPTH_UP,
+                 latency_down=LADDER_LATENCY_DOWN, latency_up=LADDER_LATENCY_UP,
+                 hold=LADDER_HOLD, smoothing=LADDER_SMOOTHING):
+        """
+        Start at tier 0
+
+        Args:
+            depth_down (int): Waiting analyses at which to step down
+            depth_up (int): Waiting analyses at or below which to step up
+            latency_down (float): Average seconds to first token at which to
+                step down
+            latency_up (float): Average seconds to first token at or below
+                which to step up
+            hold (float): Minimum seconds between two tier changes
+            smoothing (float): Weight of the newest latency in the average
+        """
+        self.depth_down = depth_down
+        self.depth_up = depth_up
+        self.latency_down = latency_down
+        self.latency_up = latency_up
+        self.hold = hold
+        self.smoothing = smoothing
+        self.lock = threading.Lock()
+        self.tier = 0
+        self.depth = 0
+        self.latency = None
+        self.changed_at = None
+
+    def observe_depth(self, depth):
+        """
+        Report how many analyses wait for a backend slot
+
+        Args:
+            depth (int): Number of waiting analyses
+        """
+        with self.lock:
+            self.depth = depth
+
+    def observe_latency(self, seconds):
+        """
+        Report the time to first token of a finished request
+
+        Args:
+            seconds (float): Seconds from sending the request to its first token
+        """
+        with self.lock:
+            if self.latency is None:
+                self.latency = seconds
+            else:
+                self.latency += self.smoothing * (seconds - self.latency)
+
+    def update(self, tiers, now=None):
+        """
+        Step the tier if the load calls for it and the hold time has passed
+
+        Args:
+            tiers (int): Number of tiers, including tier 0
+            now (float): monotonic time, default the current time
+
+        Returns:
+            int: The tier to use
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            # The ladder may have been shortened by a settings reload
+            tier = min(self.tier, tiers - 1)
+            if self.changed_at is None or now - self.changed_at >= self.hold:
+                latency = self.latency or 0.0
+                if tier < tiers - 1 and (self.depth >= self.depth_down
+                                         or latency >= self.latency_down):
+                    tier += 1
+                elif tier > 0 and self.depth <= self.depth_up and latency <= self.latency_up:
+                    tier -= 1
+
+            if tier != self.tier:
+                logger.info(f"Model tier {self.tier} -> {tier} (waiting {self.depth}, "
+                            f"time to first token {self.latency or 0.0:.1f} s)")
+                self.tier = tier
+                self.changed_at = now
+            return tier
+
+    def select(self, settings, now=None):
+        """
+        Get the settings of the tier a new analysis should use
+
+        Args:
+            settings (BackendSettings): Settings of tier 0, holding the ladder
+            now (float): monotonic time, default the current time
+
+        Returns:
+            BackendSettings: Settings of the chosen tier
+        """
+        return tier_settings(settings, self.update(len(settings.ladder) + 1, now))
+
+
+# Ladder of the process, shared by everything using the one backend
+_ladder = None
+_ladder_lock = threading.Lock()
+
+
+def get_ladder():
+    """
+    Get the process-wide model ladder
+
+    Returns:
+        ModelLadder: The ladder
+    """
+    global _ladder
+    with _ladder_lock:
+        if _ladder is None:
+            _ladder = ModelLadder()
+        return _ladder
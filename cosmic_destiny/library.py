@@ -0,0 +1,289 @@
+"""
+Precomputed library of generic readings
+
+Behind the personal details, a reading is driven by a handful of attributes
+with few possible values: 12 western zodiac signs x 12 Chinese zodiac signs
+x 16 MBTI types, for each fortune type and focus area. The build command
+generates one generic reading per combination offline, without names or
+birth details, and packs them into an indexed, dictionary-compressed
+library (see packed_archive.py):
+
+    python -m cosmic_destiny.library build --fortune-type 紫微斗數命盤分析 \\
+        --focus-area 人生整體命運藍圖 --workers 2
+    python -m cosmic_destiny.library stats
+
+Generated readings go to <path>.jsonl first, so an interrupted build
+resumes where it stopped; the library is repacked from that file at the end.
+The analyzer looks readings up by the profile's attributes, to show one as
+an instant preview and as the whole answer when the backend is unreachable.
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cosmic_destiny.archive import ResultArchive, make_record
+from cosmic_destiny.log import setup_logging
+from cosmic_destiny.settings import current_settings
+from cosmic_destiny.config import (LIBRARY_PATH, FORTUNE_TYPES, FOCUS_AREAS, WESTERN_ZODIACS,
+                                   CHINESE_ZODIACS, MBTI_TYPES)
+
+# Profile fields a library reading is selected by
+LIBRARY_FIELDS = ("zodiac", "chinese_zodiac", "mbti", "fortune_type", "focus_area")
+
+# Shown above a library reading served instead of a generated one
+LIBRARY_NOTE = ("> 以下為依星座、生肖與 MBTI 預先生成的通用解讀，未包含姓名與生辰等個人資料。\n\n")
+
+logger = logging.getLogger(__name__)
+
+
+def library_key(user_data):
+    """
+    Get the id of the library reading for a profile
+
+    Args:
+        user_data (dict): Dictionary containing all user information
+
+    Returns:
+        str: The attribute values joined, or None if any is missing or not
+            a string
+    """
+    values = [user_data.get(field, "") for field in LIBRARY_FIELDS]
+    if not all(value and isinstance(value, str) for value in values):
+        return None
+    return "|".join(values)
+
+
+def create_generic_prompt(attributes):
+    """
+    Create the prompt of a generic reading
+
+    Args:
+        attributes (dict): Values of the LIBRARY_FIELDS
+
+    Returns:
+        str: The prompt
+    """
+    return f"""請以頂尖命理大師的專業角度，根據以下命理特徵，進行{attributes['fortune_type']}的通用解讀，分析主題為「{attributes['focus_area']}」：
+
+- 星座：{attributes['zodiac']}
+- 生肖：{attributes['chinese_zodiac']}
+- MBTI 人格：{attributes['mbti']}
+
+這份解讀將提供給所有具有相同星座、生肖與 MBTI 的人參考，因此不要假設姓名、性別、生辰或出生地。
+
+請提供深入的分析，內容需包含：
+
+1. 命理特徵總論
+2. 人格特質與性格剖析
+3. 人生發展軌跡與關鍵時期
+4. 與「{attributes['focus_area']}」相關的專項分析
+5. 潛在挑戰
+6. 開運化解建議
+
+請以專業且通俗易懂的方式分析，基於傳統命理學與現代心理學的結合，避免籠統空泛的內容。
+
+回答請使用繁體中文，內容需分段落、小標題清楚呈現，便於閱讀理解。
+"""
+
+
+def combinations(fortune_types=None, focus_areas=None):
+    """
+    List the attribute combinations of the library
+
+    Args:
+        fortune_types (list): Fortune types to include, default all
+        focus_areas (list): Focus areas to include, default all
+
+    Yields:
+        dict: Values of the LIBRARY_FIELDS
+    """
+    for fortune_type, focus_area, zodiac, chinese_zodiac, mbti in itertools.product(
+            fortune_types or FORTUNE_TYPES, focus_areas or FOCUS_AREAS,
+            WESTERN_ZODIACS, CHINESE_ZODIACS, MBTI_TYPES):
+        yield {"zodiac": zodiac, "chinese_zodiac": chinese_zodiac, "mbti": mbti,
+               "fortune_type": fortune_type, "focus_area": focus_area}
+
+
+class ReadingLibrary:
+    """Read access to a packed library of generic readings"""
+
+    def __init__(self, path=LIBRARY_PATH):
+        """
+        Open the library if it has been built
+
+        Args:
+            path (str): Library path without the .dict/.zst/.idx extension
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.archive = None
+        if os.path.exists(path + ".idx"):
+            from cosmic_destiny.packed_archive import PackedArchive
+            try:
+                self.archive = PackedArchive(path)
+            except (OSError, ValueError) as e:
+                # Damaged, or caught halfway through being repacked
+                logger.warning(f"Reading library unavailable: {str(e)}")
+
+    @property
+    def available(self):
+        """Whether the library has been built"""
+        return self.archive is not None
+
+    def lookup(self, user_data):
+        """
+        Find the generic reading for a profile
+
+        Args:
+            user_data (dict): Dictionary containing all user information
+
+        Returns:
+            dict: The library record, or None
+        """
+        key = library_key(user_data)
+        if self.archive is None or key is None:
+            return None
+        with self.lock:
+            record = self.archive.get(key)
+        # Index keys are hashes, so make sure the record is the one asked for
+        return record if record is not None and record["id"] == key else None
+
+
+def build(analyzer, path, fortune_types=None, focus_areas=None, limit=None, workers=1):
+    """
+    Generate the missing library readings and repack the library
+
+    Args:
+        analyzer (DestinyAnalyzer): Analyzer generating the readings
+        path (str): Library path without extension
+        fortune_types (list): Fortune types to include, default all
+        focus_areas (list): Focus areas to include, default all
+        limit (int): Generate at most this many readings in this run
+        workers (int): Readings generated at the same time
+
+    Returns:
+        tuple: (readings generated, readings that failed)
+    """
+    staging = ResultArchive(path + ".jsonl")
+    done = {record["id"] for record in staging}
+    todo = [attributes for attributes in combinations(fortune_types, focus_areas)
+            if library_key(attributes) not in done]
+    if limit is not None:
+        todo = todo[:limit]
+
+    # One settings snapshot for the whole build, bypassing the model ladder
+    settings = current_settings()
+    if analyzer.api_url is not None:
+        settings = settings._replace(api_url=analyzer.api_url)
+    counts = {"generated": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def generate(attributes):
+        stats = {}
+        try:
+            text = analyzer.generate(create_generic_prompt(attributes), stats, settings)
+        except Exception as e:
+            logger.error(f"Library reading {library_key(attributes)} failed: {str(e)}")
+            with lock:
+                counts["failed"] += 1
+            return
+        staging.append(make_record(library_key(attributes), attributes, text, stats, "library"))
+        with lock:
+            counts["generated"] += 1
+            print(f"\r{counts['generated']}/{len(todo)} readings generated",
+                  end="", file=sys.stderr, flush=True)
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(generate, todo))
+    if todo:
+        print(file=sys.stderr)
+        logger.info(f"Generated {counts['generated']} library readings in "
+                    f"{time.perf_counter() - start_time:.0f} s")
+
+    pack_library(path)
+    return counts["generated"], counts["failed"]
+
+
+def pack_library(path):
+    """
+    Pack the staged readings into the indexed library
+
+    Args:
+        path (str): Library path without extension
+
+    Returns:
+        int: Number of readings in the library
+    """
+    from cosmic_destiny.packed_archive import pack
+
+    # The latest reading of each combination wins
+    records = {record["id"]: record for record in ResultArchive(path + ".jsonl")}
+    if not records:
+        return 0
+
+    # Pack next to the library and move the files over it, so a running
+    # application keeps reading its memory-mapped old files undisturbed
+    with pack(list(records.values()), path + ".tmp"):
+        pass
+    for extension in (".dict", ".zst", ".idx"):
+        os.replace(path + ".tmp" + extension, path + extension)
+    return len(records)
+
+
+def main(argv=None):
+    """
+    Command line entry point to build or inspect the library
+
+    Args:
+        argv (list): Command line arguments, default sys.argv
+    """
+    parser = argparse.ArgumentParser(description="CosmicDestiny precomputed reading library")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="generate missing readings and pack them")
+    build_parser.add_argument("--fortune-type", action="append", choices=FORTUNE_TYPES,
+                              help="fortune type to include, repeatable (default: all)")
+    build_parser.add_argument("--focus-area", action="append", choices=FOCUS_AREAS,
+                              help="focus area to include, repeatable (default: all)")
+    build_parser.add_argument("--limit", type=int, default=None,
+                              help="generate at most this many readings")
+    build_parser.add_argument("--workers", type=int, default=1,
+                              help="readings generated at once; match OLLAMA_NUM_PARALLEL")
+    build_parser.add_argument("--url", default=None, help="Ollama generate endpoint")
+
+    subparsers.add_parser("pack", help="repack the library from the generated readings")
+    subparsers.add_parser("stats", help="show the size of the library")
+    parser.add_argument("--path", default=LIBRARY_PATH, help="library path without extension")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+
+    if args.command == "build":
+        from cosmic_destiny.analyzer import DestinyAnalyzer
+        analyzer = DestinyAnalyzer(api_url=args.url)
+        total = len(list(combinations(args.fortune_type, args.focus_area)))
+        print(f"{total} combinations selected")
+        generated, failed = build(analyzer, args.path, args.fortune_type, args.focus_area,
+                                  args.limit, args.workers)
+        print(f"{generated} readings generated, {failed} failed")
+    elif args.command == "pack":
+        print(f"{pack_library(args.path)} readings packed")
+
+    library = ReadingLibrary(args.path)
+    if library.available:
+        raw, compressed, dictionary = library.archive.sizes()
+        print(f"{len(library.archive)} readings, {compressed / 1e6:.1f} MB "
+              f"({raw / 1e6:.1f} MB uncompressed, {dictionary / 1e3:.0f} kB dictionary)")
+    else:
+        print("The library has not been built")
+
+
+if __name__ == "__main__":
+    main()
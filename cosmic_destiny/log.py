@@ -0,0 +1,184 @@
+"""
+Non-blocking application logging
+
+Log calls only put records on a queue; a background listener thread writes
+them to the console and to a size-rotated log file, so neither the GUI
+thread nor the workers wait on disk I/O. The file holds plain text lines, or
+one JSON object per record for log pipelines. Records logged inside
+log_context carry the id of the analysis they belong to, and timings passed
+through `extra` are kept as fields:
+
+    with log_context(job_id):
+        logger.info("Job finished", extra={"duration_ms": 1234})
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from cosmic_destiny.config import LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_JSON
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Id of the analysis the current thread or task works on
+request_id = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through extra
+STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "request_id"}
+
+# Handler and listener installed by setup_logging
+_installed = {}
+
+
+@contextmanager
+def log_context(current_id):
+    """
+    Tag the records logged in a block with an analysis id
+
+    Args:
+        current_id (str): Id of the job or API analysis
+    """
+    token = request_id.set(current_id)
+    try:
+        yield
+    finally:
+        request_id.reset(token)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Queues records with their analysis id and pre-rendered message"""
+
+    def prepare(self, record):
+        """
+        Make a record safe to format on the listener thread
+
+        Unlike QueueHandler, the exception text is kept apart from the
+        message, so the JSON formatter can store it as its own field.
+
+        Args:
+            record (logging.LogRecord): The record
+
+        Returns:
+            logging.LogRecord: A copy holding only picklable, final values
+        """
+        record = copy.copy(record)
+        record.request_id = request_id.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class TextFormatter(logging.Formatter):
+    """The plain text format, with the analysis id when there is one"""
+
+    def formatMessage(self, record):
+        """
+        Format the line of a record, before any exception text
+
+        Args:
+            record (logging.LogRecord): The record
+
+        Returns:
+            str: The line
+        """
+        line = super().formatMessage(record)
+        current_id = getattr(record, "request_id", None)
+        return f"{line} [{current_id}]" if current_id else line
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as JSON objects, one per line"""
+
+    def format(self, record):
+        """
+        Format a record as JSON
+
+        Args:
+            record (logging.LogRecord): The record
+
+        Returns:
+            str: JSON with time, level, logger, message, thread, the
+                analysis id and any extra fields
+        """
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if getattr(record, "request_id", None):
+            data["request_id"] = record.request_id
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exception"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRIBUTES:
+                data[key] = value
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def setup_logging(level=logging.INFO, path=LOG_FILE, json_lines=LOG_JSON, console=True):
+    """
+    Route all logging through a queue to a background writer thread
+
+    Calling it again replaces the earlier setup.
+
+    Args:
+        level (int): Level of the root logger
+        path (str): Log file, rotated by size, or None for no file
+        json_lines (bool): Write the file as JSON lines instead of text
+        console (bool): Also write text lines to stderr
+
+    Returns:
+        logging.handlers.QueueListener: The started listener
+    """
+    shutdown_logging()
+
+    handlers = []
+    if path:
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter() if json_lines else TextFormatter(LOG_FORMAT))
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(TextFormatter(LOG_FORMAT))
+        handlers.append(console_handler)
+
+    records = queue.SimpleQueue()
+    queue_handler = ContextQueueHandler(records)
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(queue_handler)
+    _installed.update(handler=queue_handler, listener=listener)
+    return listener
+
+
+def shutdown_logging():
+    """Write out the queued records and remove the handler of setup_logging"""
+    if not _installed:
+        return
+    logging.getLogger().removeHandler(_installed["handler"])
+    _installed["listener"].stop()
+    for handler in _installed["listener"].handlers:
+        handler.close()
+    _installed.clear()
+
+
+# Flush queued records when the process exits
+atexit.register(shutdown_logging)
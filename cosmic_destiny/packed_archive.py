@@ -0,0 +1,407 @@
+"""
+Compact result archive with per-record zstd compression
+
+A packed archive stores the same records as the JSON lines archive in three
+files next to each other:
+
+    <path>.dict   zstd dictionary trained on past readings
+    <path>.zst    records, each compressed on its own with the dictionary
+    <path>.idx    fixed-size index entries: record id, offset and sizes
+
+Because every record is a separate frame and every index entry has the same
+size, any record is found with one index lookup and decompressed straight
+from the memory-mapped data file without touching its neighbours.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import random
+import statistics
+import struct
+import threading
+import time
+
+import zstandard
+
+from cosmic_destiny.log import setup_logging
+from cosmic_destiny.config import ARCHIVE_DICT_SIZE, ARCHIVE_ZSTD_LEVEL, RESULT_ARCHIVE_PATH
+
+# Index header: magic, format version, dictionary id
+INDEX_HEADER = struct.Struct("<4sII")
+INDEX_MAGIC = b"CDIX"
+INDEX_VERSION = 1
+
+# Index entry: record key, data offset, compressed size, uncompressed size
+INDEX_ENTRY = struct.Struct("<16sQII")
+
+
+def record_key(record_id):
+    """
+    Get the fixed-size index key of a record id
+
+    Args:
+        record_id (str): Id of the analysis
+
+    Returns:
+        bytes: 16 byte key; hex uuids are stored as is, other ids hashed
+    """
+    try:
+        key = bytes.fromhex(record_id)
+        if len(key) == 16:
+            return key
+    except ValueError:
+        pass
+    return hashlib.md5(record_id.encode("utf-8")).digest()
+
+
+def encode_record(record):
+    """
+    Serialize a record before compression
+
+    Args:
+        record (dict): Archive record
+
+    Returns:
+        bytes: Compact UTF-8 JSON
+    """
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def train_dictionary(records, size=ARCHIVE_DICT_SIZE):
+    """
+    Train a zstd dictionary on past records
+
+    Args:
+        records (iterable): Archive records to learn from
+        size (int): Dictionary size in bytes
+
+    Returns:
+        zstandard.ZstdCompressionDict: The trained dictionary
+    """
+    samples = [encode_record(record) for record in records]
+    if not samples:
+        raise ValueError("cannot train a dictionary without records")
+
+    # Training needs a handful of samples; repeat a small archive to get them
+    while len(samples) < 8:
+        samples = samples * 2
+    return zstandard.train_dictionary(size, samples)
+
+
+class PackedArchive:
+    """Dictionary-compressed archive with an offset index"""
+
+    def __init__(self, path):
+        """
+        Open a packed archive
+
+        Args:
+            path (str): Archive path without the .dict/.zst/.idx extension
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+        with open(path + ".dict", "rb") as f:
+            self.dictionary = zstandard.ZstdCompressionDict(f.read())
+        self.compressor = None
+        self.decompressor = zstandard.ZstdDecompressor(dict_data=self.dictionary)
+
+        with open(path + ".idx", "rb") as f:
+            magic, version, dict_id = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"{path}.idx is not a packed archive index")
+        if dict_id != self.dictionary.dict_id():
+            raise ValueError(f"{path}.dict does not belong to this archive")
+
+        self.data_map = None
+        self.index_map = None
+        self.keys = None
+
+    @classmethod
+    def create(cls, path, dictionary):
+        """
+        Create an empty packed archive
+
+        Args:
+            path (str): Archive path without extension
+            dictionary (zstandard.ZstdCompressionDict): Trained dictionary
+
+        Returns:
+            PackedArchive: The opened archive
+        """
+        with open(path + ".dict", "wb") as f:
+            f.write(dictionary.as_bytes())
+        with open(path + ".zst", "wb"):
+            pass
+        with open(path + ".idx", "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, dictionary.dict_id()))
+        return cls(path)
+
+    def map_files(self):
+        """Memory-map the data and index files for reading"""
+        if self.index_map is not None:
+            return
+
+        with open(self.path + ".idx", "rb") as f:
+            self.index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if os.path.getsize(self.path + ".zst"):
+            with open(self.path + ".zst", "rb") as f:
+                self.data_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        """Release the memory maps; they are recreated on the next read"""
+        for mapped in (self.data_map, self.index_map):
+            if mapped is not None:
+                mapped.close()
+        self.data_map = None
+        self.index_map = None
+
+    def __enter__(self):
+        """Use the archive as a context manager"""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the archive when leaving the context"""
+        self.close()
+
+    def __len__(self):
+        """Number of records in the archive"""
+        self.map_files()
+        return (len(self.index_map) - INDEX_HEADER.size) // INDEX_ENTRY.size
+
+    def entry(self, position):
+        """
+        Read one index entry
+
+        Args:
+            position (int): Record number, oldest first
+
+        Returns:
+            tuple: (key, offset, compressed size, uncompressed size)
+        """
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return INDEX_ENTRY.unpack_from(self.index_map, INDEX_HEADER.size + position * INDEX_ENTRY.size)
+
+    def read(self, position):
+        """
+        Read one record by position
+
+        Args:
+            position (int): Record number, oldest first
+
+        Returns:
+            dict: The record
+        """
+        _, offset, size, raw_size = self.entry(position)
+        frame = self.data_map[offset:offset + size]
+        return json.loads(self.decompressor.decompress(frame, max_output_size=raw_size))
+
+    def get(self, record_id):
+        """
+        Read one record by id
+
+        Args:
+            record_id (str): Id of the analysis
+
+        Returns:
+            dict: The latest record with that id, or None
+        """
+        if self.keys is None:
+            # Built once per opening from the index alone
+            self.keys = {self.entry(position)[0]: position for position in range(len(self))}
+        position = self.keys.get(record_key(record_id))
+        return self.read(position) if position is not None else None
+
+    def __iter__(self):
+        """
+        Iterate over the records, oldest first
+
+        Yields:
+            dict: Each record
+        """
+        for position in range(len(self)):
+            yield self.read(position)
+
+    def append(self, record):
+        """
+        Compress a record and add it to the end of the archive
+
+        The data is written before its index entry, so a crash never leaves
+        an entry pointing at missing data.
+
+        Args:
+            record (dict): Archive record
+        """
+        raw = encode_record(record)
+        with self.lock:
+            if self.compressor is None:
+                self.compressor = zstandard.ZstdCompressor(level=ARCHIVE_ZSTD_LEVEL,
+                                                           dict_data=self.dictionary)
+            frame = self.compressor.compress(raw)
+
+            with open(self.path + ".zst", "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(frame)
+            with open(self.path + ".idx", "ab") as f:
+                f.write(INDEX_ENTRY.pack(record_key(record["id"]), offset, len(frame), len(raw)))
+
+            # Remap on the next read to see the new record
+            self.close()
+            if self.keys is not None:
+                self.keys[record_key(record["id"])] = len(self) - 1
+
+    def sizes(self):
+        """
+        Total sizes of the stored records
+
+        Returns:
+            tuple: (uncompressed bytes, compressed bytes, dictionary bytes)
+        """
+        raw_total = compressed_total = 0
+        for position in range(len(self)):
+            _, _, size, raw_size = self.entry(position)
+            raw_total += raw_size
+            compressed_total += size
+        return raw_total, compressed_total, len(self.dictionary.as_bytes())
+
+
+def pack(records, path, dictionary=None):
+    """
+    Write records to a new packed archive
+
+    Args:
+        records (list): Archive records, oldest first
+        path (str): Archive path without extension
+        dictionary (zstandard.ZstdCompressionDict): Dictionary to use, or
+            None to train one on the records
+
+    Returns:
+        PackedArchive: The new archive
+    """
+    if dictionary is None:
+        dictionary = train_dictionary(records)
+
+    archive = PackedArchive.create(path, dictionary)
+    compressor = zstandard.ZstdCompressor(level=ARCHIVE_ZSTD_LEVEL, dict_data=dictionary)
+
+    # Write in one pass instead of reopening the files per record
+    entries = []
+    with open(path + ".zst", "wb") as f:
+        for record in records:
+            raw = encode_record(record)
+            frame = compressor.compress(raw)
+            entries.append(INDEX_ENTRY.pack(record_key(record["id"]), f.tell(), len(frame), len(raw)))
+            f.write(frame)
+    with open(path + ".idx", "ab") as f:
+        f.write(b"".join(entries))
+    return archive
+
+
+def measure_reads(archive, samples=1000):
+    """
+    Time random single-record reads
+
+    Args:
+        archive (PackedArchive): The archive to read
+        samples (int): Number of reads
+
+    Returns:
+        dict: Latency percentiles in microseconds
+    """
+    count = len(archive)
+    if not count:
+        return {}
+
+    timings = []
+    for _ in range(samples):
+        position = random.randrange(count)
+        start_time = time.perf_counter()
+        archive.read(position)
+        timings.append((time.perf_counter() - start_time) * 1e6)
+
+    timings.sort()
+    return {
+        "p50": timings[len(timings) // 2],
+        "p99": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+        "mean": statistics.fmean(timings),
+    }
+
+
+def main(argv=None):
+    """
+    Command line interface for packed archives
+
+    Args:
+        argv (list): Arguments without the program name, or None for sys.argv
+    """
+    from cosmic_destiny.archive import ResultArchive
+
+    parser = argparse.ArgumentParser(description="CosmicDestiny 壓縮封存檔")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pack_parser = commands.add_parser("pack", help="pack a JSON lines archive")
+    pack_parser.add_argument("source", nargs="?", default=RESULT_ARCHIVE_PATH)
+    pack_parser.add_argument("path", help="packed archive path without extension")
+    pack_parser.add_argument("--dict", default=None,
+                             help="reuse the dictionary of this packed archive")
+
+    repack_parser = commands.add_parser(
+        "repack", help="retrain the dictionary on all records and rewrite the archive")
+    repack_parser.add_argument("path")
+    repack_parser.add_argument("output", help="new packed archive path without extension")
+
+    stats_parser = commands.add_parser("stats", help="show compression ratio and read latency")
+    stats_parser.add_argument("path")
+    stats_parser.add_argument("--samples", type=int, default=1000)
+
+    show_parser = commands.add_parser("show", help="print one record as JSON")
+    show_parser.add_argument("path")
+    show_parser.add_argument("record_id")
+
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    if args.command == "pack":
+        records = ResultArchive(args.source).load_all()
+        dictionary = PackedArchive(args.dict).dictionary if args.dict else None
+        with pack(records, args.path, dictionary) as archive:
+            print(f"Packed {len(archive)} records into {args.path}")
+
+    elif args.command == "repack":
+        with PackedArchive(args.path) as source:
+            records = list(source)
+        with pack(records, args.output) as archive:
+            print(f"Repacked {len(archive)} records into {args.output}")
+
+    elif args.command == "stats":
+        with PackedArchive(args.path) as archive:
+            raw_size, compressed_size, dict_size = archive.sizes()
+            latency = measure_reads(archive, args.samples)
+            stored = compressed_size + dict_size + os.path.getsize(args.path + ".idx")
+            print(f"records            {len(archive)}")
+            print(f"uncompressed       {raw_size:,} bytes")
+            print(f"compressed         {compressed_size:,} bytes "
+                  f"(+ {dict_size:,} dictionary, {stored:,} on disk)")
+            if compressed_size:
+                print(f"compression ratio  {raw_size / compressed_size:.2f}x "
+                      f"({raw_size / stored:.2f}x including dictionary and index)")
+            if latency:
+                print(f"random read        p50 {latency['p50']:.1f} us, "
+                      f"p99 {latency['p99']:.1f} us, mean {latency['mean']:.1f} us")
+
+    elif args.command == "show":
+        with PackedArchive(args.path) as archive:
+            record = archive.get(args.record_id)
+            if record is None:
+                parser.error(f"no such record: {args.record_id}")
+            print(json.dumps(record, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
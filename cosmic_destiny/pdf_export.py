@@ -0,0 +1,223 @@
+"""
+Headless batch export of stored readings to PDF
+
+Runs on Qt's offscreen platform, so no display is needed, and spreads the
+documents over a process pool. Each process creates its own
+QGuiApplication once and then lays out and writes documents independently.
+"""
+
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import time
+
+from cosmic_destiny.log import setup_logging
+from cosmic_destiny.config import (JOB_QUEUE_DB, RESULT_ARCHIVE_PATH, EXPORT_FONT_FAMILIES,
+                                   EXPORT_FONT_SIZE, EXPORT_PROCESSES)
+from cosmic_destiny.profiling import profiled
+
+# Per-process state set up by init_process
+_process_state = {}
+
+
+def init_process(theme_name):
+    """
+    Prepare a pool process for rendering
+
+    Args:
+        theme_name (str): Theme whose document stylesheet is used
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    from PyQt6.QtGui import QGuiApplication, QFont
+    from cosmic_destiny.ui.themes import get_theme
+
+    # Keep the application alive for the lifetime of the process
+    _process_state["app"] = QGuiApplication.instance() or QGuiApplication([sys.argv[0]])
+
+    font = QFont()
+    font.setFamilies(EXPORT_FONT_FAMILIES)
+    font.setPointSize(EXPORT_FONT_SIZE)
+    _process_state["font"] = font
+    _process_state["stylesheet"] = get_theme(theme_name).document_stylesheet
+
+
+@profiled("export_pdf")
+def export_one(item):
+    """
+    Write one reading to a PDF file in a pool process
+
+    Args:
+        item (tuple): (markdown text, output path)
+
+    Returns:
+        tuple: (output path, error message or None)
+    """
+    from cosmic_destiny.renderer import (markdown_to_html, build_document, paint_document,
+                                         create_pdf_writer)
+
+    text, path = item
+    try:
+        document = build_document(markdown_to_html(text), _process_state["font"],
+                                  _process_state["stylesheet"])
+        paint_document(document, create_pdf_writer(path))
+        return path, None
+    except Exception as e:
+        return path, str(e)
+
+
+def safe_filename(name):
+    """
+    Make a string usable as a file name
+
+    Args:
+        name (str): Proposed name
+
+    Returns:
+        str: Name without path separators or reserved characters
+    """
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", name).strip("_") or "unnamed"
+
+
+def collect_jobs(db_path, output_dir, limit):
+    """
+    List finished readings from the job queue
+
+    Args:
+        db_path (str): Job queue database
+        output_dir (str): Directory the PDFs are written to
+        limit (int): Maximum number of readings
+
+    Returns:
+        list: (markdown text, output path) tuples
+    """
+    from cosmic_destiny.job_queue import JobQueue, STATUS_DONE
+
+    items = []
+    for job in JobQueue(db_path).list_jobs(status=STATUS_DONE, limit=limit):
+        name = safe_filename(job["user_data"].get("chinese_name", ""))
+        items.append((job["result"], os.path.join(output_dir, f"{name}_{job['id'][:8]}.pdf")))
+    return items
+
+
+def collect_archive(archive_path, output_dir):
+    """
+    List readings from a result archive
+
+    Args:
+        archive_path (str): JSON lines archive
+        output_dir (str): Directory the PDFs are written to
+
+    Returns:
+        list: (markdown text, output path) tuples
+    """
+    from cosmic_destiny.archive import ResultArchive
+
+    items = []
+    for record in ResultArchive(archive_path):
+        name = safe_filename(record["user_data"].get("chinese_name", ""))
+        items.append((record["result"], os.path.join(output_dir, f"{name}_{record['id'][:8]}.pdf")))
+    return items
+
+
+def collect_files(paths, output_dir):
+    """
+    List readings stored as markdown or text files
+
+    Args:
+        paths (list): Files to export
+        output_dir (str): Directory the PDFs are written to
+
+    Returns:
+        list: (markdown text, output path) tuples
+    """
+    items = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        stem = os.path.splitext(os.path.basename(path))[0]
+        items.append((text, os.path.join(output_dir, f"{stem}.pdf")))
+    return items
+
+
+def export_all(items, theme_name, processes=EXPORT_PROCESSES, progress=None):
+    """
+    Export readings to PDF across a process pool
+
+    Args:
+        items (list): (markdown text, output path) tuples
+        theme_name (str): Theme whose document stylesheet is used
+        processes (int): Number of processes; 0 uses every CPU
+        progress (callable): Called with (done, total, path, error) per file
+
+    Returns:
+        list: (output path, error message) of each failed export
+    """
+    processes = min(processes or os.cpu_count() or 1, max(len(items), 1))
+    failures = []
+
+    # Spawned processes start without the parent's Qt state
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes, initializer=init_process, initargs=(theme_name,)) as pool:
+        chunksize = max(1, len(items) // (processes * 8))
+        for done, (path, error) in enumerate(pool.imap_unordered(export_one, items, chunksize), 1):
+            if error is not None:
+                failures.append((path, error))
+            if progress is not None:
+                progress(done, len(items), path, error)
+
+    return failures
+
+
+def main(argv=None):
+    """
+    Command line interface for batch PDF export
+
+    Args:
+        argv (list): Arguments without the program name, or None for sys.argv
+    """
+    from cosmic_destiny.ui.themes import THEME_COLORS, DEFAULT_THEME
+
+    parser = argparse.ArgumentParser(description="CosmicDestiny 批次匯出 PDF")
+    parser.add_argument("files", nargs="*", help="markdown or text files holding readings")
+    parser.add_argument("--db", default=None,
+                        help=f"export finished readings from this job queue (e.g. {JOB_QUEUE_DB})")
+    parser.add_argument("--archive", default=None,
+                        help=f"export every reading in this result archive (e.g. {RESULT_ARCHIVE_PATH})")
+    parser.add_argument("--limit", type=int, default=10000,
+                        help="maximum number of readings taken from the job queue")
+    parser.add_argument("--output", "-o", default="pdf_exports", help="output directory")
+    parser.add_argument("--processes", "-j", type=int, default=EXPORT_PROCESSES,
+                        help="number of processes, 0 for every CPU")
+    parser.add_argument("--theme", default=DEFAULT_THEME, choices=list(THEME_COLORS))
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    if not args.files and args.db is None and args.archive is None:
+        parser.error("give files to export, --db or --archive")
+
+    os.makedirs(args.output, exist_ok=True)
+    items = collect_files(args.files, args.output)
+    if args.db is not None:
+        items += collect_jobs(args.db, args.output, args.limit)
+    if args.archive is not None:
+        items += collect_archive(args.archive, args.output)
+
+    def report(done, total, path, error):
+        status = f"failed: {error}" if error else "ok"
+        print(f"[{done}/{total}] {path} {status}", flush=True)
+
+    start_time = time.perf_counter()
+    failures = export_all(items, args.theme, args.processes, report)
+    elapsed = time.perf_counter() - start_time
+    print(f"Exported {len(items) - len(failures)} of {len(items)} readings "
+          f"in {elapsed:.1f} s ({len(items) / max(elapsed, 1e-9):.1f} per second)")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Opt-in cProfile and tracemalloc hooks for slow analyses and rendering
+
+Functions decorated with @profiled run untouched unless profiling is
+enabled, by the COSMIC_DESTINY_PROFILE environment variable or by
+`python main.py --profile`. When enabled, every call writes two files to the
+profiles directory:
+
+    <time>-<name>-<pid>-<thread>.prof   cProfile stats, for pstats or snakeviz
+    <time>-<name>-<pid>-<thread>.txt    wall time, slowest functions and the
+                                        top allocation sites of the call
+
+Only the newest PROFILE_KEEP calls are kept.
+"""
+
+import cProfile
+import functools
+import inspect
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+from cosmic_destiny.config import (PROFILE_DIR, PROFILE_KEEP, PROFILE_TOP_FUNCTIONS,
+                                   PROFILE_TOP_ALLOCATIONS, PROFILE_TRACEMALLOC_FRAMES)
+
+# Set to 1 for the default directory, or to the directory to write to
+PROFILE_ENV = "COSMIC_DESTINY_PROFILE"
+
+logger = logging.getLogger(__name__)
+
+# Profiling settings; directory is None while profiling is disabled
+_settings = {"directory": None, "keep": PROFILE_KEEP}
+
+# Whether the current thread is already inside a profiled call
+_local = threading.local()
+
+
+def enable(directory=PROFILE_DIR, keep=PROFILE_KEEP, memory=True):
+    """
+    Turn profiling on for the rest of the process
+
+    The directory is also exported through the environment, so processes
+    started afterwards, such as batch export workers, profile too.
+
+    Args:
+        directory (str): Directory the profiles are written to
+        keep (int): Number of profiled calls kept in the directory
+        memory (bool): Whether to trace allocations with tracemalloc
+    """
+    _settings["directory"] = directory
+    _settings["keep"] = keep
+    os.environ[PROFILE_ENV] = directory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+    logger.info(f"Profiling enabled, writing to {os.path.abspath(directory)}")
+
+
+def disable():
+    """Turn profiling off again"""
+    _settings["directory"] = None
+    os.environ.pop(PROFILE_ENV, None)
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def is_enabled():
+    """
+    Check whether profiling is on
+
+    Returns:
+        bool: Whether profiled calls are recorded
+    """
+    return _settings["directory"] is not None
+
+
+def enable_from_environment():
+    """Turn profiling on if the environment asks for it"""
+    value = os.environ.get(PROFILE_ENV, "")
+    if value and value != "0" and not is_enabled():
+        enable(PROFILE_DIR if value == "1" else value)
+
+
+class ProfileSession:
+    """cProfile and tracemalloc data of one profiled call"""
+
+    def __init__(self, name):
+        """
+        Start collecting for a call
+
+        Args:
+            name (str): Name the profile files are labelled with
+        """
+        self.name = name
+        self.profiler = cProfile.Profile()
+        self.start_time = time.perf_counter()
+        self.snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+
+    def __enter__(self):
+        """Profile the current thread until the block ends"""
+        _local.active = True
+        try:
+            self.profiler.enable()
+            self.running = True
+        except ValueError:
+            # Newer Pythons allow one active profiler per process; another
+            # thread's call has it, so only the wall time is recorded
+            self.running = False
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop profiling the current thread"""
+        if self.running:
+            self.profiler.disable()
+        _local.active = False
+
+    def follow(self, generator):
+        """
+        Profile the iteration of a generator returned by the call
+
+        Only the generator's own work is profiled, not the caller's between
+        items; the profile is saved once the generator is exhausted or closed.
+
+        Args:
+            generator (generator): The returned generator
+
+        Yields:
+            The generator's items
+        """
+        try:
+            while True:
+                with self:
+                    try:
+                        item = next(generator)
+                    except StopIteration as stop:
+                        return stop.value
+                yield item
+        finally:
+            self.save()
+
+    def save(self):
+        """Write the profile files and drop the oldest beyond the limit"""
+        wall_time = time.perf_counter() - self.start_time
+        directory = _settings["directory"]
+        if directory is None:
+            return
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S") + f"{time.time() % 1:.3f}"[1:]
+            base = os.path.join(directory, f"{stamp}-{self.name}-{os.getpid()}-"
+                                           f"{threading.get_ident()}")
+            self.profiler.dump_stats(base + ".prof")
+            with open(base + ".txt", "w", encoding="utf-8") as f:
+                f.write(self.report(wall_time))
+            prune(directory, _settings["keep"])
+        except OSError as e:
+            # Profiling must never break the call it observes
+            logger.warning(f"Could not write profile {self.name}: {str(e)}")
+
+    def report(self, wall_time):
+        """
+        Summarize the call as text
+
+        Args:
+            wall_time (float): Duration of the call in seconds
+
+        Returns:
+            str: Wall time, slowest functions and top allocation sites
+        """
+        stream = io.StringIO()
+        stream.write(f"{self.name}: {wall_time * 1000:.1f} ms wall time\n\n")
+        try:
+            stats = pstats.Stats(self.profiler, stream=stream)
+            stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        except TypeError:
+            # pstats refuses empty profiles
+            stream.write("No function calls were profiled\n\n")
+
+        if self.snapshot is not None and tracemalloc.is_tracing():
+            # Allocations by every thread during the call, not only this one
+            filters = [tracemalloc.Filter(False, module.__file__)
+                       for module in (tracemalloc, cProfile, pstats)]
+            after = tracemalloc.take_snapshot().filter_traces(filters)
+            changes = after.compare_to(self.snapshot.filter_traces(filters), "lineno")
+            stream.write(f"Top {PROFILE_TOP_ALLOCATIONS} allocation sites during the call\n")
+            for change in changes[:PROFILE_TOP_ALLOCATIONS]:
+                stream.write(f"  {change}\n")
+        return stream.getvalue()
+
+
+def prune(directory, keep):
+    """
+    Delete all but the newest profiled calls
+
+    Args:
+        directory (str): The profiles directory
+        keep (int): Number of calls to keep
+    """
+    # Names start with the time, so they sort oldest first
+    bases = sorted({os.path.splitext(name)[0] for name in os.listdir(directory)
+                    if name.endswith((".prof", ".txt"))})
+    for base in bases[:max(0, len(bases) - keep)]:
+        for extension in (".prof", ".txt"):
+            try:
+                os.remove(os.path.join(directory, base + extension))
+            except FileNotFoundError:
+                pass
+
+
+def profiled(name):
+    """
+    Decorate a function to be profiled when profiling is enabled
+
+    Disabled, the only cost is one dictionary lookup per call. Calls made
+    inside another profiled call in the same thread belong to the outer
+    profile. Returned generators are followed until exhausted.
+
+    Args:
+        name (str): Name the profile files are labelled with
+
+    Returns:
+        callable: The decorator
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _settings["directory"] is None or getattr(_local, "active", False):
+                return function(*args, **kwargs)
+
+            session = ProfileSession(name)
+            try:
+                with session:
+                    result = function(*args, **kwargs)
+            except BaseException:
+                session.save()
+                raise
+            if inspect.isgenerator(result):
+                return session.follow(result)
+            session.save()
+            return result
+        return wrapper
+    return decorate
+
+
+enable_from_environment()
@@ -0,0 +1,274 @@
+"""
+Markdown rendering helpers for analysis results
+
+These functions do not touch any widget, so they can run on a worker
+thread while the GUI thread keeps processing events.
+"""
+
+from PyQt6.QtCore import QRectF, QSizeF, QMarginsF
+from PyQt6.QtGui import (QTextDocument, QTextCursor, QTextBlockFormat, QPainter, QPdfWriter,
+                         QPageSize, QPageLayout)
+
+from cosmic_destiny.config import EXPORT_PDF_RESOLUTION, EXPORT_PAGE_MARGIN_MM
+
+
+def markdown_to_html(text):
+    """
+    Convert markdown text to HTML for display
+
+    Args:
+        text (str): Markdown text
+
+    Returns:
+        str: HTML formatted text
+    """
+    # Simple markdown processing for headers, bold, italic, etc.
+    lines = text.split('\n')
+    html_lines = []
+
+    in_list = False
+    in_blockquote = False
+
+    for line in lines:
+        # Skip empty lines
+        if not line.strip():
+            if in_list:
+                html_lines.append("</ul>")
+                in_list = False
+            if in_blockquote:
+                html_lines.append("</blockquote>")
+                in_blockquote = False
+            html_lines.append("<p>&nbsp;</p>")
+            continue
+
+        # Headers
+        if line.startswith('# '):
+            line = f"<h1>{line[2:]}</h1>"
+        elif line.startswith('## '):
+            line = f"<h2>{line[3:]}</h2>"
+        elif line.startswith('### '):
+            line = f"<h3>{line[4:]}</h3>"
+        elif line.startswith('#### '):
+            line = f"<h4>{line[5:]}</h4>"
+        elif line.startswith('##### '):
+            line = f"<h5>{line[6:]}</h5>"
+        elif line.startswith('###### '):
+            line = f"<h6>{line[7:]}</h6>"
+
+        # Lists
+        elif line.strip().startswith('- '):
+            if not in_list:
+                html_lines.append("<ul>")
+                in_list = True
+            line = f"<li>{line.strip()[2:]}</li>"
+
+        # Blockquotes
+        elif line.strip().startswith('>'):
+            if not in_blockquote:
+                html_lines.append("<blockquote>")
+                in_blockquote = True
+            line = f"<p>{line.strip()[1:].strip()}</p>"
+
+        # Close lists if next line is not a list item
+        elif in_list:
+            html_lines.append("</ul>")
+            in_list = False
+
+        # Close blockquotes if next line is not a blockquote
+        elif in_blockquote:
+            html_lines.append("</blockquote>")
+            in_blockquote = False
+
+        # Regular paragraph
+        else:
+            line = f"<p>{line}</p>"
+
+        # Bold (**text**)
+        line = line.replace('**', '<strong>', 1)
+        while '**' in line:
+            line = line.replace('**', '</strong>', 1)
+
+        # Italic (*text*)
+        line = line.replace('*', '<em>', 1)
+        while '*' in line:
+            line = line.replace('*', '</em>', 1)
+
+        # Horizontal rule
+        if line.strip() == '---':
+            line = '<hr />'
+
+        html_lines.append(line)
+
+    # Close any open lists
+    if in_list:
+        html_lines.append("</ul>")
+
+    # Close any open blockquotes
+    if in_blockquote:
+        html_lines.append("</blockquote>")
+
+    # Combine all HTML lines
+    html = '<div style="line-height: 1.5;">' + '\n'.join(html_lines) + '</div>'
+
+    return html
+
+
+def split_sections(text, max_chars=4000):
+    """
+    Split markdown text into self-contained section-sized blocks
+
+    Blocks break before headings once they hold a quarter of max_chars, and
+    at blank lines once they reach max_chars, so no list or blockquote is
+    ever cut in half. Joining the blocks with newlines gives back the text.
+
+    Args:
+        text (str): Markdown text
+        max_chars (int): Target maximum size of a block
+
+    Returns:
+        list: The markdown blocks in order
+    """
+    sections = []
+    current = []
+    size = 0
+
+    for line in text.split('\n'):
+        at_heading = line.startswith('#') and size >= max_chars // 4
+        at_break = not line.strip() and size >= max_chars
+        if current and (at_heading or at_break):
+            sections.append('\n'.join(current))
+            current = []
+            size = 0
+
+        current.append(line)
+        size += len(line) + 1
+
+    if current:
+        sections.append('\n'.join(current))
+
+    return sections
+
+
+def build_document(html, font=None, stylesheet=None):
+    """
+    Parse HTML into a standalone QTextDocument
+
+    The document is created without a parent so it can be built on a worker
+    thread and later moved to the GUI thread. Layout is left to the text
+    browser, which lays out the visible part first and the rest lazily.
+
+    Args:
+        html (str): HTML content to parse
+        font (QFont): Default font for the document, or None to keep Qt's
+        stylesheet (str): Default CSS applied while parsing, or None
+
+    Returns:
+        QTextDocument: The parsed document
+    """
+    document = QTextDocument()
+    if font is not None:
+        document.setDefaultFont(font)
+    if stylesheet is not None:
+        document.setDefaultStyleSheet(stylesheet)
+    document.setHtml(html)
+    return document
+
+
+def append_html(document, html):
+    """
+    Parse HTML onto the end of a document
+
+    Args:
+        document (QTextDocument): The document to extend
+        html (str): HTML content to append
+
+    Returns:
+        int: Position of the first block of the appended content
+    """
+    # The first inserted block is merged into the block at the cursor and
+    # loses its own format, such as a heading's; so a placeholder paragraph
+    # goes first, into a new block, and is removed again afterwards
+    cursor = QTextCursor(document)
+    cursor.movePosition(QTextCursor.MoveOperation.End)
+    cursor.insertBlock(QTextBlockFormat())
+    start = cursor.position()
+    cursor.insertHtml("<p>-</p>" + html)
+    cursor.setPosition(start)
+    cursor.movePosition(QTextCursor.MoveOperation.NextBlock, QTextCursor.MoveMode.KeepAnchor)
+    cursor.removeSelectedText()
+    return start
+
+
+def prepend_html(document, html):
+    """
+    Parse HTML in front of a document
+
+    Args:
+        document (QTextDocument): The document to extend
+        html (str): HTML content to prepend
+
+    Returns:
+        int: Position the previous content of the document now starts at
+    """
+    # Insert into an empty plain block, so the first block keeps its format
+    cursor = QTextCursor(document)
+    cursor.insertBlock()
+    cursor.movePosition(QTextCursor.MoveOperation.Start)
+    cursor.setBlockFormat(QTextBlockFormat())
+    cursor.insertHtml(html)
+    return cursor.block().next().position()
+
+
+def paint_document(document, device, progress=None):
+    """
+    Lay out a document on pages and paint it onto a paged device
+
+    Unlike QTextDocument.print this reports progress after each page. Like
+    any QPainter on a QPdfWriter or QPrinter, it may run on a worker thread.
+
+    Args:
+        document (QTextDocument): The document, owned by the calling thread
+        device (QPagedPaintDevice): QPdfWriter or QPrinter to paint onto
+        progress (callable): Called with (pages done, total pages)
+    """
+    # Lay out for the device's resolution so point sizes come out right
+    document.documentLayout().setPaintDevice(device)
+    page_rect = device.pageLayout().paintRectPixels(device.resolution())
+    document.setPageSize(QSizeF(page_rect.size()))
+    page_count = document.pageCount()
+
+    painter = QPainter(device)
+    try:
+        for page in range(page_count):
+            if page:
+                device.newPage()
+
+            # The painter starts at the top-left of the printable area
+            clip = QRectF(0, page * page_rect.height(), page_rect.width(), page_rect.height())
+            painter.save()
+            painter.translate(0, -clip.top())
+            document.drawContents(painter, clip)
+            painter.restore()
+
+            if progress is not None:
+                progress(page + 1, page_count)
+    finally:
+        painter.end()
+
+
+def create_pdf_writer(filename):
+    """
+    Create an A4 PDF writer for exported results
+
+    Args:
+        filename (str): Path of the PDF file to write
+
+    Returns:
+        QPdfWriter: The writer, owned by the calling thread
+    """
+    writer = QPdfWriter(filename)
+    writer.setResolution(EXPORT_PDF_RESOLUTION)
+    writer.setPageSize(QPageSize(QPageSize.PageSizeId.A4))
+    margin = EXPORT_PAGE_MARGIN_MM
+    writer.setPageMargins(QMarginsF(margin, margin, margin, margin), QPageLayout.Unit.Millimeter)
+    return writer
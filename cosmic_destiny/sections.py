@@ -0,0 +1,265 @@
+"""
+Section-level cache of reading fragments
+
+A reading is made of six sections, and most of them depend on only a few
+profile fields: the personality section on the zodiac signs and MBTI type,
+the 開運 advice on the five elements phase and the focus area, and so on.
+With the section cache enabled, the analyzer generates each section with
+its own short prompt holding only the fields it depends on, and stores the
+text keyed by those fields and the model. A later profile sharing the
+fields reuses the stored section, and only the sections that are personal
+to it are generated.
+
+Section prompts never include the name, so a stored section can be shown
+to anyone with the same key fields.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from cosmic_destiny.compatibility import FIVE_ELEMENTS, compute_chart
+from cosmic_destiny.config import SECTION_CACHE_DB, SECTION_CACHE_MAX_ENTRIES
+
+# Bump when the section prompts change, so older fragments are not reused
+SECTION_PROMPT_VERSION = 1
+
+# One section of a reading and the profile fields its text depends on
+Section = namedtuple("Section", ["name", "title", "fields", "topics"])
+
+SECTIONS = [
+    Section("chart", "命盤總論",
+            ("fortune_type", "gender", "birth_date", "birth_time"),
+            ["八字四柱解析（天干地支、五行強弱）", "紫微斗數主星與輔星組合",
+             "先天命盤特徵與關鍵命理指標"]),
+    Section("personality", "人格特質與性格剖析",
+            ("zodiac", "chinese_zodiac", "mbti"),
+            ["內在性格與外在表現", "思維模式與決策風格", "潛意識行為模式與心理傾向"]),
+    Section("trajectory", "人生全程發展軌跡",
+            ("fortune_type", "focus_area", "gender", "birth_date", "birth_time", "life_phases"),
+            ["成長期關鍵發展", "事業高峰與低谷時期", "重要人生轉折點與契機"]),
+    Section("focus", "專項深度分析",
+            ("focus_area", "element", "zodiac", "chinese_zodiac", "mbti"),
+            ["事業發展軌跡與職業適配性", "財富累積模式與理財特質", "感情關係模式與理想伴侶特質",
+             "健康狀況預測與養生建議", "人際關係與社交網絡特徵"]),
+    Section("challenges", "命理衝突與人生挑戰",
+            ("element", "chinese_zodiac", "birth_date", "birth_time", "life_phases"),
+            ["先天命盤衝突點", "人生潛在阻礙與困境", "各生命階段關鍵挑戰"]),
+    Section("remedies", "開運化解建議",
+            ("element", "chinese_zodiac", "focus_area"),
+            ["五行能量平衡方案", "事業方向優化建議", "人際關係調和方法", "吉祥物與開運色彩建議"]),
+]
+
+# Display names of the fields in section prompts
+FIELD_LABELS = {
+    "fortune_type": "分析類型",
+    "focus_area": "分析主題",
+    "gender": "性別",
+    "birth_date": "生辰年月日",
+    "birth_time": "出生時辰",
+    "zodiac": "星座",
+    "chinese_zodiac": "生肖",
+    "mbti": "MBTI 人格",
+    "element": "年柱五行",
+    "life_phases": "特別關注的人生階段",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sections (
+    key TEXT PRIMARY KEY,
+    section TEXT NOT NULL,
+    model TEXT NOT NULL,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sections_used_at ON sections (used_at);
+"""
+
+
+def field_value(user_data, field):
+    """
+    Get the value of a profile field as a section depends on it
+
+    Args:
+        user_data (dict): Dictionary containing all user information
+        field (str): One of the FIELD_LABELS keys
+
+    Returns:
+        str: The value; element is derived from the birth year
+    """
+    if field == "element":
+        element = compute_chart(user_data).element
+        return FIVE_ELEMENTS[element] if element >= 0 else ""
+    if field == "life_phases":
+        phases = user_data.get("life_phases") or []
+        return "、".join(phase for phase in phases if isinstance(phase, str))
+    return str(user_data.get(field, ""))
+
+
+def section_key(section, user_data, model):
+    """
+    Get the cache key of a section for a profile
+
+    Args:
+        section (Section): The section
+        user_data (dict): Dictionary containing all user information
+        model (str): Model generating the section
+
+    Returns:
+        str: Hex digest of the section, model and the fields it depends on
+    """
+    values = [field_value(user_data, field) for field in section.fields]
+    data = json.dumps([SECTION_PROMPT_VERSION, section.name, model, values], ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def create_section_prompt(section, number, user_data):
+    """
+    Create the prompt generating one section
+
+    Args:
+        section (Section): The section
+        number (int): Number of the section in the reading, from 1
+        user_data (dict): Dictionary containing all user information
+
+    Returns:
+        str: The prompt
+    """
+    facts = "\n".join(f"- {FIELD_LABELS[field]}：{field_value(user_data, field)}"
+                      for field in section.fields if field_value(user_data, field))
+    topics = "\n".join(f"   - {topic}" for topic in section.topics)
+    return f"""請以頂尖命理大師的專業角度，根據以下命理資料，撰寫命理分析報告中的「{section.title}」一節：
+
+{facts}
+
+本節內容需包含：
+{topics}
+
+只撰寫這一節，以「## {number}. {section.title}」作為標題開頭，不要加入前言、結語或其他章節，也不要稱呼當事人的姓名。
+請以專業且通俗易懂的方式分析，基於傳統命理學與現代心理學的結合，避免籠統空泛的內容。
+
+回答請使用繁體中文，內容需分段落、小標題清楚呈現，便於閱讀理解。
+"""
+
+
+class SectionCache:
+    """SQLite store of generated sections"""
+
+    def __init__(self, path=SECTION_CACHE_DB, max_entries=SECTION_CACHE_MAX_ENTRIES):
+        """
+        Open the cache, creating the database if needed
+
+        Args:
+            path (str): Path of the SQLite database file
+            max_entries (int): Sections kept; the least recently used go first
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.logger = logging.getLogger(__name__)
+
+        with self.connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+
+    @contextmanager
+    def connect(self):
+        """
+        Open a connection for one operation
+
+        Yields:
+            sqlite3.Connection: Connection in autocommit mode
+        """
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def get(self, key):
+        """
+        Look up a section
+
+        Args:
+            key (str): Result of section_key
+
+        Returns:
+            str: The section text, or None if it is not cached
+        """
+        with self.connect() as connection:
+            row = connection.execute("SELECT text FROM sections WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE sections SET used_at = ?, hits = hits + 1 WHERE key = ?",
+                               (time.time(), key))
+            return row["text"]
+
+    def put(self, key, section, model, text):
+        """
+        Store a generated section, dropping the least recently used beyond
+        the limit
+
+        Args:
+            key (str): Result of section_key
+            section (str): Name of the section
+            model (str): Model that generated it
+            text (str): The section text
+        """
+        now = time.time()
+        with self.connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO sections (key, section, model, text, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (key, section, model, text, now, now))
+            connection.execute(
+                "DELETE FROM sections WHERE key IN (SELECT key FROM sections "
+                "ORDER BY used_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def stats(self):
+        """
+        Count the stored sections
+
+        Returns:
+            dict: Number of sections and total hits per section name
+        """
+        with self.connect() as connection:
+            rows = connection.execute(
+                "SELECT section, COUNT(*) AS count, SUM(hits) AS hits FROM sections "
+                "GROUP BY section").fetchall()
+        return {row["section"]: {"count": row["count"], "hits": row["hits"]} for row in rows}
+
+    def clear(self):
+        """Delete all stored sections"""
+        with self.connect() as connection:
+            connection.execute("DELETE FROM sections")
+
+
+def main(argv=None):
+    """
+    Command line entry point to inspect or clear the section cache
+
+    Args:
+        argv (list): Command line arguments, default sys.argv
+    """
+    parser = argparse.ArgumentParser(description="CosmicDestiny section cache")
+    parser.add_argument("command", choices=["stats", "clear"])
+    parser.add_argument("--db", default=SECTION_CACHE_DB, help="section cache database")
+    args = parser.parse_args(argv)
+
+    cache = SectionCache(args.db)
+    if args.command == "clear":
+        cache.clear()
+        print("Section cache cleared")
+        return
+    for name, counts in cache.stats().items():
+        print(f"{name:<12} {counts['count']:>6} sections {counts['hits']:>8} hits")
+
+
+if __name__ == "__main__":
+    main()
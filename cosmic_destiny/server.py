@@ -0,0 +1,614 @@
+"""
+Local HTTP API server exposing the analyzer to other tools
+
+Endpoints:
+    POST /api/analyses              Submit a profile, returns the analysis id
+    GET  /api/analyses/<id>         Status, and the result once finished
+    GET  /api/analyses/<id>/events  Stream the reading as server-sent events
+    GET  /api/status                Backend slot and queue status
+
+Any number of clients can connect; their analyses share a fixed number of
+backend slots and wait in submission order for a free one.
+"""
+
+import asyncio
+import argparse
+import itertools
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from cosmic_destiny.analyzer import DestinyAnalyzer
+from cosmic_destiny.archive import ResultArchive, make_record
+from cosmic_destiny.ladder import get_ladder
+from cosmic_destiny.log import log_context, setup_logging
+from cosmic_destiny.config import (SERVER_HOST, SERVER_PORT, SERVER_SLOTS,
+                                   SERVER_MAX_PENDING, SERVER_MAX_FINISHED, LOG_JSON)
+
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 64 * 1024
+
+HTTP_REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    """Error answered with an HTTP status and a JSON message"""
+
+    def __init__(self, status, message):
+        """
+        Initialize the error
+
+        Args:
+            status (int): HTTP status code
+            message (str): Message returned to the client
+        """
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class AnalysisJob:
+    """One submitted analysis and the text generated for it so far"""
+
+    def __init__(self, user_data, sequence):
+        """
+        Initialize the job
+
+        Args:
+            user_data (dict): Dictionary containing all user information
+            sequence (int): Submission order, used for queue positions
+        """
+        self.id = uuid.uuid4().hex
+        self.user_data = user_data
+        self.sequence = sequence
+        self.status = "queued"
+        self.chunks = []
+        self.error = None
+        self.metadata = {}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+        # Replaced on every update, so waiters never miss a change
+        self.changed = asyncio.Event()
+
+    @property
+    def finished(self):
+        """Whether the job has completed or failed"""
+        return self.status in ("done", "error")
+
+    def notify(self):
+        """Wake up everything waiting for this job to change"""
+        changed = self.changed
+        self.changed = asyncio.Event()
+        changed.set()
+
+    def add_chunk(self, text):
+        """
+        Append generated text
+
+        Args:
+            text (str): The next piece of the reading
+        """
+        self.chunks.append(text)
+        self.notify()
+
+    def to_dict(self, include_result=True):
+        """
+        Describe the job for API responses
+
+        Args:
+            include_result (bool): Whether to include the generated text
+
+        Returns:
+            dict: JSON-serializable job description
+        """
+        data = {
+            "id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_result:
+            data["result"] = "".join(self.chunks)
+        if self.metadata:
+            data["metadata"] = self.metadata
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class AnalysisServer:
+    """Asyncio HTTP server multiplexing clients onto bounded backend slots"""
+
+    def __init__(self, analyzer=None, slots=SERVER_SLOTS, max_pending=SERVER_MAX_PENDING,
+                 max_finished=SERVER_MAX_FINISHED, archive=None):
+        """
+        Initialize the server
+
+        Args:
+            analyzer (DestinyAnalyzer): Analyzer to run, or None for a new one
+            slots (int): Number of analyses sent to the backend at once
+            max_pending (int): Queued analyses before new ones are refused
+            max_finished (int): Finished analyses kept for retrieval
+            archive (ResultArchive): Archive finished results are appended to
+        """
+        self.analyzer = analyzer or DestinyAnalyzer()
+        self.slots = slots
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self.archive = archive
+        self.logger = logging.getLogger(__name__)
+
+        self.jobs = OrderedDict()
+        self.sequence = itertools.count()
+        self.tasks = set()
+        self.semaphore = None
+        self.executor = None
+        self.server = None
+
+    async def start(self, host=SERVER_HOST, port=SERVER_PORT):
+        """
+        Start listening for connections
+
+        Args:
+            host (str): Interface to bind to
+            port (int): Port to listen on, 0 for any free port
+
+        Returns:
+            tuple: The (host, port) actually bound
+        """
+        self.semaphore = asyncio.Semaphore(self.slots)
+        self.executor = ThreadPoolExecutor(max_workers=self.slots,
+                                           thread_name_prefix="analysis-slot")
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        address = self.server.sockets[0].getsockname()[:2]
+        self.logger.info(f"API server listening on http://{address[0]}:{address[1]}")
+        return address
+
+    async def close(self):
+        """Stop accepting connections and release the backend slots"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+    # ------------------------------------------------------------------
+    # Job handling
+    # ------------------------------------------------------------------
+
+    def pending_jobs(self):
+        """
+        Get the jobs still waiting for a backend slot
+
+        Returns:
+            list: Queued jobs in submission order
+        """
+        return [job for job in self.jobs.values() if job.status == "queued"]
+
+    def submit(self, user_data):
+        """
+        Queue a new analysis
+
+        Args:
+            user_data (dict): Dictionary containing all user information
+
+        Returns:
+            AnalysisJob: The queued job
+
+        Raises:
+            HTTPError: If the queue is full
+        """
+        if len(self.pending_jobs()) >= self.max_pending:
+            raise HTTPError(503, "分析佇列已滿，請稍後再試")
+
+        job = AnalysisJob(user_data, next(self.sequence))
+        self.jobs[job.id] = job
+        # Keep a reference so the task is not garbage collected while waiting
+        task = asyncio.ensure_future(self.run_job(job))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        get_ladder().observe_depth(len(self.pending_jobs()))
+        self.logger.info(f"Queued analysis {job.id}")
+        return job
+
+    async def run_job(self, job):
+        """
+        Run one job once a backend slot is free
+
+        Args:
+            job (AnalysisJob): The job to run
+        """
+        loop = asyncio.get_running_loop()
+
+        async with self.semaphore:
+            job.status = "running"
+            job.started_at = time.time()
+            job.notify()
+            get_ladder().observe_depth(len(self.pending_jobs()))
+
+            # Filled on the slot thread and published once it is done, so API
+            # responses never serialize the metadata while it is being written
+            stats = {}
+
+            def generate():
+                # Runs on a slot thread; chunks are handed back to the loop
+                pieces = []
+                with log_context(job.id):
+                    for text in self.analyzer.stream_analysis(job.user_data, stats=stats):
+                        pieces.append(text)
+                        loop.call_soon_threadsafe(job.add_chunk, text)
+                return "".join(pieces)
+
+            def archive(result):
+                # The reading is already delivered, so a failure only loses its record
+                with log_context(job.id):
+                    try:
+                        self.archive.append(make_record(job.id, job.user_data, result,
+                                                        job.metadata, "api"))
+                    except Exception as e:
+                        self.logger.error(f"Archiving analysis {job.id} failed: {str(e)}")
+
+            try:
+                result = await loop.run_in_executor(self.executor, generate)
+                job.status = "done"
+            except Exception as e:
+                self.logger.error(f"Analysis {job.id} failed: {str(e)}")
+                job.status = "error"
+                job.error = str(e)
+
+            job.metadata = stats
+            job.finished_at = time.time()
+            job.notify()
+
+            if job.status == "done" and self.archive is not None:
+                await loop.run_in_executor(self.executor, archive, result)
+
+            with log_context(job.id):
+                self.logger.info(f"Analysis {job.id} {job.status}", extra={
+                    "queue_ms": round((job.started_at - job.created_at) * 1000),
+                    "duration_ms": round((job.finished_at - job.started_at) * 1000),
+                    "spans": job.metadata.get("spans", {}),
+                    "tier": job.metadata.get("tier"),
+                })
+
+        self.prune_finished()
+
+    def prune_finished(self):
+        """Forget the oldest finished jobs beyond the retention limit"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
+
+    def get_job(self, job_id):
+        """
+        Look up a job
+
+        Args:
+            job_id (str): The analysis id
+
+        Returns:
+            AnalysisJob: The job
+
+        Raises:
+            HTTPError: If no such job exists
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPError(404, "找不到此分析")
+        return job
+
+    def queue_position(self, job):
+        """
+        Get how many queued jobs are ahead of a job
+
+        Args:
+            job (AnalysisJob): A queued job
+
+        Returns:
+            int: Number of jobs ahead, or None if the job is not queued
+        """
+        if job.status != "queued":
+            return None
+        return sum(1 for other in self.pending_jobs() if other.sequence < job.sequence)
+
+    def status(self):
+        """
+        Summarize slot and queue usage
+
+        Returns:
+            dict: JSON-serializable status
+        """
+        counts = {"queued": 0, "running": 0, "done": 0, "error": 0}
+        for job in self.jobs.values():
+            counts[job.status] += 1
+        return {
+            "slots": self.slots,
+            "running": counts["running"],
+            "queued": counts["queued"],
+            "finished": counts["done"] + counts["error"],
+            "max_pending": self.max_pending,
+        }
+
+    # ------------------------------------------------------------------
+    # HTTP handling
+    # ------------------------------------------------------------------
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serve a single HTTP request on a connection
+
+        Args:
+            reader (asyncio.StreamReader): Incoming stream
+            writer (asyncio.StreamWriter): Outgoing stream
+        """
+        try:
+            method, path, body = await self.read_request(reader)
+            await self.dispatch(method, path, body, writer)
+        except HTTPError as e:
+            await self.send_json(writer, e.status, {"error": e.message})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            self.logger.error(f"Error handling request: {str(e)}")
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        """
+        Read the request line, headers and body
+
+        Args:
+            reader (asyncio.StreamReader): Incoming stream
+
+        Returns:
+            tuple: (method, path, body bytes)
+        """
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise HTTPError(400, "無效的請求")
+        method, path = parts[0].upper(), parts[1].split("?", 1)[0]
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1")
+            if line in ("\r\n", "\n", ""):
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise HTTPError(400, "無效的 Content-Length")
+        if length > MAX_BODY_SIZE:
+            raise HTTPError(413, "請求內容過大")
+        body = await reader.readexactly(length) if length else b""
+        return method, path, body
+
+    async def dispatch(self, method, path, body, writer):
+        """
+        Route a request to its handler
+
+        Args:
+            method (str): HTTP method
+            path (str): Request path without query string
+            body (bytes): Request body
+            writer (asyncio.StreamWriter): Outgoing stream
+        """
+        parts = [part for part in path.split("/") if part]
+
+        if parts == ["api", "status"]:
+            self.require_method(method, "GET")
+            await self.send_json(writer, 200, self.status())
+
+        elif parts == ["api", "analyses"]:
+            self.require_method(method, "POST")
+            job = self.submit(self.parse_profile(body))
+            data = job.to_dict(include_result=False)
+            data["queue_position"] = self.queue_position(job)
+            await self.send_json(writer, 202, data)
+
+        elif len(parts) == 3 and parts[:2] == ["api", "analyses"]:
+            self.require_method(method, "GET")
+            job = self.get_job(parts[2])
+            data = job.to_dict()
+            data["queue_position"] = self.queue_position(job)
+            await self.send_json(writer, 200, data)
+
+        elif len(parts) == 4 and parts[:2] == ["api", "analyses"] and parts[3] == "events":
+            self.require_method(method, "GET")
+            await self.stream_events(writer, self.get_job(parts[2]))
+
+        else:
+            raise HTTPError(404, "找不到此路徑")
+
+    @staticmethod
+    def require_method(method, expected):
+        """
+        Reject requests using the wrong HTTP method
+
+        Args:
+            method (str): Method of the request
+            expected (str): Method the endpoint accepts
+
+        Raises:
+            HTTPError: If the methods differ
+        """
+        if method != expected:
+            raise HTTPError(405, f"此路徑僅支援 {expected}")
+
+    @staticmethod
+    def parse_profile(body):
+        """
+        Parse and validate a submitted profile
+
+        Args:
+            body (bytes): JSON request body
+
+        Returns:
+            dict: The user data
+
+        Raises:
+            HTTPError: If the body is not a valid profile
+        """
+        try:
+            user_data = json.loads(body.decode("utf-8"))
+        except (UnicodeDecodeError, ValueError):
+            raise HTTPError(400, "請求內容必須是 JSON")
+
+        if not isinstance(user_data, dict):
+            raise HTTPError(400, "請求內容必須是 JSON 物件")
+        if not user_data.get("chinese_name"):
+            raise HTTPError(400, "請輸入中文姓名 (chinese_name)")
+        return user_data
+
+    async def send_json(self, writer, status, data):
+        """
+        Send a complete JSON response
+
+        Args:
+            writer (asyncio.StreamWriter): Outgoing stream
+            status (int): HTTP status code
+            data (dict): Response body
+        """
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        writer.write(self.response_head(status, {
+            "Content-Type": "application/json; charset=utf-8",
+            "Content-Length": str(len(body)),
+        }) + body)
+        await writer.drain()
+
+    @staticmethod
+    def response_head(status, headers):
+        """
+        Build the status line and headers of a response
+
+        Args:
+            status (int): HTTP status code
+            headers (dict): Response headers
+
+        Returns:
+            bytes: The encoded response head
+        """
+        lines = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        lines.append("Connection: close")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def stream_events(self, writer, job):
+        """
+        Stream a job as server-sent events until it finishes
+
+        Clients joining late first receive everything generated so far.
+        Events are "status" on state changes, "chunk" for generated text,
+        then "done" with the full result or "error".
+
+        Args:
+            writer (asyncio.StreamWriter): Outgoing stream
+            job (AnalysisJob): The job to stream
+        """
+        writer.write(self.response_head(200, {
+            "Content-Type": "text/event-stream; charset=utf-8",
+            "Cache-Control": "no-cache",
+        }))
+
+        sent_chunks = 0
+        sent_status = None
+        while True:
+            # Take the event before reading state so no update is missed
+            changed = job.changed
+
+            if job.status != sent_status:
+                sent_status = job.status
+                position = self.queue_position(job)
+                self.write_event(writer, "status", {"status": job.status,
+                                                    "queue_position": position})
+
+            while sent_chunks < len(job.chunks):
+                self.write_event(writer, "chunk", {"text": job.chunks[sent_chunks]})
+                sent_chunks += 1
+
+            if job.finished:
+                if job.status == "done":
+                    self.write_event(writer, "done", job.to_dict())
+                else:
+                    self.write_event(writer, "error", {"error": job.error})
+                await writer.drain()
+                return
+
+            await writer.drain()
+            await changed.wait()
+
+    @staticmethod
+    def write_event(writer, event, data):
+        """
+        Write one server-sent event
+
+        Args:
+            writer (asyncio.StreamWriter): Outgoing stream
+            event (str): Event name
+            data (dict): Event payload, sent as JSON
+        """
+        payload = json.dumps(data, ensure_ascii=False)
+        writer.write(f"event: {event}\ndata: {payload}\n\n".encode("utf-8"))
+
+
+async def serve(host=SERVER_HOST, port=SERVER_PORT, slots=SERVER_SLOTS):
+    """
+    Run the API server until cancelled
+
+    Args:
+        host (str): Interface to bind to
+        port (int): Port to listen on
+        slots (int): Number of analyses sent to the backend at once
+    """
+    server = AnalysisServer(slots=slots, archive=ResultArchive())
+    await server.start(host, port)
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    """
+    Command line entry point for the API server
+
+    Args:
+        argv (list): Arguments without the program name, or None for sys.argv
+    """
+    parser = argparse.ArgumentParser(description="CosmicDestiny HTTP API 伺服器")
+    parser.add_argument("--host", default=SERVER_HOST, help="address to bind to")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="port to listen on")
+    parser.add_argument("--slots", type=int, default=SERVER_SLOTS,
+                        help="analyses sent to the backend at the same time")
+    parser.add_argument("--log-json", action="store_true",
+                        help="write the log file as JSON lines")
+    args = parser.parse_args(argv)
+
+    setup_logging(json_lines=args.log_json or LOG_JSON)
+    try:
+        asyncio.run(serve(args.host, args.port, args.slots))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
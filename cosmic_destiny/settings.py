@@ -0,0 +1,241 @@
+"""
+Hot-reloadable backend and model settings
+
+The defaults in config.py can be overridden without touching the source,
+first by a TOML file and then by environment variables:
+
+    # cosmic_destiny.toml, or the file named by COSMIC_DESTINY_CONFIG
+    [ollama]
+    api_url = "http://gpu-host:11434/api/generate"
+    model = "deepseek-r1:14b"
+
+    [model_settings]
+    temperature = 0.7
+    num_predict = 3000
+
+    [ui]
+    analysis_slots = 4
+
+    [[model_ladder]]
+    model = "deepseek-r1:7b"
+    num_predict = 2000
+
+    COSMIC_DESTINY_OLLAMA_API_URL, COSMIC_DESTINY_OLLAMA_MODEL,
+    COSMIC_DESTINY_ANALYSIS_SLOTS, COSMIC_DESTINY_OPTION_<NAME> (e.g.
+    COSMIC_DESTINY_OPTION_NUM_PREDICT=3000)
+
+The file is parsed once and cached. Its modification time is checked at most
+every SETTINGS_CHECK_INTERVAL seconds, and a changed file is parsed again. Each
+analysis takes one immutable snapshot when it starts, so a reload changes
+the requests that follow it and never one already running. A file that
+fails to parse is reported and the previous settings stay in effect.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+try:
+    import tomllib
+except ImportError:
+    # Python before 3.11 has no tomllib; tomli offers the same interface
+    import tomli as tomllib
+
+from cosmic_destiny.config import (OLLAMA_API_URL, OLLAMA_MODEL, MODEL_SETTINGS, MODEL_LADDER,
+                                   UI_ANALYSIS_SLOTS, SETTINGS_FILE, SETTINGS_CHECK_INTERVAL)
+
+# Names the settings file itself
+SETTINGS_ENV = "COSMIC_DESTINY_CONFIG"
+
+# Prefix of environment variables overriding single generation options
+OPTION_ENV_PREFIX = "COSMIC_DESTINY_OPTION_"
+
+# One consistent set of backend settings; tier is the model ladder step the
+# model and options were taken from, see ladder.py
+BackendSettings = namedtuple("BackendSettings", ["api_url", "model", "options", "analysis_slots",
+                                                 "ladder", "tier"])
+
+logger = logging.getLogger(__name__)
+
+
+def parse_env_value(text):
+    """
+    Convert an environment variable to a number or boolean when it is one
+
+    Args:
+        text (str): The variable's value
+
+    Returns:
+        The decoded JSON value, or the text itself
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def load_settings(path):
+    """
+    Build the settings from the defaults, a TOML file and the environment
+
+    Args:
+        path (str): The TOML file; a missing file is the same as an empty one
+
+    Returns:
+        BackendSettings: The settings
+
+    Raises:
+        OSError: If the file cannot be read
+        tomllib.TOMLDecodeError: If the file is not valid TOML
+        ValueError: If a setting has an invalid value
+    """
+    data = {}
+    if path and os.path.exists(path):
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+
+    ollama = data.get("ollama", {})
+    api_url = os.environ.get("COSMIC_DESTINY_OLLAMA_API_URL", ollama.get("api_url", OLLAMA_API_URL))
+    model = os.environ.get("COSMIC_DESTINY_OLLAMA_MODEL", ollama.get("model", OLLAMA_MODEL))
+
+    options = dict(MODEL_SETTINGS)
+    options.update(data.get("model_settings", {}))
+    for key, value in os.environ.items():
+        if key.startswith(OPTION_ENV_PREFIX):
+            options[key[len(OPTION_ENV_PREFIX):].lower()] = parse_env_value(value)
+
+    ladder = data.get("model_ladder", MODEL_LADDER)
+    analysis_slots = os.environ.get("COSMIC_DESTINY_ANALYSIS_SLOTS",
+                                    data.get("ui", {}).get("analysis_slots", UI_ANALYSIS_SLOTS))
+
+    if not isinstance(api_url, str) or not api_url.startswith(("http://", "https://")):
+        raise ValueError(f"api_url must be an http(s) URL, not {api_url!r}")
+    if not isinstance(model, str) or not model:
+        raise ValueError("model must be a non-empty string")
+    try:
+        analysis_slots = int(analysis_slots)
+    except (TypeError, ValueError):
+        raise ValueError(f"analysis_slots must be a number, not {analysis_slots!r}")
+    if analysis_slots < 1:
+        raise ValueError("analysis_slots must be at least 1")
+    if not isinstance(ladder, list) or not all(
+            isinstance(step, dict) and isinstance(step.get("model"), str) and step["model"]
+            for step in ladder):
+        raise ValueError("model_ladder must be a list of tables with a model name")
+
+    return BackendSettings(api_url, model, options, analysis_slots,
+                           tuple(dict(step) for step in ladder), 0)
+
+
+class SettingsWatcher:
+    """Caches the settings and reloads them when the file changes"""
+
+    def __init__(self, path=None, interval=SETTINGS_CHECK_INTERVAL):
+        """
+        Load the settings
+
+        Args:
+            path (str): The TOML file, default COSMIC_DESTINY_CONFIG or
+                SETTINGS_FILE
+            interval (float): Minimum seconds between checks of the file
+        """
+        self.path = path or os.environ.get(SETTINGS_ENV, SETTINGS_FILE)
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.listeners = []
+        self.signature = self.file_signature()
+        self.settings = load_settings(self.path)
+        self.last_check = time.monotonic()
+
+    def file_signature(self):
+        """
+        Identify the current version of the file
+
+        Returns:
+            tuple: Modification time and size, or None without a file
+        """
+        try:
+            status = os.stat(self.path)
+        except OSError:
+            return None
+        return status.st_mtime_ns, status.st_size
+
+    def add_listener(self, callback):
+        """
+        Call a function whenever the settings are reloaded
+
+        Args:
+            callback (callable): Called with the old and new BackendSettings,
+                on the thread that noticed the change
+        """
+        self.listeners.append(callback)
+
+    def current(self):
+        """
+        Get the settings, checking the file if the interval has passed
+
+        Returns:
+            BackendSettings: The settings in effect
+        """
+        if time.monotonic() - self.last_check >= self.interval:
+            self.check()
+        return self.settings
+
+    def check(self):
+        """
+        Reload the settings if the file changed
+
+        Returns:
+            bool: Whether new settings took effect
+        """
+        with self.lock:
+            self.last_check = time.monotonic()
+            signature = self.file_signature()
+            if signature == self.signature:
+                return False
+            self.signature = signature
+
+            try:
+                settings = load_settings(self.path)
+            except (OSError, ValueError, tomllib.TOMLDecodeError) as e:
+                logger.warning(f"Keeping previous settings; {self.path} is invalid: {str(e)}")
+                return False
+
+            old, self.settings = self.settings, settings
+            logger.info(f"Reloaded settings from {self.path}")
+
+        for callback in self.listeners:
+            callback(old, settings)
+        return True
+
+
+# Watcher of the process, created on first use
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def get_watcher():
+    """
+    Get the process-wide settings watcher
+
+    Returns:
+        SettingsWatcher: The watcher
+    """
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = SettingsWatcher()
+        return _watcher
+
+
+def current_settings():
+    """
+    Get the backend settings in effect
+
+    Returns:
+        BackendSettings: The settings; take them once per request
+    """
+    return get_watcher().current()
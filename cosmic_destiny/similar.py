@@ -0,0 +1,394 @@
+"""
+Nearest-neighbour search over past readings
+
+Every archived reading is embedded as one float32 vector made of two parts:
+
+    profile   one-hot blocks of the fortune type, focus area, zodiac signs,
+              five elements phase, gender and life phases, plus the MBTI axes
+    text      hashed character bigrams of the reading, so readings that talk
+              about the same signs and themes end up close together
+
+A new profile is embedded the same way, with the text part taken from its
+attribute names, and compared against all rows with one matrix product.
+The vectors and the byte offset of each reading in the JSON lines archive
+are stored in flat files next to each other and memory-mapped:
+
+    <path>.vec    float32 rows of EMBEDDING_DIMS values
+    <path>.off    int64 archive offset of each row's record
+    <path>.json   row count, dimensions and how far the archive was indexed
+
+The archive is append-only, so the index catches up by embedding only the
+records added since the last refresh.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from cosmic_destiny.compatibility import FIVE_ELEMENTS, compute_chart
+from cosmic_destiny.library import LIBRARY_NOTE
+from cosmic_destiny.config import (SIMILAR_INDEX_PATH, SIMILAR_TEXT_DIMS, SIMILAR_TEXT_WEIGHT,
+                                   RESULT_ARCHIVE_PATH, FORTUNE_TYPES, FOCUS_AREAS,
+                                   WESTERN_ZODIACS, CHINESE_ZODIACS, LIFE_PHASES)
+
+INDEX_VERSION = 1
+
+# One-hot profile blocks: field, possible values and weight of a match
+PROFILE_BLOCKS = [
+    ("fortune_type", FORTUNE_TYPES, 1.0),
+    ("focus_area", FOCUS_AREAS, 1.5),
+    ("zodiac", WESTERN_ZODIACS, 1.0),
+    ("chinese_zodiac", CHINESE_ZODIACS, 1.0),
+    ("element", FIVE_ELEMENTS, 1.0),
+    ("gender", ["男", "女"], 0.5),
+]
+
+# Weight of each MBTI axis, stored as +1 or -1 per letter
+MBTI_WEIGHT = 0.5
+
+PROFILE_DIMS = sum(len(values) for _, values, _ in PROFILE_BLOCKS) + 4 + len(LIFE_PHASES)
+EMBEDDING_DIMS = PROFILE_DIMS + SIMILAR_TEXT_DIMS
+
+# Paragraph boundaries of a reading, for picking reference passages
+PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+
+logger = logging.getLogger(__name__)
+
+
+def profile_embedding(user_data):
+    """
+    Embed the attributes of a profile
+
+    Args:
+        user_data (dict): Dictionary containing all user information
+
+    Returns:
+        numpy.ndarray: Unit-length float32 vector of PROFILE_DIMS values
+    """
+    vector = np.zeros(PROFILE_DIMS, dtype=np.float32)
+    start = 0
+    for field, values, weight in PROFILE_BLOCKS:
+        if field == "element":
+            element = compute_chart(user_data).element
+            value = FIVE_ELEMENTS[element] if element >= 0 else None
+        else:
+            value = user_data.get(field)
+        if value in values:
+            vector[start + values.index(value)] = weight
+        start += len(values)
+
+    mbti = user_data.get("mbti", "")
+    if len(mbti) == 4:
+        vector[start:start + 4] = [MBTI_WEIGHT if letter in "ENTJ" else -MBTI_WEIGHT
+                                   for letter in mbti]
+    start += 4
+
+    for phase in user_data.get("life_phases", []):
+        if phase in LIFE_PHASES:
+            vector[start + LIFE_PHASES.index(phase)] = 0.5
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def text_embedding(text, dims=SIMILAR_TEXT_DIMS):
+    """
+    Embed a text by its hashed character bigrams
+
+    The bigrams are hashed with integer arithmetic on the code points, which
+    unlike hash() gives the same buckets in every process.
+
+    Args:
+        text (str): The text
+        dims (int): Number of hash buckets
+
+    Returns:
+        numpy.ndarray: Unit-length float32 vector of dims values
+    """
+    codes = np.frombuffer("".join(text.split()).encode("utf-32-le"), dtype=np.uint32)
+    codes = codes.astype(np.uint64)
+    buckets = (codes[:-1] * np.uint64(1000003) + codes[1:]) * np.uint64(2654435761) % np.uint64(dims)
+    # Square root dampens very frequent bigrams such as punctuation pairs
+    vector = np.sqrt(np.bincount(buckets.astype(np.int64), minlength=dims)).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def attribute_text(user_data):
+    """
+    Describe a profile's attributes as text, to compare with readings
+
+    Args:
+        user_data (dict): Dictionary containing all user information
+
+    Returns:
+        str: The attribute names
+    """
+    fields = ("fortune_type", "focus_area", "zodiac", "chinese_zodiac", "mbti")
+    return " ".join(str(user_data.get(field, "")) for field in fields)
+
+
+def embed(user_data, text):
+    """
+    Embed a profile together with a reading or a query text
+
+    Args:
+        user_data (dict): Dictionary containing all user information
+        text (str): The reading, or attribute_text for a query
+
+    Returns:
+        numpy.ndarray: Unit-length float32 vector of EMBEDDING_DIMS values
+    """
+    profile_weight = np.sqrt(1.0 - SIMILAR_TEXT_WEIGHT)
+    text_weight = np.sqrt(SIMILAR_TEXT_WEIGHT)
+    return np.concatenate([profile_embedding(user_data) * profile_weight,
+                           text_embedding(text) * text_weight])
+
+
+def redact(text, user_data):
+    """
+    Remove the names of the person a past reading was made for
+
+    Args:
+        text (str): The reading
+        user_data (dict): Profile the reading was made for
+
+    Returns:
+        str: The reading with the names replaced
+    """
+    for field in ("chinese_name", "english_name"):
+        name = user_data.get(field, "")
+        if name:
+            text = text.replace(name, "（姓名）")
+    return text
+
+
+def reference_passages(record, user_data, max_chars):
+    """
+    Pick the passages of a past reading most relevant to a new profile
+
+    Args:
+        record (dict): Archive record of the past reading
+        user_data (dict): The new profile
+        max_chars (int): Total length of the passages
+
+    Returns:
+        str: The passages in their original order, names redacted
+    """
+    paragraphs = [paragraph.strip() for paragraph in
+                  PARAGRAPH_SPLIT.split(redact(record["result"], record["user_data"]))
+                  if paragraph.strip()]
+    if not paragraphs:
+        return ""
+    query = text_embedding(attribute_text(user_data))
+    scores = np.array([text_embedding(paragraph) @ query for paragraph in paragraphs])
+
+    chosen = []
+    total = 0
+    for index in np.argsort(-scores, kind="stable"):
+        if total + len(paragraphs[index]) > max_chars:
+            continue
+        chosen.append(index)
+        total += len(paragraphs[index])
+    return "\n\n".join(paragraphs[index] for index in sorted(chosen))
+
+
+class SimilarReadings:
+    """Memory-mapped embedding index over the result archive"""
+
+    def __init__(self, path=SIMILAR_INDEX_PATH, archive_path=RESULT_ARCHIVE_PATH):
+        """
+        Open the index, discarding it if it no longer fits the archive
+
+        Args:
+            path (str): Index path without the .vec/.off/.json extension
+            archive_path (str): The JSON lines result archive
+        """
+        self.path = path
+        self.archive_path = archive_path
+        self.lock = threading.Lock()
+        self.vectors = None
+        self.offsets = None
+        self.meta = {"version": INDEX_VERSION, "dims": EMBEDDING_DIMS, "rows": 0,
+                     "indexed_bytes": 0}
+
+        try:
+            with open(path + ".json", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") == INDEX_VERSION and meta.get("dims") == EMBEDDING_DIMS:
+                self.meta = meta
+        except (OSError, ValueError):
+            pass
+
+        if self.meta["rows"]:
+            # Rows written after the last saved metadata belong to a refresh
+            # that did not finish and are dropped
+            try:
+                for extension, itemsize in ((".vec", 4 * EMBEDDING_DIMS), (".off", 8)):
+                    with open(path + extension, "r+b") as f:
+                        f.truncate(self.meta["rows"] * itemsize)
+            except OSError:
+                self.meta.update(rows=0, indexed_bytes=0)
+
+    def __len__(self):
+        """Number of indexed readings"""
+        return self.meta["rows"]
+
+    def map_files(self):
+        """Memory-map the vectors and offsets for reading"""
+        rows = self.meta["rows"]
+        if self.vectors is not None and len(self.vectors) == rows:
+            return
+        if rows == 0:
+            self.vectors = np.zeros((0, EMBEDDING_DIMS), dtype=np.float32)
+            self.offsets = np.zeros(0, dtype=np.int64)
+            return
+        self.vectors = np.memmap(self.path + ".vec", dtype=np.float32, mode="r",
+                                 shape=(rows, EMBEDDING_DIMS))
+        self.offsets = np.memmap(self.path + ".off", dtype=np.int64, mode="r", shape=(rows,))
+
+    def refresh(self):
+        """
+        Embed the records appended to the archive since the last refresh
+
+        Returns:
+            int: Number of readings added to the index
+        """
+        with self.lock:
+            try:
+                size = os.path.getsize(self.archive_path)
+            except OSError:
+                return 0
+            if size < self.meta["indexed_bytes"]:
+                # The archive was replaced; start over
+                self.meta.update(rows=0, indexed_bytes=0)
+                self.vectors = self.offsets = None
+            if size == self.meta["indexed_bytes"]:
+                return 0
+
+            vectors = []
+            offsets = []
+            position = self.meta["indexed_bytes"]
+            with open(self.archive_path, "rb") as f:
+                f.seek(position)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # Still being written; picked up next time
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        record = None
+                    # Library readings served while the backend was down are
+                    # generic, and would only point back at the library
+                    if (record and isinstance(record.get("user_data"), dict)
+                            and record.get("result")
+                            and not record["result"].startswith(LIBRARY_NOTE)):
+                        vectors.append(embed(record["user_data"], record["result"]))
+                        offsets.append(position)
+                    position += len(line)
+
+            if vectors:
+                # Data before metadata, so a crash never indexes missing rows
+                mode = "ab" if self.meta["rows"] else "wb"
+                with open(self.path + ".vec", mode) as f:
+                    f.write(np.asarray(vectors, dtype=np.float32).tobytes())
+                with open(self.path + ".off", mode) as f:
+                    f.write(np.asarray(offsets, dtype=np.int64).tobytes())
+            self.meta["rows"] += len(vectors)
+            self.meta["indexed_bytes"] = position
+            with open(self.path + ".json", "w", encoding="utf-8") as f:
+                json.dump(self.meta, f)
+            return len(vectors)
+
+    def read_record(self, offset):
+        """
+        Read one record of the archive
+
+        Args:
+            offset (int): Byte offset of its line
+
+        Returns:
+            dict: The record
+        """
+        with open(self.archive_path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def nearest(self, user_data, k=1, exclude_id=None):
+        """
+        Find the past readings closest to a profile
+
+        Args:
+            user_data (dict): Dictionary containing all user information
+            k (int): Number of readings to return
+            exclude_id (str): Id of a record to leave out, e.g. the
+                reading of the same analysis
+
+        Returns:
+            list: (cosine similarity, archive record) pairs, closest first
+        """
+        self.refresh()
+        with self.lock:
+            self.map_files()
+            if not len(self.vectors):
+                return []
+            scores = self.vectors @ embed(user_data, attribute_text(user_data))
+            count = min(len(scores), k + (exclude_id is not None))
+            best = np.argpartition(-scores, count - 1)[:count]
+            best = best[np.argsort(-scores[best], kind="stable")]
+            offsets = [int(self.offsets[index]) for index in best]
+            found_scores = [float(scores[index]) for index in best]
+
+        results = []
+        for score, offset in zip(found_scores, offsets):
+            record = self.read_record(offset)
+            if record["id"] != exclude_id:
+                results.append((score, record))
+        return results[:k]
+
+
+def main(argv=None):
+    """
+    Command line entry point to build the index or query it
+
+    Args:
+        argv (list): Command line arguments, default sys.argv
+    """
+    parser = argparse.ArgumentParser(description="CosmicDestiny similar reading index")
+    parser.add_argument("command", choices=["build", "query"])
+    parser.add_argument("--archive", default=RESULT_ARCHIVE_PATH, help="result archive")
+    parser.add_argument("--index", default=SIMILAR_INDEX_PATH, help="index path without extension")
+    parser.add_argument("--profile", help="JSON file of the profile to query with")
+    parser.add_argument("-k", type=int, default=3, help="readings to list")
+    args = parser.parse_args(argv)
+
+    index = SimilarReadings(args.index, args.archive)
+    start_time = time.perf_counter()
+    added = index.refresh()
+    print(f"{added} readings added in {time.perf_counter() - start_time:.2f} s, "
+          f"{len(index)} indexed")
+
+    if args.command == "query":
+        if not args.profile:
+            parser.error("query needs --profile")
+        with open(args.profile, encoding="utf-8") as f:
+            user_data = json.load(f)
+        start_time = time.perf_counter()
+        results = index.nearest(user_data, args.k)
+        print(f"Searched in {(time.perf_counter() - start_time) * 1000:.1f} ms")
+        for score, record in results:
+            profile = record["user_data"]
+            print(f"{score:.3f}  {record['id']}  {profile.get('fortune_type', '')} / "
+                  f"{profile.get('focus_area', '')}  {profile.get('zodiac', '')} "
+                  f"{profile.get('chinese_zodiac', '')} {profile.get('mbti', '')}")
+
+
+if __name__ == "__main__":
+    main()
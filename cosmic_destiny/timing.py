@@ -0,0 +1,190 @@
+"""
+Per-stage timing and live throughput of analyses
+
+A Spans object adds up how long each stage of one analysis takes. Stages
+are recorded under the "spans" key of the analysis metadata, in seconds, so
+they are stored with the job and the archived result. GenerationProgress
+follows a streamed generation as it runs, for progress displays.
+"""
+
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from cosmic_destiny.config import UI_PROGRESS_WINDOW
+
+# Stages of an analysis in the order they happen, with their display names
+STAGE_LABELS = {
+    "form": "讀取表單",
+    "prompt": "建立提示詞",
+    "connect": "連線與排隊",
+    "load": "載入模型",
+    "prompt_eval": "提示詞處理",
+    "generation": "生成",
+    "markdown": "Markdown 轉換",
+    "document": "建立文件",
+    "layout": "排版",
+}
+
+
+class Spans:
+    """Durations of the stages of one analysis"""
+
+    def __init__(self, durations=None):
+        """
+        Initialize the spans
+
+        Args:
+            durations (dict): Dictionary the durations are added to, or None
+                for a new one
+        """
+        self.durations = durations if durations is not None else {}
+
+    @classmethod
+    def of(cls, stats):
+        """
+        Get the spans kept in an analysis metadata dictionary
+
+        Args:
+            stats (dict): Metadata to record into, or None to record nowhere
+
+        Returns:
+            Spans: Spans writing to stats["spans"]
+        """
+        if stats is None:
+            return cls()
+        return cls(stats.setdefault("spans", {}))
+
+    def add(self, stage, seconds):
+        """
+        Add time to a stage
+
+        Args:
+            stage (str): One of the STAGE_LABELS keys
+            seconds (float): Time spent
+        """
+        self.durations[stage] = self.durations.get(stage, 0.0) + max(0.0, seconds)
+
+    @contextmanager
+    def span(self, stage):
+        """
+        Time a block of code as a stage
+
+        Args:
+            stage (str): One of the STAGE_LABELS keys
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start_time)
+
+
+def format_duration(seconds):
+    """
+    Format a duration compactly
+
+    Args:
+        seconds (float): The duration
+
+    Returns:
+        str: Milliseconds below one second, seconds otherwise
+    """
+    if seconds < 1:
+        return f"{seconds * 1000:.0f} ms"
+    return f"{seconds:.1f} s"
+
+
+def format_spans(durations):
+    """
+    Format a stage breakdown for the status bar
+
+    Args:
+        durations (dict): Seconds per stage
+
+    Returns:
+        str: Stages in order of occurrence with their durations
+    """
+    stages = [stage for stage in STAGE_LABELS if stage in durations]
+    stages += [stage for stage in durations if stage not in STAGE_LABELS]
+    return " · ".join(f"{STAGE_LABELS.get(stage, stage)} {format_duration(durations[stage])}"
+                      for stage in stages)
+
+
+class GenerationProgress:
+    """Live throughput of a streamed generation"""
+
+    def __init__(self, expected_tokens=None, budget=None, window=UI_PROGRESS_WINDOW):
+        """
+        Start tracking a generation
+
+        Args:
+            expected_tokens (int): Typical length of a reading, used for the
+                ETA, or None to use the budget
+            budget (int): The num_predict limit of the generation, or None
+            window (float): Seconds of recent history the rate is taken over
+        """
+        self.start_time = time.perf_counter()
+        self.first_token_time = None
+        self.tokens = 0
+        self.budget = budget if budget and budget > 0 else None
+        self.expected_tokens = expected_tokens or self.budget
+        if self.budget and self.expected_tokens:
+            self.expected_tokens = min(self.expected_tokens, self.budget)
+        self.window = window
+        self.history = deque()
+
+    def add(self, tokens=1, now=None):
+        """
+        Count generated tokens
+
+        Args:
+            tokens (int): Number of new tokens
+            now (float): perf_counter value, default the current time
+        """
+        now = time.perf_counter() if now is None else now
+        if self.first_token_time is None:
+            self.first_token_time = now
+        self.tokens += tokens
+        self.history.append((now, self.tokens))
+        while len(self.history) > 2 and now - self.history[0][0] > self.window:
+            self.history.popleft()
+
+    def rate(self):
+        """
+        Get the recent generation speed
+
+        Returns:
+            float: Tokens per second over the history window, or None
+        """
+        if len(self.history) < 2:
+            return None
+        (first_time, first_count), (last_time, last_count) = self.history[0], self.history[-1]
+        if last_time <= first_time:
+            return None
+        return (last_count - first_count) / (last_time - first_time)
+
+    def snapshot(self, now=None):
+        """
+        Summarize the progress for display
+
+        Args:
+            now (float): perf_counter value, default the current time
+
+        Returns:
+            dict: tokens, budget, ttft, rate and eta; unknown values are None
+        """
+        now = time.perf_counter() if now is None else now
+        rate = self.rate()
+        eta = None
+        if rate and self.expected_tokens:
+            eta = max(0.0, self.expected_tokens - self.tokens) / rate
+        return {
+            "elapsed": now - self.start_time,
+            "tokens": self.tokens,
+            "budget": self.budget,
+            "ttft": (self.first_token_time - self.start_time
+                     if self.first_token_time is not None else None),
+            "rate": rate,
+            "eta": eta,
+        }
@@ -2,11 +2,23 @@
 UI package initialization
 """
 
-# Package imports
-from cosmic_destiny.ui.main_window import MainWindow
-from cosmic_destiny.ui.input_tab import InputTab
-from cosmic_destiny.ui.result_tab import ResultTab
-from cosmic_destiny.ui.loading_overlay import LoadingOverlay
+import importlib
+
+# Package exports, imported on first access to keep startup fast
+_LAZY_EXPORTS = {
+    "MainWindow": "cosmic_destiny.ui.main_window",
+    "InputTab": "cosmic_destiny.ui.input_tab",
+    "ResultTab": "cosmic_destiny.ui.result_tab",
+    "LoadingOverlay": "cosmic_destiny.ui.loading_overlay",
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+def __getattr__(name):
+    """Import exported widgets on first access"""
+    if name in _LAZY_EXPORTS:
+        return getattr(importlib.import_module(_LAZY_EXPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Version information
 __version__ = "1.0.0"
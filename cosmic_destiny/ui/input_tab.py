@@ -7,7 +7,7 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                             QGroupBox, QFormLayout, QRadioButton, QScrollArea,
                             QCheckBox, QGridLayout)
 from PyQt6.QtCore import Qt, QDate
-from config import (CHINESE_ZODIACS, WESTERN_ZODIACS, MBTI_TYPES, 
+from cosmic_destiny.config import (CHINESE_ZODIACS, WESTERN_ZODIACS, MBTI_TYPES, 
                   FORTUNE_TYPES, FOCUS_AREAS, LIFE_PHASES)
 
 class InputTab(QWidget):
@@ -43,22 +43,8 @@ class InputTab(QWidget):
         
         # Generate Button
         self.generate_btn = QPushButton("生成命理分析")
+        self.generate_btn.setObjectName("generateButton")
         self.generate_btn.setMinimumHeight(50)
-        self.generate_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #4a7dff;
-                color: white;
-                font-size: 16px;
-                font-weight: bold;
-                border-radius: 5px;
-            }
-            QPushButton:hover {
-                background-color: #3a6eee;
-            }
-            QPushButton:pressed {
-                background-color: #2a5fdd;
-            }
-        """)
         scroll_layout.addWidget(self.generate_btn)
         
         # Set scroll area widget
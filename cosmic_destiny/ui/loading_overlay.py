@@ -2,10 +2,56 @@
 Loading overlay with animation
 """
 
+import time
 from PyQt6.QtWidgets import QWidget, QLabel, QVBoxLayout
 from PyQt6.QtCore import Qt, QTimer, QSize
 from PyQt6.QtGui import QMovie, QFont
 
+def format_seconds(seconds):
+    """
+    Format a wait for display
+    
+    Args:
+        seconds (float): The duration
+        
+    Returns:
+        str: Seconds, or minutes and seconds from one minute on
+    """
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds} 秒"
+    return f"{seconds // 60} 分 {seconds % 60:02d} 秒"
+
+def format_progress(snapshot, waited, since_snapshot=0.0):
+    """
+    Describe generation progress
+    
+    Args:
+        snapshot (dict): GenerationProgress snapshot, or None before any
+        waited (float): Seconds since the generation started
+        since_snapshot (float): Seconds since the snapshot was taken, used
+            to count the ETA down between updates
+        
+    Returns:
+        str: Two lines of progress text
+    """
+    if snapshot is None or not snapshot["tokens"]:
+        return f"等待模型回應，已等待 {format_seconds(waited)}"
+    
+    first_line = f"首個 token {snapshot['ttft']:.1f} 秒"
+    if snapshot["rate"]:
+        first_line += f" · 生成速度 {snapshot['rate']:.1f} tokens/秒"
+    
+    second_line = f"已生成 {snapshot['tokens']}"
+    if snapshot["budget"]:
+        second_line += f" / {snapshot['budget']}"
+    second_line += " tokens"
+    if snapshot["eta"] is not None:
+        remaining = snapshot["eta"] - since_snapshot
+        second_line += (f" · 預計剩餘約 {format_seconds(remaining)}" if remaining >= 1
+                        else " · 即將完成")
+    return f"{first_line}\n{second_line}"
+
 class LoadingOverlay(QWidget):
     """Semi-transparent loading overlay with animation"""
     
@@ -22,11 +68,15 @@ class LoadingOverlay(QWidget):
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
         self.setAttribute(Qt.WidgetAttribute.WA_StyledBackground)
-        self.setStyleSheet("background-color: rgba(0, 0, 0, 150);")
+        self.setObjectName("loadingOverlay")
         
         # Hide by default
         self.hide()
         
+        # In compact mode only a strip along the bottom is covered, leaving
+        # a preview of the result readable above it
+        self.compact = False
+        
         # Initialize UI elements
         self.init_ui()
     
@@ -38,6 +88,7 @@ class LoadingOverlay(QWidget):
         
         # Create label for the loading animation
         self.animation_label = QLabel()
+        self.animation_label.setObjectName("loadingAnimation")
         self.animation_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
         # Initialize animation
@@ -59,7 +110,6 @@ class LoadingOverlay(QWidget):
             # If no animation file found, use simple text animation
             self.movie = None
             self.animation_label.setText("處理中...")
-            self.animation_label.setStyleSheet("color: white; font-size: 16pt;")
         else:
             self.movie.setScaledSize(QSize(100, 100))
             self.animation_label.setMovie(self.movie)
@@ -68,6 +118,7 @@ class LoadingOverlay(QWidget):
         
         # Create label for loading text
         self.text_label = QLabel()
+        self.text_label.setObjectName("loadingText")
         self.text_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.text_label.setWordWrap(True)
         
@@ -76,10 +127,24 @@ class LoadingOverlay(QWidget):
         font.setPointSize(12)
         font.setBold(True)
         self.text_label.setFont(font)
-        self.text_label.setStyleSheet("color: white;")
         
         layout.addWidget(self.text_label)
         
+        # Label for live generation statistics, shown once generation starts
+        self.stats_label = QLabel()
+        self.stats_label.setObjectName("loadingStats")
+        self.stats_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.stats_label.hide()
+        layout.addWidget(self.stats_label)
+        
+        # Latest progress snapshot; the timer refreshes the waiting time and
+        # ETA between snapshots, so the label changes at most once a second
+        self.progress_start = 0.0
+        self.progress_snapshot = None
+        self.progress_snapshot_time = 0.0
+        self.progress_timer = QTimer(self)
+        self.progress_timer.timeout.connect(self.refresh_progress)
+        
         # Initialize animation dots
         self.dots_count = 0
         self.dots_timer = QTimer(self)
@@ -103,7 +168,7 @@ class LoadingOverlay(QWidget):
             self.dots_timer.start(500)  # Update every 500ms
         
         # Update size and position
-        self.resize(self.parent().size())
+        self.fit_parent()
         
         # Show the overlay
         self.show()
@@ -117,8 +182,61 @@ class LoadingOverlay(QWidget):
         else:
             self.dots_timer.stop()
         
+        self.progress_timer.stop()
+        self.stats_label.hide()
+        
         # Hide the overlay
         self.hide()
+        self.set_compact(False)
+    
+    def set_compact(self, compact):
+        """
+        Switch between covering the parent and covering a bottom strip
+        
+        Args:
+            compact (bool): Whether to cover only a strip along the bottom
+        """
+        self.compact = compact
+        self.animation_label.setVisible(not compact)
+        self.fit_parent()
+    
+    def fit_parent(self):
+        """Cover the parent widget, or a strip along its bottom in compact mode"""
+        if not self.parent():
+            return
+        area = self.parent().rect()
+        if self.compact:
+            height = min(area.height(), self.sizeHint().height())
+            area.setTop(area.bottom() - height + 1)
+        if self.geometry() != area:
+            self.setGeometry(area)
+    
+    def begin_progress(self):
+        """Start showing live statistics of a generation"""
+        self.progress_start = time.monotonic()
+        self.progress_snapshot = None
+        self.stats_label.show()
+        self.progress_timer.start(1000)
+        self.refresh_progress()
+    
+    def update_progress(self, snapshot):
+        """
+        Show a new progress snapshot
+        
+        Args:
+            snapshot (dict): GenerationProgress snapshot
+        """
+        self.progress_snapshot = snapshot
+        self.progress_snapshot_time = time.monotonic()
+        self.refresh_progress()
+    
+    def refresh_progress(self):
+        """Update the statistics label if its text changed"""
+        now = time.monotonic()
+        text = format_progress(self.progress_snapshot, now - self.progress_start,
+                               now - self.progress_snapshot_time)
+        if text != self.stats_label.text():
+            self.stats_label.setText(text)
     
     def update_dots(self):
         """Update the dots animation"""
@@ -128,7 +246,5 @@ class LoadingOverlay(QWidget):
     
     def resizeEvent(self, event):
         """Handle resize events to ensure the overlay covers the parent widget"""
-        # Resize the overlay to match the parent size
-        if self.parent():
-            self.resize(self.parent().size())
+        self.fit_parent()
         super().resizeEvent(event)
\ No newline at end of file
@@ -8,15 +8,29 @@ import logging
 from datetime import datetime
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QTabWidget, 
                             QMessageBox, QFileDialog, QLabel)
-from PyQt6.QtCore import Qt, QSettings
+from PyQt6.QtCore import Qt, QSettings, QTimer, QThreadPool
 from PyQt6.QtGui import QIcon, QPixmap
 
-from ui.input_tab import InputTab
-from ui.result_tab import ResultTab
-from ui.loading_overlay import LoadingOverlay
-from analyzer import DestinyAnalyzer
-from worker import AnalysisWorker
-from config import APP_NAME, UI_WINDOW_WIDTH, UI_WINDOW_HEIGHT
+from cosmic_destiny.ui.input_tab import InputTab
+from cosmic_destiny.analyzer import DestinyAnalyzer
+from cosmic_destiny.worker import AnalysisTask, PreviewTask
+from cosmic_destiny.archive import ResultArchive, record_from_job, render_report
+from cosmic_destiny.timing import Spans, format_spans
+from cosmic_destiny.settings import get_watcher
+from cosmic_destiny.ladder import get_ladder
+from cosmic_destiny.job_queue import (JobQueue, PRIORITY_INTERACTIVE, STATUS_QUEUED,
+                                      STATUS_RUNNING, STATUS_DONE, STATUS_FAILED,
+                                      STATUS_CANCELLED)
+from cosmic_destiny.config import (APP_NAME, UI_WINDOW_WIDTH, UI_WINDOW_HEIGHT,
+                                   SETTINGS_CHECK_INTERVAL, UI_CLOSE_TIMEOUT)
+
+# Status shown in the title of each result sub-tab
+STATUS_LABELS = {
+    STATUS_QUEUED: "排隊中",
+    STATUS_RUNNING: "分析中",
+    STATUS_DONE: "完成",
+    STATUS_FAILED: "失敗",
+}
 
 class MainWindow(QMainWindow):
     """Main application window"""
@@ -25,13 +39,37 @@ class MainWindow(QMainWindow):
         """Initialize the main window"""
         super().__init__()
         
-        # Set up logging
-        logging.basicConfig(level=logging.INFO, 
-                           format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         self.logger = logging.getLogger(__name__)
         
-        # Initialize analyzer
+        # Initialize analyzer and the persistent job queue
         self.analyzer = DestinyAnalyzer()
+        self.job_queue = JobQueue()
+        self.result_archive = ResultArchive()
+        
+        # Bounded pool running the analyses; extra submissions wait in it
+        self.analysis_pool = QThreadPool()
+        self.analysis_pool.setMaxThreadCount(get_watcher().current().analysis_slots)
+        self.analysis_tasks = {}
+        self.analyses_abandoned = False
+        
+        # Previews are looked up one at a time beside the analyses, since the
+        # first lookup may index the whole result archive
+        self.preview_pool = QThreadPool()
+        self.preview_pool.setMaxThreadCount(1)
+        self.preview_tasks = {}
+        
+        # Jobs waiting for a pool slot, which tells the model ladder the load
+        self.waiting_jobs = set()
+        
+        # Reload the backend settings when their file changes; running
+        # analyses keep the settings they started with
+        self.settings_timer = QTimer(self)
+        self.settings_timer.timeout.connect(self.check_settings)
+        self.settings_timer.start(int(SETTINGS_CHECK_INTERVAL * 1000))
+        
+        # Result sub-tab and display name of each job
+        self.job_tabs = {}
+        self.job_names = {}
         
         # Set up UI
         self.init_ui()
@@ -42,6 +80,9 @@ class MainWindow(QMainWindow):
         # Load settings
         self.load_settings()
         
+        # Pick up analyses left over from the last session once shown
+        QTimer.singleShot(0, self.reattach_jobs)
+        
     def init_ui(self):
         """Initialize the user interface"""
         # Set window properties
@@ -77,121 +118,318 @@ class MainWindow(QMainWindow):
         self.input_tab = InputTab()
         self.tab_widget.addTab(self.input_tab, "個人資料輸入")
         
-        # Create result tab
-        self.result_tab = ResultTab()
-        self.tab_widget.addTab(self.result_tab, "命理分析結果")
-        
-        # Create loading overlay
-        self.loading_overlay = LoadingOverlay(self)
+        # Create result tab holding one closable sub-tab per analysis
+        self.result_tabs = QTabWidget()
+        self.result_tabs.setTabsClosable(True)
+        self.result_tabs.setDocumentMode(True)
+        self.tab_widget.addTab(self.result_tabs, "命理分析結果")
         
     def connect_signals(self):
         """Connect UI signals to slots"""
         # Connect generate button to analysis function
         self.input_tab.generate_btn.clicked.connect(self.start_analysis)
         
-        # Connect save button to save function
-        self.result_tab.save_btn.clicked.connect(self.save_result)
+        # Closing a result sub-tab cancels its analysis
+        self.result_tabs.tabCloseRequested.connect(self.close_result_tab)
         
+    def check_settings(self):
+        """Apply changed backend settings to the analysis pool"""
+        if not get_watcher().check():
+            return
+        slots = get_watcher().current().analysis_slots
+        if slots != self.analysis_pool.maxThreadCount():
+            # Lowering the count lets running analyses finish; only queued
+            # ones wait longer
+            self.analysis_pool.setMaxThreadCount(slots)
+            self.logger.info(f"Analysis slots set to {slots}")
+        self.statusBar().showMessage("已重新載入設定", 5000)
+    
     def start_analysis(self):
-        """Start the analysis process in a separate thread"""
+        """Queue an analysis in the analysis pool"""
         # Validate input
         if not self.input_tab.chinese_name.text():
             QMessageBox.warning(self, "缺少資訊", "請輸入您的中文姓名")
             return
             
         # Collect user data
-        user_data = self.input_tab.get_user_data()
+        spans = Spans()
+        with spans.span("form"):
+            user_data = self.input_tab.get_user_data()
+        
+        # Queue the job ahead of batch work; the user retries failures themselves
+        job_id = self.job_queue.submit(user_data, priority=PRIORITY_INTERACTIVE,
+                                       source="gui", max_attempts=1,
+                                       metadata={"spans": spans.durations})
+        self.run_job(job_id, user_data)
+        
+    def open_result_tab(self, job_id, user_data):
+        """
+        Add a result sub-tab for a job and select it
         
-        # Switch to results tab
+        Args:
+            job_id (str): The job shown in the tab
+            user_data (dict): Profile the job analyses, used for the title
+            
+        Returns:
+            ResultTab: The new result tab
+        """
+        from cosmic_destiny.ui.result_tab import ResultTab
+        
+        result_tab = ResultTab()
+        result_tab.save_btn.clicked.connect(self.save_result)
+        result_tab.render_timed.connect(
+            lambda durations: self.on_render_timed(job_id, durations))
+        self.job_tabs[job_id] = result_tab
+        self.job_names[job_id] = user_data.get("chinese_name") or "未命名"
+        
+        self.result_tabs.addTab(result_tab, self.job_names[job_id])
+        self.result_tabs.setCurrentWidget(result_tab)
         self.tab_widget.setCurrentIndex(1)
+        return result_tab
+        
+    def set_job_status(self, job_id, status):
+        """
+        Show the status of a job in its sub-tab title
+        
+        Args:
+            job_id (str): The job to update
+            status (str): One of the STATUS_LABELS keys
+        """
+        result_tab = self.job_tabs.get(job_id)
+        if result_tab is None:
+            return
+        
+        index = self.result_tabs.indexOf(result_tab)
+        self.result_tabs.setTabText(index, f"{self.job_names[job_id]}（{STATUS_LABELS[status]}）")
+        
+    def run_job(self, job_id, user_data):
+        """
+        Run or reattach to a queued job in the analysis pool
+        
+        Jobs beyond the pool size wait inside the pool until a slot frees up.
+        
+        Args:
+            job_id (str): The job to run
+            user_data (dict): Profile the job analyses
+        """
+        result_tab = self.open_result_tab(job_id, user_data)
+        result_tab.loading_overlay.start_loading("排隊等候中，將在前一項分析完成後開始...")
+        self.set_job_status(job_id, STATUS_QUEUED)
+        
+        # Look up a preview to show until the result arrives
+        preview_task = PreviewTask(self.analyzer, job_id, user_data)
+        preview_task.signals.preview_ready.connect(self.on_preview_ready)
+        self.preview_tasks[job_id] = preview_task
+        self.preview_pool.start(preview_task)
+        
+        # Create the task for the analysis pool
+        task = AnalysisTask(self.analyzer, self.job_queue, job_id, self.result_archive)
+        task.signals.analysis_started.connect(self.on_analysis_started)
+        task.signals.analysis_progress.connect(self.on_analysis_progress)
+        task.signals.analysis_complete.connect(self.on_analysis_complete)
+        task.signals.analysis_error.connect(self.on_analysis_error)
+        self.analysis_tasks[job_id] = task
+        self.analysis_pool.start(task)
+        self.set_waiting(job_id, True)
+        
+    def set_waiting(self, job_id, waiting):
+        """
+        Track whether a job waits for a pool slot and report the queue depth
+        
+        Args:
+            job_id (str): The job
+            waiting (bool): Whether it is still waiting
+        """
+        if waiting:
+            self.waiting_jobs.add(job_id)
+        else:
+            self.waiting_jobs.discard(job_id)
+        get_ladder().observe_depth(len(self.waiting_jobs))
+        
+    def reattach_jobs(self):
+        """Resume or show the analyses not seen in a previous session"""
+        self.job_queue.recover_stale()
+        jobs = self.job_queue.list_jobs(source="gui", undelivered=True)
+        if not jobs:
+            return
+        
+        self.statusBar().showMessage("已恢復上次未完成的命理分析", 5000)
+        
+        # Oldest first, so the tabs keep the order they were started in
+        for job in reversed(jobs):
+            if job["id"] in self.job_tabs:
+                continue
+            self.logger.info(f"Reattaching to job {job['id']} ({job['status']})")
+            
+            if job["status"] == STATUS_DONE:
+                self.open_result_tab(job["id"], job["user_data"])
+                self.on_analysis_complete(job["id"], job["result"])
+            elif job["status"] in (STATUS_FAILED, STATUS_CANCELLED):
+                self.job_queue.mark_delivered(job["id"])
+            else:
+                self.run_job(job["id"], job["user_data"])
         
-        # Show loading overlay
-        self.loading_overlay.start_loading("正在生成命理分析結果，請稍候...")
+    def on_preview_ready(self, job_id, label, text):
+        """
+        Show the preview of an analysis that is still running
         
-        # Create worker thread for analysis
-        self.worker = AnalysisWorker(self.analyzer, user_data)
-        self.worker.analysis_complete.connect(self.on_analysis_complete)
-        self.worker.analysis_error.connect(self.on_analysis_error)
-        self.worker.start()
+        Args:
+            job_id (str): The job the preview is for
+            label (str): What the preview is, empty if there is none
+            text (str): The preview reading
+        """
+        self.preview_tasks.pop(job_id, None)
+        result_tab = self.job_tabs.get(job_id)
+        # The result may have arrived or the tab been closed in the meantime
+        if label and result_tab is not None and job_id in self.analysis_tasks:
+            result_tab.show_preview(label, text)
         
-    def on_analysis_complete(self, result):
+    def on_analysis_started(self, job_id):
+        """Show that a queued analysis got a slot in the pool"""
+        self.set_waiting(job_id, False)
+        result_tab = self.job_tabs.get(job_id)
+        if result_tab is None:
+            return
+        
+        result_tab.loading_overlay.start_loading("正在生成命理分析結果，請稍候...")
+        result_tab.loading_overlay.begin_progress()
+        self.set_job_status(job_id, STATUS_RUNNING)
+        
+    def on_analysis_progress(self, job_id, snapshot):
+        """
+        Show the generation progress of a running analysis
+        
+        Args:
+            job_id (str): The running job
+            snapshot (dict): GenerationProgress snapshot
+        """
+        result_tab = self.job_tabs.get(job_id)
+        if result_tab is not None:
+            result_tab.loading_overlay.update_progress(snapshot)
+        
+    def on_analysis_complete(self, job_id, result):
         """Handle the completion of analysis"""
-        # Stop loading animation
-        self.loading_overlay.stop_loading()
+        self.analysis_tasks.pop(job_id, None)
+        self.set_waiting(job_id, False)
+        self.job_queue.mark_delivered(job_id)
+        
+        # The tab may have been closed in the meantime
+        result_tab = self.job_tabs.get(job_id)
+        if result_tab is None:
+            return
         
-        # Set result text
-        self.result_tab.set_result(result)
+        # Stop loading animation and set result text
+        result_tab.loading_overlay.stop_loading()
+        result_tab.set_result(result)
+        self.set_job_status(job_id, STATUS_DONE)
         
         # Log completion
-        self.logger.info("Analysis completed successfully")
+        self.logger.info(f"Analysis {job_id} completed successfully")
         
-    def on_analysis_error(self, error_message):
-        """Handle analysis errors"""
-        # Stop loading animation
-        self.loading_overlay.stop_loading()
+    def on_render_timed(self, job_id, durations):
+        """
+        Record the display stages of a finished analysis and show its breakdown
         
-        # Set error message
-        self.result_tab.set_result(f"分析過程中發生錯誤：\n\n{error_message}\n\n請確認 Ollama 服務已啟動並載入相應模型。")
+        Args:
+            job_id (str): The job whose result was displayed
+            durations (dict): Seconds spent per display stage
+        """
+        job = self.job_queue.get(job_id)
+        if job is None or job["status"] != STATUS_DONE:
+            return
+        
+        self.job_queue.update_spans(job_id, durations)
+        spans = dict(job["metadata"].get("spans", {}), **durations)
+        message = f"{self.job_names.get(job_id, '')} 分析耗時：{format_spans(spans)}"
+        if job["metadata"].get("tier"):
+            message += f"（負載較高，改用 {job['metadata']['model']}）"
+        self.statusBar().showMessage(message)
+        
+    def on_analysis_error(self, job_id, error_message):
+        """Handle analysis errors"""
+        self.analysis_tasks.pop(job_id, None)
+        self.set_waiting(job_id, False)
+        self.job_queue.mark_delivered(job_id)
         
         # Log error
-        self.logger.error(f"Analysis error: {error_message}")
+        self.logger.error(f"Analysis {job_id} error: {error_message}")
+        
+        result_tab = self.job_tabs.get(job_id)
+        if result_tab is None:
+            return
+        
+        # Stop loading animation and set error message
+        result_tab.loading_overlay.stop_loading()
+        result_tab.set_result(f"分析過程中發生錯誤：\n\n{error_message}\n\n請確認 Ollama 服務已啟動並載入相應模型。")
+        self.set_job_status(job_id, STATUS_FAILED)
+        
+    def close_result_tab(self, index):
+        """
+        Close a result sub-tab, cancelling its analysis if unfinished
+        
+        Args:
+            index (int): Index of the sub-tab
+        """
+        result_tab = self.result_tabs.widget(index)
+        job_id = next((key for key, tab in self.job_tabs.items() if tab is result_tab), None)
+        
+        if job_id is not None:
+            del self.job_tabs[job_id]
+            del self.job_names[job_id]
+            
+            task = self.analysis_tasks.get(job_id)
+            if task is not None:
+                # A task still waiting in the pool is simply dropped; a running
+                # one notices the cancellation at its next heartbeat and is
+                # released by its error handler
+                if self.analysis_pool.tryTake(task):
+                    del self.analysis_tasks[job_id]
+                    self.set_waiting(job_id, False)
+                self.job_queue.cancel(job_id)
+                self.job_queue.mark_delivered(job_id)
+                self.logger.info(f"Analysis {job_id} cancelled")
+        
+        # A running print or export finishes on its own after the tab is gone
+        result_tab.release_print_worker(self)
+        
+        self.result_tabs.removeTab(index)
+        result_tab.deleteLater()
         
     def save_result(self):
-        """Save the analysis result to a file"""
+        """Save the analysis result of the current sub-tab to a file"""
+        result_tab = self.result_tabs.currentWidget()
+        job_id = next((key for key, tab in self.job_tabs.items() if tab is result_tab), None)
+        job = self.job_queue.get(job_id) if job_id is not None else None
+        if job is None or job["status"] != STATUS_DONE:
+            QMessageBox.warning(self, "無法儲存", "此分頁沒有已完成的命理分析結果")
+            return
+        
+        # The record holds the profile as submitted, not the current form
+        record = record_from_job(job)
+        
         # Get current timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         # Get the name for the filename
-        name = self.input_tab.chinese_name.text()
-        if not name:
-            name = "unnamed"
+        name = record["user_data"].get("chinese_name") or "unnamed"
         
         # Default filename
         default_filename = f"{name}_命理分析_{timestamp}.txt"
         
         # Open file dialog
-        options = QFileDialog.Options()
-        filename, _ = QFileDialog.getSaveFileName(
+        filename, selected_filter = QFileDialog.getSaveFileName(
             self, "儲存命理分析結果", default_filename,
-            "Text Files (*.txt);;All Files (*)", options=options
+            "Text Files (*.txt);;JSON Lines Archive (*.jsonl);;All Files (*)"
         )
         
         if filename:
             try:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    # Write header
-                    f.write(f"{APP_NAME} 命理分析報告\n")
-                    f.write(f"生成日期：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    f.write("="*50 + "\n\n")
-                    
-                    # Write personal info
-                    user_data = self.input_tab.get_user_data()
-                    f.write("個人資料：\n")
-                    f.write(f"- 姓名（中文）：{user_data['chinese_name']}\n")
-                    f.write(f"- 姓名（英文）：{user_data['english_name']}\n")
-                    f.write(f"- 性別：{user_data['gender']}\n")
-                    f.write(f"- 生辰年月日：{user_data['birth_date']}\n")
-                    f.write(f"- 出生時辰：{user_data['birth_time']}\n")
-                    f.write(f"- 星座：{user_data['zodiac']}\n")
-                    f.write(f"- 生肖：{user_data['chinese_zodiac']}\n")
-                    f.write(f"- MBTI 人格：{user_data['mbti']}\n")
-                    f.write(f"- 出生地：{user_data['birthplace']}\n\n")
-                    
-                    # Write analysis type
-                    f.write(f"分析類型：{user_data['fortune_type']}\n")
-                    f.write(f"分析重點：{user_data['focus_area']}\n\n")
-                    
-                    # Write life phases if selected
-                    if user_data.get('life_phases'):
-                        f.write("特別關注的人生階段：\n")
-                        for phase in user_data['life_phases']:
-                            f.write(f"- {phase}\n")
-                        f.write("\n")
-                    
-                    # Write analysis result
-                    f.write("命理分析結果：\n")
-                    f.write("="*50 + "\n\n")
-                    f.write(self.result_tab.result_text.toPlainText())
+                if filename.endswith(".jsonl") or selected_filter.startswith("JSON"):
+                    # Structured record, appended to an existing archive
+                    ResultArchive(filename).append(record)
+                else:
+                    with open(filename, 'w', encoding='utf-8') as f:
+                        f.write(render_report(record))
                     
                 QMessageBox.information(self, "儲存成功", f"命理分析結果已成功儲存至：\n{filename}")
                 
@@ -218,5 +456,22 @@ class MainWindow(QMainWindow):
         settings = QSettings(APP_NAME, APP_NAME)
         settings.setValue("window_geometry", self.saveGeometry())
         
+        # Waiting analyses stay queued and running ones are handed back to the
+        # queue, so the next session picks all of them up again
+        self.preview_pool.clear()
+        self.analysis_pool.clear()
+        for task in self.analysis_tasks.values():
+            task.stop()
+        
+        # A task only notices the stop at its next piece of text, and none
+        # arrives while the backend loads the model or evaluates the prompt.
+        # Wait a little, then leave such jobs to be recovered next session.
+        timeout = int(UI_CLOSE_TIMEOUT * 1000)
+        self.analyses_abandoned = not (self.analysis_pool.waitForDone(timeout) and
+                                       self.preview_pool.waitForDone(timeout))
+        if self.analyses_abandoned:
+            self.logger.info(f"Left {self.analysis_pool.activeThreadCount()} running "
+                             "analyses for the next session")
+        
         # Accept the event
         event.accept()
\ No newline at end of file
@@ -4,17 +4,61 @@ Result tab for displaying analysis results with Markdown support
 
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QTextBrowser, QPushButton, 
                             QHBoxLayout, QLabel, QFontComboBox, QComboBox,
-                            QSpinBox, QFileDialog)
-from PyQt6.QtCore import Qt, QSize
-from PyQt6.QtGui import QFont, QColor, QTextOption, QIcon
+                            QSpinBox, QFileDialog, QApplication, QProgressBar,
+                            QMessageBox)
+from PyQt6.QtCore import Qt, QSize, QTimer, QMimeData, pyqtSignal
+from PyQt6.QtGui import QFont, QColor, QTextOption, QIcon, QTextCursor
 import os
+import time
+import logging
+
+from cosmic_destiny.renderer import markdown_to_html, split_sections, append_html, prepend_html
+from cosmic_destiny.worker import RenderWorker, PrintWorker
+from cosmic_destiny.ui.loading_overlay import LoadingOverlay
+from cosmic_destiny.profiling import profiled
+from cosmic_destiny.timing import Spans
+from cosmic_destiny.ui.themes import get_theme, apply_document_theme
+from cosmic_destiny.config import (UI_RESULT_SECTION_CHARS, UI_RESULT_INITIAL_SECTIONS,
+                                   UI_RESULT_LOOKAHEAD_PAGES, UI_RESULT_MAX_SECTIONS)
+
+# Render workers still running; they are not parented to their tab, which may
+# be closed before they finish
+_running_render_workers = set()
 
 class ResultTab(QWidget):
     """Tab for displaying analysis results with Markdown support"""
     
+    # Signal carrying the seconds spent per stage once a result is displayed
+    render_timed = pyqtSignal(dict)
+    
     def __init__(self):
         """Initialize the result tab"""
         super().__init__()
+        self.logger = logging.getLogger(__name__)
+        
+        # Theme currently applied to the result view, and whether the document
+        # still has to be recolored for it once the tab is shown
+        self.current_theme = None
+        self.theme_pending = False
+        
+        # Raw text of the current result and its render generation
+        self.result_source = ""
+        self.render_generation = 0
+        
+        # Section blocks of the current result, the displayed range of them
+        # and the document position each displayed one starts at
+        self.result_sections = []
+        self.first_section = 0
+        self.rendered_sections = 0
+        self.section_starts = []
+        self.section_render_pending = False
+        
+        # Sections of the document being built and the render generation on display
+        self.render_range = (0, 0)
+        self.displayed_generation = 0
+        
+        # Worker printing or exporting the result, if any
+        self.print_worker = None
         
         # Initialize UI
         self.init_ui()
@@ -63,6 +107,7 @@ class ResultTab(QWidget):
         
         # Create result text area with Markdown support
         self.result_text = QTextBrowser()
+        self.result_text.setObjectName("resultText")
         self.result_text.setOpenExternalLinks(True)
         self.result_text.setTextInteractionFlags(
             Qt.TextInteractionFlag.TextSelectableByMouse | 
@@ -73,6 +118,11 @@ class ResultTab(QWidget):
         # Set word wrap mode
         self.result_text.setWordWrapMode(QTextOption.WrapMode.WrapAtWordBoundaryOrAnywhere)
         
+        # Render further sections as the user scrolls towards them
+        scroll_bar = self.result_text.verticalScrollBar()
+        scroll_bar.valueChanged.connect(self.schedule_section_render)
+        scroll_bar.rangeChanged.connect(self.schedule_section_render)
+        
         # Set initial formatting
         self.update_text_format()
         self.update_color_scheme()
@@ -84,318 +134,315 @@ class ResultTab(QWidget):
         
         # Create save button
         self.save_btn = QPushButton("儲存分析結果")
+        self.save_btn.setObjectName("saveButton")
         self.save_btn.setMinimumHeight(40)
-        self.save_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #4caf50;
-                color: white;
-                font-weight: bold;
-                border-radius: 5px;
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-            QPushButton:pressed {
-                background-color: #3d8b40;
-            }
-        """)
         buttons_layout.addWidget(self.save_btn)
         
         # Create copy button
         self.copy_btn = QPushButton("複製到剪貼簿")
+        self.copy_btn.setObjectName("copyButton")
         self.copy_btn.setMinimumHeight(40)
         self.copy_btn.clicked.connect(self.copy_result)
-        self.copy_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #2196F3;
-                color: white;
-                font-weight: bold;
-                border-radius: 5px;
-            }
-            QPushButton:hover {
-                background-color: #0b7dda;
-            }
-            QPushButton:pressed {
-                background-color: #0a6ebd;
-            }
-        """)
         buttons_layout.addWidget(self.copy_btn)
         
         # Create print button
         self.print_btn = QPushButton("列印分析結果")
+        self.print_btn.setObjectName("printButton")
         self.print_btn.setMinimumHeight(40)
         self.print_btn.clicked.connect(self.print_result)
-        self.print_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #607d8b;
-                color: white;
-                font-weight: bold;
-                border-radius: 5px;
-            }
-            QPushButton:hover {
-                background-color: #546e7a;
-            }
-            QPushButton:pressed {
-                background-color: #455a64;
-            }
-        """)
         buttons_layout.addWidget(self.print_btn)
         
         # Create export PDF button
         self.export_pdf_btn = QPushButton("匯出 PDF")
+        self.export_pdf_btn.setObjectName("exportPdfButton")
         self.export_pdf_btn.setMinimumHeight(40)
         self.export_pdf_btn.clicked.connect(self.export_pdf)
-        self.export_pdf_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #ff5722;
-                color: white;
-                font-weight: bold;
-                border-radius: 5px;
-            }
-            QPushButton:hover {
-                background-color: #e64a19;
-            }
-            QPushButton:pressed {
-                background-color: #d84315;
-            }
-        """)
         buttons_layout.addWidget(self.export_pdf_btn)
         
         # Add buttons layout to main layout
         main_layout.addLayout(buttons_layout)
+        
+        # Progress of a running print or PDF export
+        self.print_progress = QProgressBar()
+        self.print_progress.setTextVisible(True)
+        self.print_progress.hide()
+        main_layout.addWidget(self.print_progress)
+        
+        # Each result tab shows the progress of its own analysis
+        self.loading_overlay = LoadingOverlay(self)
+    
+    def resizeEvent(self, event):
+        """Keep the loading overlay covering the tab"""
+        self.loading_overlay.fit_parent()
+        super().resizeEvent(event)
     
+    def show_preview(self, label, text):
+        """
+        Show a provisional reading until the real result arrives
+        
+        The loading overlay shrinks to a strip so the preview stays readable;
+        the next set_result replaces the preview.
+        
+        Args:
+            label (str): What the preview is, shown above it
+            text (str): The preview reading
+        """
+        self.set_result(f"> **預覽：{label}**。個人化分析完成後將自動取代以下內容。\n\n{text}")
+        self.loading_overlay.set_compact(True)
+    
+    @profiled("set_result")
     def set_result(self, text):
         """
         Set the result text with markdown formatting
         
+        The result is split into section-sized blocks. Only the first few are
+        converted up front, on a render worker; the finished document is
+        swapped in by on_render_complete and the rest follow on scrolling.
+        
         Args:
             text (str): The analysis result text
         """
-        # Process markdown formatting
-        processed_text = self.process_markdown(text)
+        self.result_source = text
+        self.result_sections = split_sections(text, UI_RESULT_SECTION_CHARS)
+        self.start_render(0, UI_RESULT_INITIAL_SECTIONS)
+    
+    def start_render(self, first, end):
+        """
+        Build the document for a range of sections off the GUI thread
         
-        # Set HTML content
-        self.result_text.setHtml(processed_text)
+        Args:
+            first (int): First section of the document
+            end (int): Section after the last one of the document
+        """
+        self.render_generation += 1
+        self.render_range = (first, min(end, len(self.result_sections)))
+        
+        worker = RenderWorker(self.result_sections[first:end], self.result_text.font(),
+                              self.current_theme.document_stylesheet,
+                              self.render_generation, self.thread())
+        worker.render_complete.connect(self.on_render_complete)
+        worker.render_error.connect(self.on_render_error)
+        worker.finished.connect(worker.deleteLater)
+        worker.destroyed.connect(lambda: _running_render_workers.discard(worker))
+        _running_render_workers.add(worker)
+        worker.start()
     
-    def process_markdown(self, text):
+    def on_render_complete(self, document, generation, starts, durations):
         """
-        Convert markdown text to HTML for display
+        Swap a finished document into the text browser
         
         Args:
-            text (str): Markdown text
-            
-        Returns:
-            str: HTML formatted text
+            document (QTextDocument): The document built by the render worker
+            generation (int): Render generation the document belongs to
+            starts (list): Position each section of the document starts at
+            durations (dict): Seconds the render worker spent per stage
         """
-        # Simple markdown processing for headers, bold, italic, etc.
-        lines = text.split('\n')
-        html_lines = []
-        
-        in_list = False
-        in_blockquote = False
-        
-        for line in lines:
-            # Skip empty lines
-            if not line.strip():
-                if in_list:
-                    html_lines.append("</ul>")
-                    in_list = False
-                if in_blockquote:
-                    html_lines.append("</blockquote>")
-                    in_blockquote = False
-                html_lines.append("<p>&nbsp;</p>")
-                continue
-            
-            # Headers
-            if line.startswith('# '):
-                line = f"<h1>{line[2:]}</h1>"
-            elif line.startswith('## '):
-                line = f"<h2>{line[3:]}</h2>"
-            elif line.startswith('### '):
-                line = f"<h3>{line[4:]}</h3>"
-            elif line.startswith('#### '):
-                line = f"<h4>{line[5:]}</h4>"
-            elif line.startswith('##### '):
-                line = f"<h5>{line[6:]}</h5>"
-            elif line.startswith('###### '):
-                line = f"<h6>{line[7:]}</h6>"
-            
-            # Lists
-            elif line.strip().startswith('- '):
-                if not in_list:
-                    html_lines.append("<ul>")
-                    in_list = True
-                line = f"<li>{line.strip()[2:]}</li>"
-            
-            # Blockquotes
-            elif line.strip().startswith('>'):
-                if not in_blockquote:
-                    html_lines.append("<blockquote>")
-                    in_blockquote = True
-                line = f"<p>{line.strip()[1:].strip()}</p>"
-            
-            # Close lists if next line is not a list item
-            elif in_list:
-                html_lines.append("</ul>")
-                in_list = False
-                
-            # Close blockquotes if next line is not a blockquote
-            elif in_blockquote:
-                html_lines.append("</blockquote>")
-                in_blockquote = False
-                
-            # Regular paragraph
-            else:
-                line = f"<p>{line}</p>"
-            
-            # Bold (**text**)
-            line = line.replace('**', '<strong>', 1)
-            while '**' in line:
-                line = line.replace('**', '</strong>', 1)
-            
-            # Italic (*text*)
-            line = line.replace('*', '<em>', 1)
-            while '*' in line:
-                line = line.replace('*', '</em>', 1)
-            
-            # Horizontal rule
-            if line.strip() == '---':
-                line = '<hr />'
-            
-            html_lines.append(line)
+        # Drop documents for results that have since been replaced
+        if generation != self.render_generation:
+            document.deleteLater()
+            return
+        
+        # Catch up with a theme switch made while the document was being built
+        if document.defaultStyleSheet() != self.current_theme.document_stylesheet:
+            apply_document_theme(document, self.current_theme)
+        
+        # Qt only releases the browser's own initial document, so remember
+        # whether the previous one is ours to clean up
+        old_document = self.result_text.document()
+        owns_old = old_document is not None and old_document.parent() is self.result_text
+        
+        spans = Spans(durations)
+        with spans.span("layout"):
+            document.setParent(self.result_text)
+            self.result_text.setDocument(document)
+        
+        if owns_old:
+            old_document.deleteLater()
+        
+        # Fill the viewport and lookahead with further sections
+        self.displayed_generation = generation
+        self.first_section, self.rendered_sections = self.render_range
+        self.section_starts = starts
+        self.schedule_section_render()
+        self.render_timed.emit(spans.durations)
+    
+    def on_render_error(self, generation, error_message):
+        """
+        Show the result as plain text when its document could not be built
         
-        # Close any open lists
-        if in_list:
-            html_lines.append("</ul>")
+        Args:
+            generation (int): Render generation that failed
+            error_message (str): Error message from the render worker
+        """
+        if generation != self.render_generation:
+            return
+        
+        self.logger.warning(f"Showing result as plain text: {error_message}")
+        self.result_text.setPlainText(self.result_source)
+        self.displayed_generation = generation
+        self.first_section, self.rendered_sections = 0, len(self.result_sections)
+        self.section_starts = []
+    
+    def schedule_section_render(self):
+        """Queue a check for sections that have come into or gone out of view"""
+        if self.section_render_pending or self.displayed_generation != self.render_generation:
+            return
+        if self.first_section == 0 and self.rendered_sections >= len(self.result_sections):
+            return
+        
+        # Coalesce scroll and layout signals into one check per event loop pass
+        self.section_render_pending = True
+        QTimer.singleShot(0, self.render_visible_sections)
+    
+    def section_top(self, index):
+        """
+        Get where a displayed section starts in the laid out document
         
-        # Close any open blockquotes
-        if in_blockquote:
-            html_lines.append("</blockquote>")
+        Args:
+            index (int): Index of the section among the displayed ones
         
-        # Combine all HTML lines
-        html = '<div style="line-height: 1.5;">' + '\n'.join(html_lines) + '</div>'
+        Returns:
+            float: Top of the section's first block in document pixels
+        """
+        document = self.result_text.document()
+        block = document.findBlock(self.section_starts[index])
+        return document.documentLayout().blockBoundingRect(block).top()
+    
+    def keep_in_view(self, block, top):
+        """
+        Scroll along with a block after the content above it has changed
         
-        return html
+        Args:
+            block (QTextBlock): Block the reader's position is tied to
+            top (float): Top of the block before the change
+        """
+        layout = self.result_text.document().documentLayout()
+        scroll_bar = self.result_text.verticalScrollBar()
+        scroll_bar.setValue(round(scroll_bar.value() + layout.blockBoundingRect(block).top() - top))
+    
+    def render_visible_sections(self):
+        """
+        Add the next section on either side within the lookahead area
+        
+        Only UI_RESULT_MAX_SECTIONS sections are kept in the document; the
+        section furthest out of view is dropped once it is beyond the
+        lookahead area, and added again when scrolled back to.
+        """
+        self.section_render_pending = False
+        if self.displayed_generation != self.render_generation:
+            return
+        
+        scroll_bar = self.result_text.verticalScrollBar()
+        lookahead = self.result_text.viewport().height() * UI_RESULT_LOOKAHEAD_PAGES
+        document = self.result_text.document()
+        
+        # Changes above the viewport shift the content, so the scroll
+        # position follows a block next to the boundary; the boundary block
+        # itself may take over formats of the removed one
+        layout = document.documentLayout()
+        if self.rendered_sections < len(self.result_sections) and \
+                scroll_bar.maximum() - scroll_bar.value() <= lookahead:
+            html = markdown_to_html(self.result_sections[self.rendered_sections])
+            self.section_starts.append(append_html(document, html))
+            self.rendered_sections += 1
+            
+            if len(self.section_starts) > UI_RESULT_MAX_SECTIONS and \
+                    self.section_top(1) < scroll_bar.value() - lookahead:
+                removed = self.section_starts[1]
+                anchor = document.findBlock(removed).next()
+                top = layout.blockBoundingRect(anchor).top()
+                cursor = QTextCursor(document)
+                cursor.setPosition(0)
+                cursor.setPosition(removed, QTextCursor.MoveMode.KeepAnchor)
+                cursor.removeSelectedText()
+                self.section_starts = [start - removed for start in self.section_starts[1:]]
+                self.first_section += 1
+                self.keep_in_view(anchor, top)
+        
+        elif self.first_section > 0 and scroll_bar.value() <= lookahead:
+            anchor = document.begin().next()
+            top = layout.blockBoundingRect(anchor).top()
+            html = markdown_to_html(self.result_sections[self.first_section - 1])
+            added = prepend_html(document, html)
+            self.section_starts = [0] + [start + added for start in self.section_starts]
+            self.first_section -= 1
+            self.keep_in_view(anchor, top)
+            
+            if len(self.section_starts) > UI_RESULT_MAX_SECTIONS and \
+                    self.section_top(-1) > scroll_bar.value() + scroll_bar.pageStep() + lookahead:
+                cursor = QTextCursor(document)
+                cursor.setPosition(self.section_starts.pop() - 1)
+                cursor.movePosition(QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor)
+                cursor.removeSelectedText()
+                self.rendered_sections -= 1
+        
+        else:
+            return
+        
+        # The resulting layout change triggers the next check
+        self.schedule_section_render()
+    
+    def get_result_text(self):
+        """
+        Get the full text of the current result
+        
+        Returns:
+            str: The analysis result, including sections not yet displayed
+        """
+        return self.result_source
     
     def update_text_format(self):
         """Update the text format based on selected font settings"""
         font = self.font_family.currentFont()
         font.setPointSize(self.font_size.value())
+        
+        # A font change relayouts the document, so skip it when nothing changed
+        if font == self.result_text.font():
+            return
         self.result_text.setFont(font)
     
     def update_color_scheme(self):
         """Update the color scheme based on selected theme"""
-        scheme = self.color_scheme.currentText()
-        
-        if scheme == "深色模式":
-            self.result_text.setStyleSheet("""
-                QTextBrowser {
-                    background-color: #2d2d2d;
-                    color: #e0e0e0;
-                    border: 1px solid #444;
-                    border-radius: 5px;
-                    padding: 15px;
-                    selection-background-color: #4a7dff;
-                    selection-color: white;
-                }
-                QTextBrowser h1, QTextBrowser h2, QTextBrowser h3, 
-                QTextBrowser h4, QTextBrowser h5, QTextBrowser h6 {
-                    color: #bb86fc;
-                }
-                QTextBrowser a {
-                    color: #03dac6;
-                }
-                QTextBrowser blockquote {
-                    background-color: #3d3d3d;
-                    border-left: 4px solid #bb86fc;
-                    padding: 10px;
-                    margin: 10px 0;
-                }
-            """)
-        elif scheme == "暖色調":
-            self.result_text.setStyleSheet("""
-                QTextBrowser {
-                    background-color: #fff8e1;
-                    color: #5d4037;
-                    border: 1px solid #e0e0e0;
-                    border-radius: 5px;
-                    padding: 15px;
-                    selection-background-color: #ffb74d;
-                    selection-color: #5d4037;
-                }
-                QTextBrowser h1, QTextBrowser h2, QTextBrowser h3, 
-                QTextBrowser h4, QTextBrowser h5, QTextBrowser h6 {
-                    color: #ff7043;
-                }
-                QTextBrowser a {
-                    color: #ff5722;
-                }
-                QTextBrowser blockquote {
-                    background-color: #ffecb3;
-                    border-left: 4px solid #ff9800;
-                    padding: 10px;
-                    margin: 10px 0;
-                }
-            """)
-        elif scheme == "護眼模式":
-            self.result_text.setStyleSheet("""
-                QTextBrowser {
-                    background-color: #f0f7e6;
-                    color: #2e7d32;
-                    border: 1px solid #c5e1a5;
-                    border-radius: 5px;
-                    padding: 15px;
-                    selection-background-color: #aed581;
-                    selection-color: #33691e;
-                }
-                QTextBrowser h1, QTextBrowser h2, QTextBrowser h3, 
-                QTextBrowser h4, QTextBrowser h5, QTextBrowser h6 {
-                    color: #388e3c;
-                }
-                QTextBrowser a {
-                    color: #1b5e20;
-                }
-                QTextBrowser blockquote {
-                    background-color: #dcedc8;
-                    border-left: 4px solid #8bc34a;
-                    padding: 10px;
-                    margin: 10px 0;
-                }
-            """)
-        else:  # 淺色模式 (default)
-            self.result_text.setStyleSheet("""
-                QTextBrowser {
-                    background-color: #ffffff;
-                    color: #212121;
-                    border: 1px solid #e0e0e0;
-                    border-radius: 5px;
-                    padding: 15px;
-                    selection-background-color: #4a7dff;
-                    selection-color: white;
-                }
-                QTextBrowser h1, QTextBrowser h2, QTextBrowser h3, 
-                QTextBrowser h4, QTextBrowser h5, QTextBrowser h6 {
-                    color: #1976d2;
-                }
-                QTextBrowser a {
-                    color: #0277bd;
-                }
-                QTextBrowser blockquote {
-                    background-color: #f5f5f5;
-                    border-left: 4px solid #1976d2;
-                    padding: 10px;
-                    margin: 10px 0;
-                }
-            """)
+        theme = get_theme(self.color_scheme.currentText())
+        if theme is self.current_theme:
+            return
+        
+        start_time = time.perf_counter()
+        
+        # Swap the precompiled palette, which recolors the background and body
+        # text at once; the viewport needs its own copy once any stylesheet
+        # applies to the browser
+        self.current_theme = theme
+        self.result_text.setPalette(theme.palette)
+        self.result_text.viewport().setPalette(theme.palette)
+        
+        # Recolor the parsed document in place, but only once it is seen
+        if self.isVisible():
+            self.restyle_document()
+        else:
+            self.theme_pending = True
+        
+        self.logger.debug(f"Theme switched to {theme.name} in "
+                          f"{(time.perf_counter() - start_time) * 1000:.1f} ms")
+    
+    def restyle_document(self):
+        """Recolor the displayed document for the current theme"""
+        self.theme_pending = False
+        apply_document_theme(self.result_text.document(), self.current_theme)
+    
+    def showEvent(self, event):
+        """Apply a theme chosen while the tab was hidden"""
+        super().showEvent(event)
+        if self.theme_pending:
+            self.restyle_document()
     
     def copy_result(self):
         """Copy the result text to clipboard"""
-        self.result_text.selectAll()
-        self.result_text.copy()
-        # Deselect text
-        cursor = self.result_text.textCursor()
-        cursor.clearSelection()
-        self.result_text.setTextCursor(cursor)
+        # Copy from the source, since later sections may not be displayed yet
+        mime_data = QMimeData()
+        mime_data.setHtml(markdown_to_html(self.result_source))
+        mime_data.setText(self.result_source)
+        QApplication.clipboard().setMimeData(mime_data)
     
     def print_result(self):
         """Print the analysis result"""
@@ -405,11 +452,10 @@ class ResultTab(QWidget):
         dialog = QPrintDialog(printer, self)
         
         if dialog.exec() == QPrintDialog.DialogCode.Accepted:
-            self.result_text.print_(printer)
+            self.start_print(printer=printer)
     
     def export_pdf(self):
         """Export the analysis result as PDF"""
-        from PyQt6.QtPrintSupport import QPrinter
         from PyQt6.QtCore import QDateTime
         
         # Get the filename
@@ -421,7 +467,69 @@ class ResultTab(QWidget):
         )
         
         if filename:
-            printer = QPrinter(QPrinter.PrinterMode.HighResolution)
-            printer.setOutputFormat(QPrinter.OutputFormat.PdfFormat)
-            printer.setOutputFileName(filename)
-            self.result_text.print_(printer)
\ No newline at end of file
+            self.start_print(filename=filename)
+    
+    def start_print(self, printer=None, filename=None):
+        """
+        Print or export the whole result on a print worker
+        
+        Args:
+            printer (QPrinter): Printer chosen in the print dialog
+            filename (str): PDF file to export to when no printer is given
+        """
+        self.print_btn.setEnabled(False)
+        self.export_pdf_btn.setEnabled(False)
+        self.print_progress.setValue(0)
+        self.print_progress.setFormat("準備列印..." if printer is not None else "準備匯出...")
+        self.print_progress.show()
+        
+        # The worker keeps the printer; hold a reference until it is done
+        self.print_worker = PrintWorker(self.result_source, self.result_text.font(),
+                                        self.current_theme.document_stylesheet,
+                                        printer, filename, self)
+        self.print_worker.print_progress.connect(self.on_print_progress)
+        self.print_worker.print_error.connect(self.on_print_error)
+        self.print_worker.finished.connect(self.on_print_finished)
+        self.print_worker.start()
+    
+    def on_print_progress(self, done, total):
+        """Show the pages written so far"""
+        self.print_progress.setMaximum(total)
+        self.print_progress.setValue(done)
+        self.print_progress.setFormat(f"第 {done} / {total} 頁")
+    
+    def on_print_error(self, error_message):
+        """Report a failed print or export"""
+        QMessageBox.critical(self, "輸出失敗", f"列印或匯出 PDF 時發生錯誤：\n{error_message}")
+    
+    def on_print_finished(self):
+        """Restore the buttons once the print worker has stopped"""
+        self.print_progress.hide()
+        self.print_btn.setEnabled(True)
+        self.export_pdf_btn.setEnabled(True)
+        # The worker may have been handed over just before it finished
+        if self.print_worker is not None:
+            self.print_worker.deleteLater()
+            self.print_worker = None
+    
+    def release_print_worker(self, owner):
+        """
+        Hand a running print worker over, so the tab can close meanwhile
+        
+        The worker is disconnected from the tab and finishes on its own.
+        
+        Args:
+            owner (QObject): New parent of the worker until it is done
+        """
+        worker = self.print_worker
+        if worker is None:
+            return
+        self.print_worker = None
+        worker.print_progress.disconnect()
+        worker.print_error.disconnect()
+        worker.finished.disconnect()
+        worker.setParent(owner)
+        if worker.isFinished():
+            worker.deleteLater()
+        else:
+            worker.finished.connect(worker.deleteLater)
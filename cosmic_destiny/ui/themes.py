@@ -0,0 +1,157 @@
+"""
+Precompiled color themes for the result view
+
+Each theme is compiled once into a QTextDocument default stylesheet and a
+widget palette. Switching themes swaps those in and recolors the existing
+heading and blockquote blocks in place, without re-parsing any HTML. Result
+views only keep a bounded window of sections, so the recoloring stays small.
+"""
+
+from collections import namedtuple
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtGui import QPalette, QColor, QBrush, QTextCursor, QTextCharFormat, QTextFormat
+
+# Theme colors, keyed by the names shown in the theme selector
+THEME_COLORS = {
+    "淺色模式": {
+        "background": "#ffffff",
+        "text": "#212121",
+        "selection_background": "#4a7dff",
+        "selection_text": "#ffffff",
+        "heading": "#1976d2",
+        "link": "#0277bd",
+        "quote_background": "#f5f5f5",
+    },
+    "深色模式": {
+        "background": "#2d2d2d",
+        "text": "#e0e0e0",
+        "selection_background": "#4a7dff",
+        "selection_text": "#ffffff",
+        "heading": "#bb86fc",
+        "link": "#03dac6",
+        "quote_background": "#3d3d3d",
+    },
+    "暖色調": {
+        "background": "#fff8e1",
+        "text": "#5d4037",
+        "selection_background": "#ffb74d",
+        "selection_text": "#5d4037",
+        "heading": "#ff7043",
+        "link": "#ff5722",
+        "quote_background": "#ffecb3",
+    },
+    "護眼模式": {
+        "background": "#f0f7e6",
+        "text": "#2e7d32",
+        "selection_background": "#aed581",
+        "selection_text": "#33691e",
+        "heading": "#388e3c",
+        "link": "#1b5e20",
+        "quote_background": "#dcedc8",
+    },
+}
+
+DEFAULT_THEME = "淺色模式"
+
+Theme = namedtuple("Theme", ["name", "colors", "document_stylesheet", "palette"])
+
+# Compiled themes, filled on first use since palettes need a QApplication
+_compiled_themes = {}
+
+
+def compile_document_stylesheet(colors):
+    """
+    Build the QTextDocument default stylesheet for a theme
+
+    Args:
+        colors (dict): Theme colors
+
+    Returns:
+        str: CSS understood by Qt's rich text engine
+    """
+    return (
+        f"h1, h2, h3, h4, h5, h6 {{ color: {colors['heading']}; }}\n"
+        f"a {{ color: {colors['link']}; }}\n"
+        f"blockquote {{ background-color: {colors['quote_background']}; }}\n"
+    )
+
+
+def compile_palette(colors):
+    """
+    Build the widget palette for a theme
+
+    Args:
+        colors (dict): Theme colors
+
+    Returns:
+        QPalette: Palette based on the application palette
+    """
+    palette = QPalette(QApplication.palette())
+    for group in (QPalette.ColorGroup.Active, QPalette.ColorGroup.Inactive):
+        palette.setColor(group, QPalette.ColorRole.Base, QColor(colors["background"]))
+        palette.setColor(group, QPalette.ColorRole.Text, QColor(colors["text"]))
+        palette.setColor(group, QPalette.ColorRole.Highlight, QColor(colors["selection_background"]))
+        palette.setColor(group, QPalette.ColorRole.HighlightedText, QColor(colors["selection_text"]))
+        palette.setColor(group, QPalette.ColorRole.Link, QColor(colors["link"]))
+    return palette
+
+
+def get_theme(name):
+    """
+    Get a compiled theme, compiling it on first use
+
+    Args:
+        name (str): Theme name; unknown names fall back to the default theme
+
+    Returns:
+        Theme: The compiled theme
+    """
+    if name not in THEME_COLORS:
+        name = DEFAULT_THEME
+
+    theme = _compiled_themes.get(name)
+    if theme is None:
+        colors = THEME_COLORS[name]
+        theme = Theme(name, colors, compile_document_stylesheet(colors), compile_palette(colors))
+        _compiled_themes[name] = theme
+    return theme
+
+
+def apply_document_theme(document, theme):
+    """
+    Recolor an already parsed document for a theme
+
+    Only heading blocks and blockquote blocks carry theme colors; body text
+    follows the widget palette. The document stylesheet is replaced too, so
+    HTML inserted later picks up the new theme.
+
+    Args:
+        document (QTextDocument): The document to recolor
+        theme (Theme): The theme to apply
+    """
+    document.setDefaultStyleSheet(theme.document_stylesheet)
+
+    heading_format = QTextCharFormat()
+    heading_format.setForeground(QBrush(QColor(theme.colors["heading"])))
+    quote_background = QBrush(QColor(theme.colors["quote_background"]))
+
+    # Group all changes into one edit so the layout is updated once
+    cursor = QTextCursor(document)
+    cursor.beginEditBlock()
+
+    block = document.begin()
+    while block.isValid():
+        block_format = block.blockFormat()
+        if block_format.headingLevel() > 0:
+            cursor.setPosition(block.position())
+            cursor.setPosition(block.position() + block.length() - 1,
+                               QTextCursor.MoveMode.KeepAnchor)
+            cursor.mergeCharFormat(heading_format)
+        elif block_format.hasProperty(QTextFormat.Property.BackgroundBrush):
+            block_format.setBackground(quote_background)
+            cursor.setPosition(block.position())
+            cursor.setBlockFormat(block_format)
+        block = block.next()
+
+    cursor.endEditBlock()
@@ -2,47 +2,308 @@
 Worker thread for handling analysis tasks
 """
 
+import time
+import threading
 import traceback
 import logging
-from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtCore import QThread, QObject, QRunnable, pyqtSignal
 
-class AnalysisWorker(QThread):
-    """Worker thread for running analysis operations"""
+from cosmic_destiny.renderer import (markdown_to_html, build_document, append_html,
+                                     paint_document, create_pdf_writer)
+from cosmic_destiny.job_queue import (execute_job, make_owner_id, JobInterrupted,
+                                      STATUS_QUEUED, STATUS_RUNNING, STATUS_DONE)
+from cosmic_destiny.profiling import profiled
+from cosmic_destiny.timing import Spans, GenerationProgress
+from cosmic_destiny.config import (JOB_HEARTBEAT_INTERVAL, JOB_STALE_AFTER,
+                                   UI_PROGRESS_INTERVAL, UI_PROGRESS_HISTORY)
+
+class AnalysisSignals(QObject):
+    """Signals of an analysis task, which cannot carry signals itself"""
     
-    # Signal for when analysis is complete
-    analysis_complete = pyqtSignal(str)
+    # Signal for when the job starts running in the pool
+    analysis_started = pyqtSignal(str)
     
-    # Signal for when an error occurs
-    analysis_error = pyqtSignal(str)
+    # Signal with the job id and a GenerationProgress snapshot, rate-limited
+    analysis_progress = pyqtSignal(str, dict)
+    
+    # Signal for when analysis is complete, with the job id and result
+    analysis_complete = pyqtSignal(str, str)
+    
+    # Signal for when an error occurs, with the job id and message
+    analysis_error = pyqtSignal(str, str)
+
+
+class AnalysisTask(QRunnable):
+    """Pool task for running a queued analysis job"""
     
-    def __init__(self, analyzer, user_data):
+    def __init__(self, analyzer, job_queue, job_id, archive=None):
         """
-        Initialize the worker
+        Initialize the task
+        
+        Create the task in the GUI thread so its signals are delivered there.
         
         Args:
             analyzer (DestinyAnalyzer): The analyzer instance to use
-            user_data (dict): Dictionary containing user information
+            job_queue (JobQueue): The queue holding the job
+            job_id (str): The job to run or reattach to
+            archive (ResultArchive): Archive the finished result is appended to
         """
         super().__init__()
         self.analyzer = analyzer
-        self.user_data = user_data
+        self.job_queue = job_queue
+        self.job_id = job_id
+        self.archive = archive
+        self.signals = AnalysisSignals()
+        self.stop_event = threading.Event()
+        self.progress = None
+        self.last_progress_time = 0.0
         self.logger = logging.getLogger(__name__)
+        
+        # The owner keeps the task until its signals have been handled
+        self.setAutoDelete(False)
+    
+    def stop(self):
+        """Hand the job back to the queue at its next piece of text"""
+        self.stop_event.set()
+    
+    def on_chunk(self, text):
+        """
+        Count a streamed token and report progress at most every interval
+        
+        Args:
+            text (str): The piece of text, one token from Ollama
+        """
+        now = time.perf_counter()
+        self.progress.add(1, now)
+        if now - self.last_progress_time >= UI_PROGRESS_INTERVAL:
+            self.last_progress_time = now
+            self.signals.analysis_progress.emit(self.job_id, self.progress.snapshot(now))
     
     def run(self):
-        """Run the analysis in a separate thread"""
+        """Run the analysis on a pool thread"""
         try:
-            self.logger.info("Starting analysis in worker thread")
+            self.logger.info(f"Starting job {self.job_id} in analysis pool")
+            self.signals.analysis_started.emit(self.job_id)
             
-            # Run the analysis
-            result = self.analyzer.analyze(self.user_data)
+            # Run the job here, or follow it if another process already runs it
+            owner = make_owner_id()
+            job = self.job_queue.claim(owner, self.job_id)
+            if job is not None:
+                result = self.execute(job, owner)
+            else:
+                result = self.wait_for_job(owner)
             
             # Emit the complete signal with the result
-            self.analysis_complete.emit(result)
+            self.signals.analysis_complete.emit(self.job_id, result)
+            
+        except JobInterrupted:
+            self.logger.info(f"Job {self.job_id} left for the next session")
             
         except Exception as e:
             # Log the error
-            self.logger.error(f"Error in analysis worker: {str(e)}")
+            self.logger.error(f"Error in analysis task: {str(e)}")
             self.logger.error(traceback.format_exc())
             
             # Emit the error signal
-            self.analysis_error.emit(str(e))
\ No newline at end of file
+            self.signals.analysis_error.emit(self.job_id, str(e))
+    
+    def execute(self, job, owner):
+        """
+        Run a claimed job here, reporting its progress
+        
+        Args:
+            job (dict): The claimed job
+            owner (str): Id the job was claimed with
+            
+        Returns:
+            str: The analysis result
+        """
+        self.progress = GenerationProgress(
+            self.job_queue.typical_token_count(UI_PROGRESS_HISTORY),
+            self.analyzer.current_settings().options.get("num_predict"))
+        return execute_job(self.job_queue, job, self.analyzer, owner, on_chunk=self.on_chunk,
+                           stop_event=self.stop_event, archive=self.archive)
+    
+    def wait_for_job(self, owner):
+        """
+        Follow a job that is not ours to run until it finishes
+        
+        If the job is abandoned or becomes claimable again, it is taken
+        over and run here.
+        
+        Args:
+            owner (str): Id to claim the job with
+            
+        Returns:
+            str: The analysis result
+            
+        Raises:
+            JobInterrupted: If the task was stopped while waiting
+            Exception: If the job failed or was cancelled
+        """
+        while True:
+            job = self.job_queue.get(self.job_id)
+            if job is None:
+                raise Exception("找不到此分析工作")
+            
+            if job["status"] == STATUS_DONE:
+                return job["result"]
+            
+            if job["status"] == STATUS_RUNNING and \
+                    time.time() - job["heartbeat_at"] > JOB_STALE_AFTER:
+                self.job_queue.recover_stale()
+                continue
+            
+            if job["status"] == STATUS_QUEUED:
+                claimed = self.job_queue.claim(owner, self.job_id)
+                if claimed is not None:
+                    return self.execute(claimed, owner)
+            
+            elif job["status"] != STATUS_RUNNING:
+                raise Exception(job["error"] or "分析已取消")
+            
+            if self.stop_event.wait(JOB_HEARTBEAT_INTERVAL):
+                raise JobInterrupted(self.job_id)
+
+
+class PreviewSignals(QObject):
+    """Signals of a preview task"""
+    
+    # Signal with the job id, the preview label and its text; both are empty
+    # when there is no preview
+    preview_ready = pyqtSignal(str, str, str)
+
+
+class PreviewTask(QRunnable):
+    """Pool task looking up the preview of a submitted analysis"""
+    
+    def __init__(self, analyzer, job_id, user_data):
+        """
+        Initialize the task
+        
+        Create the task in the GUI thread so its signals are delivered there.
+        
+        Args:
+            analyzer (DestinyAnalyzer): The analyzer instance to use
+            job_id (str): The job the preview is for
+            user_data (dict): Profile the job analyses
+        """
+        super().__init__()
+        self.analyzer = analyzer
+        self.job_id = job_id
+        self.user_data = user_data
+        self.signals = PreviewSignals()
+        self.logger = logging.getLogger(__name__)
+        
+        # The owner keeps the task until its signal has been handled
+        self.setAutoDelete(False)
+    
+    def run(self):
+        """Look the preview up on a pool thread"""
+        try:
+            preview = self.analyzer.preview(self.user_data)
+        except Exception as e:
+            self.logger.error(f"Error looking up preview: {str(e)}")
+            preview = None
+        label, text = preview if preview is not None else ("", "")
+        self.signals.preview_ready.emit(self.job_id, label, text)
+
+
+class RenderWorker(QThread):
+    """Worker thread for converting result sections into a QTextDocument"""
+    
+    # Signal carrying the finished document, its render generation, the
+    # position each section starts at and the seconds spent per stage
+    render_complete = pyqtSignal(object, int, list, dict)
+    
+    # Signal for when an error occurs, with the render generation and message
+    render_error = pyqtSignal(int, str)
+    
+    def __init__(self, sections, font, stylesheet, generation, target_thread, parent=None):
+        """
+        Initialize the worker
+        
+        Args:
+            sections (list): Markdown sections of the analysis result
+            font (QFont): Default font for the document
+            stylesheet (str): Default CSS of the current theme
+            generation (int): Render generation, used to drop stale results
+            target_thread (QThread): Thread the finished document is moved to
+            parent (QObject): Parent object owning the worker
+        """
+        super().__init__(parent)
+        self.sections = sections
+        self.font = font
+        self.stylesheet = stylesheet
+        self.generation = generation
+        self.target_thread = target_thread
+        self.logger = logging.getLogger(__name__)
+    
+    @profiled("render_document")
+    def run(self):
+        """Convert the markdown and build the document in a separate thread"""
+        try:
+            spans = Spans()
+            with spans.span("markdown"):
+                html = [markdown_to_html(section) for section in self.sections]
+            
+            # Add the sections one by one, as the view does, to know where each starts
+            with spans.span("document"):
+                document = build_document(html[0] if html else "", self.font, self.stylesheet)
+                starts = [0] + [append_html(document, part) for part in html[1:]]
+            
+            # Hand the document over to the GUI thread before emitting
+            document.moveToThread(self.target_thread)
+            self.render_complete.emit(document, self.generation, starts, spans.durations)
+            
+        except Exception as e:
+            self.logger.error(f"Error in render worker: {str(e)}")
+            self.logger.error(traceback.format_exc())
+            self.render_error.emit(self.generation, str(e))
+
+
+class PrintWorker(QThread):
+    """Worker thread for printing a result or exporting it as PDF"""
+    
+    # Signal carrying the pages done and the total number of pages
+    print_progress = pyqtSignal(int, int)
+    
+    # Signal for when every page has been written
+    print_complete = pyqtSignal()
+    
+    # Signal for when an error occurs
+    print_error = pyqtSignal(str)
+    
+    def __init__(self, text, font, stylesheet, printer=None, filename=None, parent=None):
+        """
+        Initialize the worker
+        
+        Args:
+            text (str): Markdown text of the analysis result
+            font (QFont): Default font for the document
+            stylesheet (str): Default CSS of the current theme
+            printer (QPrinter): Configured printer, not used elsewhere meanwhile
+            filename (str): PDF file to write when no printer is given
+            parent (QObject): Parent object owning the worker
+        """
+        super().__init__(parent)
+        self.text = text
+        self.font = font
+        self.stylesheet = stylesheet
+        self.printer = printer
+        self.filename = filename
+        self.logger = logging.getLogger(__name__)
+    
+    @profiled("print_document")
+    def run(self):
+        """Build the document and paint its pages in a separate thread"""
+        try:
+            document = build_document(markdown_to_html(self.text), self.font, self.stylesheet)
+            device = self.printer if self.printer is not None else create_pdf_writer(self.filename)
+            paint_document(document, device, self.print_progress.emit)
+            self.print_complete.emit()
+            
+        except Exception as e:
+            self.logger.error(f"Error in print worker: {str(e)}")
+            self.logger.error(traceback.format_exc())
+            self.print_error.emit(str(e))
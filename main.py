@@ -4,46 +4,165 @@ CosmicDestiny - 全方位人生命理分析系統
 Main application entry point
 """
 
+import time
+
+# Taken before any other import so the startup profile covers them
+_START_TIME = time.perf_counter()
+
 import sys
 import os
-import logging
-from PyQt6.QtWidgets import QApplication
-from cosmic_destiny.ui.main_window import MainWindow
-from cosmic_destiny.config import APP_NAME
-
-def setup_logging():
-    """Configure application logging"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler("cosmic_destiny.log", encoding="utf-8")
-        ]
-    )
+import argparse
+
+# Fonts tried in order for the whole application
+APP_FONT_FAMILIES = ["Microsoft JhengHei UI", "PingFang TC", "Noto Sans TC"]
+APP_FONT_SIZE = 10
+
+def setup_logging(json_lines=False):
+    """
+    Configure application logging
+    
+    Args:
+        json_lines (bool): Write the log file as JSON lines
+    """
+    from cosmic_destiny.log import setup_logging as start_log_writer
+    from cosmic_destiny.config import LOG_JSON
+    start_log_writer(json_lines=json_lines or LOG_JSON)
+
+def parse_args(argv):
+    """
+    Parse command line arguments
+
+    Args:
+        argv (list): Arguments without the program name
+
+    Returns:
+        argparse.Namespace: The parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="CosmicDestiny 命理分析系統")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="report time to first window per startup phase, then exit")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="DIR",
+                        help="write cProfile and allocation profiles of analyses, rendering "
+                             "and exports to DIR (default: profiles)")
+    parser.add_argument("--log-json", action="store_true",
+                        help="write cosmic_destiny.log as JSON lines")
+    parser.add_argument("--serve", action="store_true",
+                        help="run the HTTP API server instead of the GUI "
+                             "(see python -m cosmic_destiny.server --help)")
+    # Unknown arguments are left for Qt, or for the server in --serve mode
+    args, args.remaining = parser.parse_known_args(argv)
+    return args
+
+class StartupProfile:
+    """Collects the duration of each startup phase"""
+
+    def __init__(self, start_time):
+        """
+        Initialize the profile
+
+        Args:
+            start_time (float): perf_counter value at process start
+        """
+        self.start_time = start_time
+        self.last_time = start_time
+        self.phases = []
+
+    def mark(self, phase):
+        """
+        Record the end of a phase
+
+        Args:
+            phase (str): Name of the phase that just finished
+        """
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last_time))
+        self.last_time = now
+
+    def report(self):
+        """
+        Format the phase breakdown
+
+        Returns:
+            str: Table of phases with their durations
+        """
+        lines = ["Startup profile (time to first window)"]
+        for phase, duration in self.phases:
+            lines.append(f"  {phase:<28} {duration * 1000:8.1f} ms")
+        lines.append(f"  {'total':<28} {(self.last_time - self.start_time) * 1000:8.1f} ms")
+        return "\n".join(lines)
 
 def main():
     """Main application entry point"""
-    # Setup logging
-    setup_logging()
+    args = parse_args(sys.argv[1:])
     
+    if args.profile is not None:
+        from cosmic_destiny.profiling import enable
+        from cosmic_destiny.config import PROFILE_DIR
+        enable(args.profile or PROFILE_DIR)
+    
+    # Server mode runs without Qt
+    if args.serve:
+        from cosmic_destiny.server import main as serve
+        serve(args.remaining)
+        return
+    
+    profile = StartupProfile(_START_TIME)
+    profile.mark("standard library imports")
+
+    # Setup logging
+    setup_logging(args.log_json)
+    profile.mark("logging")
+
+    # Qt is imported here so the profile can separate it from interpreter startup
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtGui import QFont
+    from PyQt6.QtCore import QTimer
+    from cosmic_destiny.config import APP_NAME
+    profile.mark("import Qt")
+
     # Create application
     app = QApplication(sys.argv)
     app.setApplicationName(APP_NAME)
-    
-    # Set stylesheet if exists
+    font = QFont()
+    font.setFamilies(APP_FONT_FAMILIES)
+    font.setPointSize(APP_FONT_SIZE)
+    app.setFont(font)
+    profile.mark("create QApplication")
+
+    # Load the style sheet once for the whole application
     style_path = os.path.join(os.path.dirname(__file__), "cosmic_destiny", "ui", "style.qss")
     if os.path.exists(style_path):
         with open(style_path, "r", encoding="utf-8") as f:
             app.setStyleSheet(f.read())
-    
+    profile.mark("load style sheet")
+
+    from cosmic_destiny.ui.main_window import MainWindow
+    profile.mark("import main window")
+
     # Create and show main window
     window = MainWindow()
+    profile.mark("construct main window")
     window.show()
-    
+    profile.mark("show main window")
+
+    if args.startup_profile:
+        # The first event loop pass paints the window, then report and exit
+        def finish_profile():
+            profile.mark("first paint")
+            print(profile.report())
+            app.quit()
+        QTimer.singleShot(0, finish_profile)
+
     # Run application
-    sys.exit(app.exec())
+    code = app.exec()
+    
+    # Analyses still blocked on the backend would keep the pool's destructor
+    # waiting; their jobs are recovered next session, so skip the cleanup
+    if window.analyses_abandoned:
+        from cosmic_destiny.log import shutdown_logging
+        shutdown_logging()
+        os._exit(code)
+    sys.exit(code)
 
 if __name__ == "__main__":
     main()
-
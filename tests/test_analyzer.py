@@ -3,7 +3,7 @@
 """
 
 import unittest
-from cosmic_destiny.analyzer import DestinyAnalyzer
+from cosmic_destiny.analyzer import DestinyAnalyzer, repeated_length, stitch
 
 class TestAnalyzer(unittest.TestCase):
     """DestinyAnalyzer 類的測試用例"""
@@ -39,6 +39,14 @@ class TestAnalyzer(unittest.TestCase):
         self.assertIn(user_data["fortune_type"], prompt)
         self.assertIn(user_data["focus_area"], prompt)
         
+    def test_stitching(self):
+        """測試接續生成時去除與前文重複的開頭"""
+        text = "命宮主星為天機，輔以左輔右弼，主聰慧機敏。"
+        self.assertEqual(repeated_length(text, "輔以左輔右弼，主聰慧機敏。善於謀劃"), 13)
+        self.assertEqual(repeated_length(text, "善於謀劃，整體格局清秀。"), 0)
+        self.assertEqual(repeated_length(text, "。善於"), 0)
+        self.assertEqual("".join(stitch(iter(["左輔右弼，主聰", "慧機敏。善於謀劃"]), text)), "善於謀劃")
+        
 if __name__ == "__main__":
     unittest.main()
 
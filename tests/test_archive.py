@@ -0,0 +1,82 @@
+"""
+分析結果封存的基本測試
+"""
+
+import os
+import tempfile
+import unittest
+from cosmic_destiny.archive import ResultArchive, render_report
+from cosmic_destiny.job_queue import JobQueue, execute_job
+
+class StubAnalyzer:
+    """以固定內容與指標代替 Ollama 的分析器"""
+
+    def stream_analysis(self, user_data, stats=None):
+        """逐段產生固定的分析結果"""
+        yield "命盤總論："
+        yield user_data["chinese_name"]
+        stats.update(model="test-model", settings={"temperature": 0.7},
+                     metrics={"eval_count": 2})
+
+class TestArchive(unittest.TestCase):
+    """ResultArchive 類的測試用例"""
+
+    def setUp(self):
+        """建立暫存的佇列與封存檔"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(os.path.join(self.temp_dir.name, "jobs.db"))
+        self.archive = ResultArchive(os.path.join(self.temp_dir.name, "results.jsonl"))
+
+    def tearDown(self):
+        """刪除暫存資料"""
+        self.temp_dir.cleanup()
+
+    def test_record_keeps_submitted_snapshot(self):
+        """測試封存紀錄保存提交時的資料、模型與指標"""
+        user_data = {"chinese_name": "測試", "mbti": "INTJ"}
+        job_id = self.queue.submit(user_data)
+        user_data["chinese_name"] = "已修改"
+
+        execute_job(self.queue, self.queue.claim("worker"), StubAnalyzer(), "worker",
+                    archive=self.archive)
+
+        record = self.archive.get(job_id)
+        self.assertEqual(record["user_data"]["chinese_name"], "測試")
+        self.assertEqual(record["result"], "命盤總論：測試")
+        self.assertEqual(record["model"], "test-model")
+        self.assertEqual(record["metrics"]["eval_count"], 2)
+        self.assertIn("姓名（中文）：測試", render_report(record))
+
+    def test_bulk_load_skips_damaged_line(self):
+        """測試整批載入時略過寫到一半的紀錄"""
+        for i in range(3):
+            job_id = self.queue.submit({"chinese_name": f"測試{i}"})
+            execute_job(self.queue, self.queue.claim("worker", job_id), StubAnalyzer(),
+                        "worker", archive=self.archive)
+        with open(self.archive.path, "a", encoding="utf-8") as f:
+            f.write('{"id": "partial')
+
+        records = self.archive.load_all()
+        self.assertEqual([record["result"] for record in records],
+                         [f"命盤總論：測試{i}" for i in range(3)])
+
+    def test_append_after_truncated_line(self):
+        """測試檔案在行中被截斷後，新的紀錄仍寫在新的一行"""
+        for i in range(2):
+            job_id = self.queue.submit({"chinese_name": f"測試{i}"})
+            execute_job(self.queue, self.queue.claim("worker", job_id), StubAnalyzer(),
+                        "worker", archive=self.archive)
+        with open(self.archive.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.archive.path) - 10)
+
+        job_id = self.queue.submit({"chinese_name": "測試2"})
+        execute_job(self.queue, self.queue.claim("worker", job_id), StubAnalyzer(),
+                    "worker", archive=self.archive)
+
+        records = self.archive.load_all()
+        self.assertEqual([record["result"] for record in records],
+                         ["命盤總論：測試0", "命盤總論：測試2"])
+        self.assertEqual(self.archive.get(job_id)["result"], "命盤總論：測試2")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+合盤分析的基本測試
+"""
+
+import unittest
+import numpy as np
+from cosmic_destiny.compatibility import (CompatibilityAnalyzer, chart_for_key, compute_chart,
+                                          rank_pairs)
+
+def make_profile(name, chinese_zodiac, zodiac="白羊座 (Aries)", birth_date="2000-01-01",
+                 mbti="INTJ"):
+    """建立測試用個人資料"""
+    return {
+        "chinese_name": name,
+        "gender": "男",
+        "birth_date": birth_date,
+        "birth_time": "12:00 - 12:59",
+        "zodiac": zodiac,
+        "chinese_zodiac": chinese_zodiac,
+        "mbti": mbti,
+    }
+
+class StubAnalyzer:
+    """記錄收到的提示而不呼叫 Ollama 的分析器"""
+
+    def __init__(self):
+        """初始化提示紀錄"""
+        self.prompts = []
+
+    def generate(self, prompt):
+        """回傳固定的解讀內容"""
+        self.prompts.append(prompt)
+        return "兩人相處融洽"
+
+class TestCompatibility(unittest.TestCase):
+    """CompatibilityAnalyzer 類的測試用例"""
+
+    def setUp(self):
+        """建立測試用成員"""
+        self.profiles = [
+            make_profile("甲", "鼠 (Rat)"),
+            make_profile("乙", "牛 (Ox)"),
+            make_profile("丙", "馬 (Horse)"),
+            make_profile("丁", "龍 (Dragon)", mbti="未知"),
+        ]
+        self.compatibility = CompatibilityAnalyzer(StubAnalyzer())
+
+    def test_chart_computed_once_per_profile(self):
+        """測試相同資料的命盤只計算一次"""
+        chart_for_key.cache_clear()
+        compute_chart(self.profiles[0])
+        compute_chart(dict(self.profiles[0], chinese_name="同生日"))
+        self.assertEqual(chart_for_key.cache_info().misses, 1)
+
+    def test_missing_birth_date(self):
+        """測試缺少或無效的出生日期時五行為未知"""
+        for birth_date in (None, "", 20000101, "未知"):
+            chart = compute_chart(dict(self.profiles[0], birth_date=birth_date))
+            self.assertEqual(chart.element, -1)
+
+    def test_unhashable_fields(self):
+        """測試欄位為清單或字典時視為未知，不會中斷整組分析"""
+        profile = dict(self.profiles[0], zodiac=["白羊座"], mbti={"type": "INTJ"})
+        chart = compute_chart(profile)
+        self.assertEqual(chart.western_zodiac, -1)
+        self.assertEqual(chart.mbti, (0.0, 0.0, 0.0, 0.0))
+
+        scores, _ = self.compatibility.score_group(self.profiles + [profile])
+        self.assertEqual(scores.shape, (5, 5))
+
+    def test_score_matrix(self):
+        """測試六合高於六沖，且矩陣對稱"""
+        scores, components = self.compatibility.score_group(self.profiles)
+
+        self.assertEqual(scores.shape, (4, 4))
+        self.assertTrue(np.allclose(scores, scores.T))
+        self.assertEqual(components["chinese_zodiac"][0, 1], 1.0)
+        self.assertEqual(components["chinese_zodiac"][0, 2], 0.2)
+        self.assertEqual(components["mbti"][0, 3], 0.5)
+        self.assertGreater(scores[0, 1], scores[0, 2])
+
+    def test_narrate_top_pairs_with_shared_prefix(self):
+        """測試只解讀前幾名組合，且提示開頭相同"""
+        scores, components = self.compatibility.score_group(self.profiles)
+        pairs = rank_pairs(scores, components, k=2)
+        self.assertEqual((pairs[0].first, pairs[0].second), (0, 1))
+
+        narrations = self.compatibility.narrate_pairs(self.profiles, pairs)
+        self.assertEqual(len(narrations), 2)
+
+        prefix = self.compatibility.create_group_prefix(self.profiles)
+        prompts = self.compatibility.analyzer.prompts
+        self.assertTrue(all(prompt.startswith(prefix) for prompt in prompts))
+        self.assertNotEqual(prompts[0], prompts[1])
+
+if __name__ == "__main__":
+    unittest.main()
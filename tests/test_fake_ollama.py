@@ -0,0 +1,105 @@
+"""
+模擬 Ollama 服務的基本測試
+"""
+
+import json
+import unittest
+import urllib.request
+from cosmic_destiny.analyzer import DestinyAnalyzer
+from cosmic_destiny.fake_ollama import FakeOllama, CANNED_READING, CANNED_TOKENS
+
+PROFILE = {"chinese_name": "測試", "english_name": "Test", "gender": "男",
+           "birth_date": "2000-01-01", "birth_time": "12:00 - 12:59",
+           "zodiac": "摩羯座 (Capricorn)", "chinese_zodiac": "龍 (Dragon)",
+           "mbti": "INTJ", "birthplace": "台北", "fortune_type": "紫微斗數命盤分析",
+           "focus_area": "事業發展與財富軌跡", "life_phases": []}
+
+class TestFakeOllama(unittest.TestCase):
+    """FakeOllama 類的測試用例"""
+
+    def start(self, **kwargs):
+        """啟動無延遲的模擬服務"""
+        fake = FakeOllama(load_delay=0, first_token_latency=0, tokens_per_second=0, **kwargs)
+        fake.start()
+        self.addCleanup(fake.stop)
+        return fake, DestinyAnalyzer(api_url=fake.url)
+
+    def test_stream_and_generate(self):
+        """測試串流與非串流分析皆回傳固定內容與指標"""
+        fake, analyzer = self.start()
+        stats = {}
+        self.assertEqual("".join(analyzer.stream_analysis(PROFILE, stats=stats)), CANNED_READING)
+        self.assertGreater(stats["metrics"]["eval_count"], 0)
+        self.assertIn("total_duration", stats["metrics"])
+        self.assertEqual(set(stats["spans"]),
+                         {"prompt", "connect", "load", "prompt_eval", "generation"})
+        self.assertEqual(analyzer.analyze(PROFILE), CANNED_READING)
+
+        base = fake.url.rsplit("/api/", 1)[0]
+        with urllib.request.urlopen(base + "/api/ps") as response:
+            loaded = json.loads(response.read())["models"]
+        self.assertEqual([model["name"] for model in loaded], [stats["model"]])
+
+    def test_failure_injection(self):
+        """測試注入的錯誤會讓分析失敗"""
+        _, analyzer = self.start(failure_rate=1.0)
+        with self.assertRaises(Exception):
+            analyzer.analyze(PROFILE)
+
+        _, analyzer = self.start(failure_rate=1.0, failure_mode="stream")
+        pieces = []
+        with self.assertRaises(Exception):
+            for piece in analyzer.stream_analysis(PROFILE):
+                pieces.append(piece)
+        self.assertTrue(pieces)
+
+    def test_continuation(self):
+        """測試達到 num_predict 或中途斷線的分析會接續生成，且不重複內容"""
+        fake, analyzer = self.start()
+        settings = analyzer.current_settings()
+        settings = settings._replace(options=dict(settings.options,
+                                                  num_predict=len(CANNED_TOKENS) // 2 + 1))
+        stats = {}
+        text = "".join(analyzer.stream_generate("prompt", stats, settings))
+        self.assertEqual(text, CANNED_READING)
+        self.assertEqual(stats["continuations"], 1)
+        self.assertEqual(stats["metrics"]["eval_count"], len(CANNED_TOKENS))
+        self.assertEqual(analyzer.generate("prompt", None, settings), CANNED_READING)
+
+        short = settings._replace(options=dict(settings.options, num_predict=10))
+        stats = {}
+        self.assertEqual(analyzer.generate("prompt", stats, short), "".join(CANNED_TOKENS[:30]))
+        self.assertEqual(stats["continuations"], 2)
+
+        # The fake starts over when resumed without a context
+        fake.failure_rate = 1.0
+        fake.failure_mode = "stream"
+        pieces = []
+        for piece in analyzer.stream_generate("prompt"):
+            pieces.append(piece)
+            fake.failure_rate = 0.0
+        self.assertEqual("".join(pieces), CANNED_READING)
+
+    def test_dropped_connection(self):
+        """測試連線在最終回應前中斷時接續生成，非串流則保留已生成的內容"""
+        fake, analyzer = self.start(failure_mode="drop")
+        fake.failure_rate = 1.0
+        pieces = []
+        for piece in analyzer.stream_generate("prompt"):
+            pieces.append(piece)
+            fake.failure_rate = 0.0
+        self.assertEqual("".join(pieces), CANNED_READING)
+        self.assertEqual(fake.requests, 2)
+
+        # With this seed the first request succeeds and its continuation drops
+        fake, analyzer = self.start(failure_mode="drop", failure_rate=0.5, seed=10)
+        settings = analyzer.current_settings()
+        half = len(CANNED_TOKENS) // 2 + 1
+        settings = settings._replace(options=dict(settings.options, num_predict=half))
+        stats = {}
+        self.assertEqual(analyzer.generate("prompt", stats, settings),
+                         "".join(CANNED_TOKENS[:half]))
+        self.assertEqual(stats["continuations"], 2)
+
+if __name__ == "__main__":
+    unittest.main()
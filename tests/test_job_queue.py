@@ -0,0 +1,141 @@
+"""
+持久化工作佇列的基本測試
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from cosmic_destiny.job_queue import (JobQueue, JobRunner, JobInterrupted, execute_job,
+                                      PRIORITY_BATCH,
+                                      PRIORITY_INTERACTIVE, STATUS_DONE, STATUS_FAILED,
+                                      STATUS_QUEUED, STATUS_CANCELLED)
+from cosmic_destiny.config import JOB_MAX_INTERRUPTIONS
+
+class StubAnalyzer:
+    """以固定內容代替 Ollama 的分析器"""
+
+    def __init__(self, fail=False):
+        """設定是否模擬失敗"""
+        self.fail = fail
+
+    def stream_analysis(self, user_data, stats=None):
+        """逐段產生固定的分析結果"""
+        if self.fail:
+            raise Exception("連接 Ollama API 失敗")
+        yield "命盤總論："
+        yield user_data["chinese_name"]
+
+class TestJobQueue(unittest.TestCase):
+    """JobQueue 類的測試用例"""
+
+    def setUp(self):
+        """建立暫存的佇列資料庫"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(os.path.join(self.temp_dir.name, "jobs.db"))
+
+    def tearDown(self):
+        """刪除暫存資料"""
+        self.temp_dir.cleanup()
+
+    def test_interactive_jobs_claimed_first(self):
+        """測試互動式工作優先於批次工作"""
+        batch_id = self.queue.submit({"chinese_name": "批次"}, priority=PRIORITY_BATCH)
+        gui_id = self.queue.submit({"chinese_name": "互動"}, priority=PRIORITY_INTERACTIVE)
+
+        self.assertEqual(self.queue.claim("worker")["id"], gui_id)
+        self.assertEqual(self.queue.claim("worker")["id"], batch_id)
+        self.assertIsNone(self.queue.claim("worker"))
+
+    def test_retry_bookkeeping(self):
+        """測試失敗後重試直到次數用完"""
+        job_id = self.queue.submit({"chinese_name": "測試"}, max_attempts=2)
+
+        job = self.queue.claim("worker")
+        with self.assertRaises(Exception):
+            execute_job(self.queue, job, StubAnalyzer(fail=True), "worker")
+        self.assertEqual(self.queue.get(job_id)["status"], STATUS_QUEUED)
+
+        job = self.queue.claim("worker", job_id)
+        with self.assertRaises(Exception):
+            execute_job(self.queue, job, StubAnalyzer(fail=True), "worker")
+        job = self.queue.get(job_id)
+        self.assertEqual(job["status"], STATUS_FAILED)
+        self.assertEqual(job["attempts"], 2)
+
+    def test_recover_interrupted_job(self):
+        """測試中斷的工作在重新啟動後回到佇列"""
+        job_id = self.queue.submit({"chinese_name": "測試"}, max_attempts=1)
+        self.queue.claim("crashed-worker")
+
+        self.assertEqual(self.queue.recover_stale(stale_after=60), 0)
+        self.assertEqual(self.queue.recover_stale(stale_after=-1), 1)
+
+        job = self.queue.claim("worker", job_id)
+        self.assertEqual(job["attempts"], 1)
+        execute_job(self.queue, job, StubAnalyzer(), "worker")
+        self.assertEqual(self.queue.get(job_id)["result"], "命盤總論：測試")
+
+    def test_interrupted_job_requeued(self):
+        """測試停止中的工作交回佇列且不計入嘗試次數"""
+        job_id = self.queue.submit({"chinese_name": "測試"}, max_attempts=1)
+        job = self.queue.claim("worker")
+
+        stop_event = threading.Event()
+        stop_event.set()
+        with self.assertRaises(JobInterrupted):
+            execute_job(self.queue, job, StubAnalyzer(), "worker", stop_event=stop_event)
+
+        job = self.queue.get(job_id)
+        self.assertEqual(job["status"], STATUS_QUEUED)
+        self.assertEqual(job["attempts"], 0)
+
+    def test_cancelled_job_stays_cancelled(self):
+        """測試執行中被取消的工作不會被完成或失敗的紀錄覆寫"""
+        done_id = self.queue.submit({"chinese_name": "完成"})
+        self.queue.claim("worker", done_id)
+        self.queue.cancel(done_id)
+        self.assertFalse(self.queue.complete(done_id, "worker", "結果"))
+        self.assertEqual(self.queue.get(done_id)["status"], STATUS_CANCELLED)
+
+        failed_id = self.queue.submit({"chinese_name": "失敗"}, max_attempts=3)
+        self.queue.claim("worker", failed_id)
+        self.queue.cancel(failed_id)
+        self.assertFalse(self.queue.fail(failed_id, "worker", "錯誤"))
+        self.assertEqual(self.queue.get(failed_id)["status"], STATUS_CANCELLED)
+
+    def test_repeated_interruptions_fail_job(self):
+        """測試一再中斷的工作在達到上限後標記為失敗，不會無限重排"""
+        job_id = self.queue.submit({"chinese_name": "測試"}, max_attempts=1)
+        for _ in range(JOB_MAX_INTERRUPTIONS):
+            self.queue.claim("crashed-worker", job_id)
+            self.assertEqual(self.queue.recover_stale(stale_after=-1), 1)
+            self.assertEqual(self.queue.get(job_id)["status"], STATUS_QUEUED)
+
+        self.queue.claim("crashed-worker", job_id)
+        self.assertEqual(self.queue.recover_stale(stale_after=-1), 0)
+        job = self.queue.get(job_id)
+        self.assertEqual(job["status"], STATUS_FAILED)
+        self.assertEqual(job["interruptions"], JOB_MAX_INTERRUPTIONS)
+
+    def test_spans_kept_with_result(self):
+        """測試提交時與顯示後的階段耗時都記錄在結果中"""
+        job_id = self.queue.submit({"chinese_name": "測試"}, metadata={"spans": {"form": 0.01}})
+        execute_job(self.queue, self.queue.claim("worker"), StubAnalyzer(), "worker")
+        self.queue.update_spans(job_id, {"layout": 0.02})
+
+        spans = self.queue.get(job_id)["metadata"]["spans"]
+        self.assertEqual(spans, {"form": 0.01, "layout": 0.02})
+
+    def test_runner_drains_queue(self):
+        """測試工作執行器處理完所有工作"""
+        for i in range(5):
+            self.queue.submit({"chinese_name": f"測試{i}"})
+
+        runner = JobRunner(self.queue, StubAnalyzer(), concurrency=2, poll_interval=0.01)
+        runner.run_until_empty()
+
+        self.assertEqual(self.queue.stats()[STATUS_DONE], 5)
+
+if __name__ == "__main__":
+    unittest.main()
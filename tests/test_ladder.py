@@ -0,0 +1,62 @@
+"""
+負載自適應模型階梯的基本測試
+"""
+
+import unittest
+from cosmic_destiny.ladder import ModelLadder
+from cosmic_destiny.settings import BackendSettings
+
+SETTINGS = BackendSettings(
+    "http://localhost:11434/api/generate", "deepseek-r1:14b",
+    {"temperature": 0.7, "num_predict": 4000}, 2,
+    ({"model": "deepseek-r1:7b", "num_predict": 3000},
+     {"model": "deepseek-r1:1.5b", "num_predict": 2000}), 0)
+
+class TestModelLadder(unittest.TestCase):
+    """ModelLadder 的測試用例"""
+
+    def setUp(self):
+        """建立測試用的階梯"""
+        self.ladder = ModelLadder(depth_down=4, depth_up=1, latency_down=30.0,
+                                  latency_up=10.0, hold=60.0, smoothing=0.5)
+
+    def test_steps_with_hysteresis(self):
+        """測試佇列過長時逐級降級、負載下降後逐級恢復，且變更間隔不短於 hold"""
+        self.assertEqual(self.ladder.select(SETTINGS, now=0).model, "deepseek-r1:14b")
+
+        self.ladder.observe_depth(5)
+        settings = self.ladder.select(SETTINGS, now=1)
+        self.assertEqual((settings.tier, settings.model), (1, "deepseek-r1:7b"))
+        self.assertEqual(settings.options, {"temperature": 0.7, "num_predict": 3000})
+
+        # hold 時間內不再變更，之後降到最低一級並停在該級
+        self.assertEqual(self.ladder.select(SETTINGS, now=30).tier, 1)
+        self.assertEqual(self.ladder.select(SETTINGS, now=61).tier, 2)
+        self.assertEqual(self.ladder.select(SETTINGS, now=200).tier, 2)
+
+        # 介於兩個門檻之間時維持目前等級
+        self.ladder.observe_depth(2)
+        self.assertEqual(self.ladder.select(SETTINGS, now=300).tier, 2)
+
+        self.ladder.observe_depth(0)
+        self.assertEqual(self.ladder.select(SETTINGS, now=400).tier, 1)
+        self.assertEqual(self.ladder.select(SETTINGS, now=410).tier, 1)
+        self.assertEqual(self.ladder.select(SETTINGS, now=500).tier, 0)
+
+    def test_latency_and_shortened_ladder(self):
+        """測試首個 token 延遲的移動平均觸發降級，以及階梯縮短時的處理"""
+        self.ladder.observe_latency(40.0)
+        self.assertEqual(self.ladder.select(SETTINGS, now=0).tier, 1)
+
+        # 延遲需降到 latency_up 以下才恢復
+        self.ladder.observe_latency(10.0)
+        self.assertEqual(self.ladder.select(SETTINGS, now=100).tier, 1)
+        self.ladder.observe_latency(0.0)
+        self.ladder.observe_latency(0.0)
+        self.assertEqual(self.ladder.select(SETTINGS, now=200).tier, 0)
+
+        self.ladder.observe_latency(100.0)
+        self.assertEqual(self.ladder.select(SETTINGS._replace(ladder=()), now=300).tier, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+預先生成解讀庫的基本測試
+"""
+
+import os
+import socket
+import tempfile
+import unittest
+from cosmic_destiny.analyzer import DestinyAnalyzer, BackendUnavailable
+from cosmic_destiny.fake_ollama import FakeOllama, CANNED_READING
+from cosmic_destiny.library import ReadingLibrary, LIBRARY_NOTE, build, combinations
+
+PROFILE = {"chinese_name": "測試", "english_name": "Test", "gender": "男",
+           "birth_date": "2000-01-01", "birth_time": "12:00 - 12:59",
+           "zodiac": "白羊座 (Aries)", "chinese_zodiac": "鼠 (Rat)",
+           "mbti": "INTJ", "birthplace": "台北", "fortune_type": "紫微斗數命盤分析",
+           "focus_area": "人生整體命運藍圖", "life_phases": []}
+
+class TestLibrary(unittest.TestCase):
+    """ReadingLibrary 與建置指令的測試用例"""
+
+    def setUp(self):
+        """建立暫存目錄與無延遲的模擬服務"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "library")
+        self.fake = FakeOllama(load_delay=0, first_token_latency=0, tokens_per_second=0)
+        self.fake.start()
+
+    def tearDown(self):
+        """停止模擬服務並刪除暫存資料"""
+        self.fake.stop()
+        self.temp_dir.cleanup()
+
+    def unreachable_url(self):
+        """取得一個沒有服務在監聽的位址"""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        return f"http://127.0.0.1:{port}/api/generate"
+
+    def test_build_resumes_and_serves_readings(self):
+        """測試建置可接續進行，且分析服務無法連線時改用解讀庫的內容"""
+        selection = (["紫微斗數命盤分析"], ["人生整體命運藍圖"])
+        self.assertEqual(len(list(combinations(*selection))), 12 * 12 * 16)
+
+        analyzer = DestinyAnalyzer(api_url=self.fake.url)
+        self.assertEqual(build(analyzer, self.path, *selection, limit=2), (2, 0))
+        self.assertEqual(build(analyzer, self.path, *selection, limit=2), (2, 0))
+
+        library = ReadingLibrary(self.path)
+        self.assertEqual(len(library.archive), 4)
+        self.assertEqual(library.lookup(PROFILE)["result"], CANNED_READING)
+        self.assertIsNone(library.lookup(dict(PROFILE, mbti="ENFP")))
+        self.assertIsNone(library.lookup(dict(PROFILE, mbti=["INTJ"])))
+
+        offline = DestinyAnalyzer(api_url=self.unreachable_url(), library=library)
+        self.assertEqual(offline.preview(PROFILE)[1], CANNED_READING)
+        stats = {}
+        reading = "".join(offline.stream_analysis(PROFILE, stats=stats))
+        self.assertEqual(reading, LIBRARY_NOTE + CANNED_READING)
+        self.assertEqual(stats["fallback"], "library")
+        self.assertEqual(offline.analyze(PROFILE), LIBRARY_NOTE + CANNED_READING)
+        with self.assertRaises(Exception):
+            offline.analyze(dict(PROFILE, mbti="ENFP"))
+        with self.assertRaises(BackendUnavailable):
+            offline.analyze(dict(PROFILE, focus_area=None, mbti=16))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+非阻塞日誌的基本測試
+"""
+
+import json
+import logging
+import os
+import tempfile
+import unittest
+from cosmic_destiny.log import setup_logging, shutdown_logging, log_context
+
+class TestLog(unittest.TestCase):
+    """setup_logging 的測試用例"""
+
+    def setUp(self):
+        """建立暫存的日誌檔"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "test.log")
+        self.root_level = logging.getLogger().level
+
+    def tearDown(self):
+        """移除日誌設定並刪除暫存資料"""
+        shutdown_logging()
+        logging.getLogger().setLevel(self.root_level)
+        self.temp_dir.cleanup()
+
+    def test_json_lines_with_request_id(self):
+        """測試 JSON 日誌包含分析 ID、計時欄位與例外內容"""
+        setup_logging(path=self.path, json_lines=True, console=False)
+        logger = logging.getLogger("cosmic_destiny.test")
+        with log_context("job-1"):
+            logger.info("分析完成 %s", "測試", extra={"duration_ms": 1234})
+        try:
+            raise ValueError("測試錯誤")
+        except ValueError:
+            logger.exception("分析失敗")
+        shutdown_logging()
+
+        with open(self.path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(records[0]["message"], "分析完成 測試")
+        self.assertEqual(records[0]["request_id"], "job-1")
+        self.assertEqual(records[0]["duration_ms"], 1234)
+        self.assertNotIn("request_id", records[1])
+        self.assertIn("ValueError: 測試錯誤", records[1]["exception"])
+
+    def test_text_lines(self):
+        """測試文字日誌的格式與分析 ID"""
+        setup_logging(path=self.path, console=False)
+        with log_context("job-2"):
+            logging.getLogger("cosmic_destiny.test").warning("連線逾時")
+        shutdown_logging()
+
+        with open(self.path, encoding="utf-8") as f:
+            line = f.read().strip()
+        self.assertTrue(line.endswith("cosmic_destiny.test - WARNING - 連線逾時 [job-2]"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+壓縮封存檔的基本測試
+"""
+
+import os
+import tempfile
+import unittest
+import uuid
+from cosmic_destiny.archive import make_record
+from cosmic_destiny.packed_archive import PackedArchive, pack
+
+class TestPackedArchive(unittest.TestCase):
+    """PackedArchive 類的測試用例"""
+
+    def setUp(self):
+        """建立暫存的壓縮封存檔"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "results")
+        self.records = [
+            make_record(uuid.uuid4().hex, {"chinese_name": f"測試{i}"},
+                        "## 命盤總論\n五行之中木氣偏旺，宜多接觸水元素以平衡。\n" * (20 + i))
+            for i in range(30)
+        ]
+        self.archive = pack(self.records, self.path)
+
+    def tearDown(self):
+        """刪除暫存資料"""
+        self.archive.close()
+        self.temp_dir.cleanup()
+
+    def test_random_access(self):
+        """測試依位置與 ID 讀取單筆紀錄"""
+        self.assertEqual(len(self.archive), 30)
+        self.assertEqual(self.archive.read(17), self.records[17])
+        self.assertEqual(self.archive.get(self.records[5]["id"]), self.records[5])
+        self.assertIsNone(self.archive.get(uuid.uuid4().hex))
+
+    def test_append_and_reopen(self):
+        """測試附加紀錄後重新開啟仍可讀取"""
+        record = make_record("api-1", {"chinese_name": "新增"}, "命盤總論：新增")
+        self.archive.append(record)
+
+        with PackedArchive(self.path) as reopened:
+            self.assertEqual(len(reopened), 31)
+            self.assertEqual(reopened.get("api-1"), record)
+            self.assertEqual(list(reopened)[:30], self.records)
+
+    def test_compresses(self):
+        """測試壓縮後小於原始大小"""
+        raw_size, compressed_size, _ = self.archive.sizes()
+        self.assertLess(compressed_size * 3, raw_size)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+效能剖析掛鉤的基本測試
+"""
+
+import os
+import tempfile
+import unittest
+from cosmic_destiny import profiling
+from cosmic_destiny.profiling import profiled
+
+@profiled("build")
+def build(count):
+    """建立測試用的字串清單"""
+    return ["命盤" * 100 for _ in range(count)]
+
+@profiled("stream")
+def stream(count):
+    """回傳逐段產生內容的產生器"""
+    return (text for text in build(count))
+
+class TestProfiling(unittest.TestCase):
+    """profiled 裝飾器的測試用例"""
+
+    def setUp(self):
+        """建立暫存的剖析目錄"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.addCleanup(profiling.disable)
+
+    def profile_names(self):
+        """列出已寫入的剖析檔"""
+        return sorted(os.listdir(self.temp_dir.name))
+
+    def test_disabled_writes_nothing(self):
+        """測試未啟用時不寫入任何檔案"""
+        self.assertEqual(len(build(3)), 3)
+        self.assertEqual(self.profile_names(), [])
+
+    def test_profiles_calls_and_generators(self):
+        """測試一般呼叫與產生器各寫入一份剖析與摘要"""
+        profiling.enable(self.temp_dir.name)
+        build(10)
+        self.assertEqual(len(list(stream(10))), 10)
+
+        names = self.profile_names()
+        self.assertEqual(len(names), 4)
+        summaries = [name for name in names if name.endswith(".txt")]
+        self.assertTrue(any("-stream-" in name for name in summaries))
+        with open(os.path.join(self.temp_dir.name, summaries[0]), encoding="utf-8") as f:
+            summary = f.read()
+        self.assertIn("wall time", summary)
+        self.assertIn("allocation sites", summary)
+
+    def test_retention(self):
+        """測試只保留最新的剖析紀錄"""
+        profiling.enable(self.temp_dir.name, keep=2)
+        for _ in range(5):
+            build(1)
+        self.assertEqual(len(self.profile_names()), 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+結果渲染模組的基本測試
+"""
+
+import os
+import tempfile
+import unittest
+from cosmic_destiny.renderer import (markdown_to_html, split_sections, build_document,
+                                     append_html, prepend_html, paint_document,
+                                     create_pdf_writer)
+
+class TestRenderer(unittest.TestCase):
+    """renderer 模組的測試用例"""
+
+    def setUp(self):
+        """設置測試用例"""
+        section = "## 命盤總論\n\n" + "- **重點** 測試內容\n" * 30 + "\n> 引言\n\n"
+        self.text = section * 20
+
+    def test_split_sections_round_trip(self):
+        """測試分段後可以還原原文"""
+        sections = split_sections(self.text, max_chars=1000)
+
+        self.assertGreater(len(sections), 1)
+        self.assertEqual("\n".join(sections), self.text)
+
+    def test_split_sections_at_headings(self):
+        """測試分段只在標題或空行處切開"""
+        for section in split_sections(self.text, max_chars=1000)[1:]:
+            first_line = section.split("\n")[0]
+            self.assertTrue(first_line.startswith("#") or not first_line.strip())
+
+    def test_markdown_to_html(self):
+        """測試 Markdown 轉換為 HTML"""
+        html = markdown_to_html("## 標題\n- **重點**")
+
+        self.assertIn("<h2>標題</h2>", html)
+        self.assertIn("<li><strong>重點</strong></li>", html)
+
+    def test_paint_document_reports_pages(self):
+        """測試逐頁輸出 PDF 並回報進度"""
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6.QtGui import QGuiApplication
+        app = QGuiApplication.instance() or QGuiApplication([])
+
+        progress = []
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "result.pdf")
+            document = build_document(markdown_to_html(self.text))
+            paint_document(document, create_pdf_writer(path),
+                           lambda done, total: progress.append((done, total)))
+
+            self.assertGreater(os.path.getsize(path), 0)
+        self.assertGreater(len(progress), 1)
+        self.assertEqual(progress[-1][0], progress[-1][1])
+
+    def test_section_positions(self):
+        """測試前後加入段落時回傳的位置正好是各段的開頭"""
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6.QtGui import QGuiApplication
+        app = QGuiApplication.instance() or QGuiApplication([])
+
+        document = build_document(markdown_to_html("## 第二段\n\n內容二"))
+        start = append_html(document, markdown_to_html("## 第三段\n\n內容三"))
+        self.assertEqual(document.findBlock(start).text(), "第三段")
+        self.assertEqual(document.findBlock(start).blockFormat().headingLevel(), 2)
+
+        shift = prepend_html(document, markdown_to_html("## 第一段\n\n內容一"))
+        self.assertEqual(document.begin().text(), "第一段")
+        self.assertEqual(document.findBlock(shift).text(), "第二段")
+        self.assertEqual(document.findBlock(shift).blockFormat().headingLevel(), 2)
+        self.assertEqual(document.findBlock(start + shift).text(), "第三段")
+
+if __name__ == "__main__":
+    unittest.main()
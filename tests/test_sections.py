@@ -0,0 +1,67 @@
+"""
+段落快取的基本測試
+"""
+
+import os
+import tempfile
+import unittest
+from cosmic_destiny.analyzer import DestinyAnalyzer
+from cosmic_destiny.fake_ollama import FakeOllama, CANNED_READING
+from cosmic_destiny.sections import SECTIONS, SectionCache, section_key, create_section_prompt
+
+PROFILE = {"chinese_name": "測試", "english_name": "Test", "gender": "男",
+           "birth_date": "2000-01-01", "birth_time": "12:00 - 12:59",
+           "zodiac": "摩羯座 (Capricorn)", "chinese_zodiac": "龍 (Dragon)",
+           "mbti": "INTJ", "birthplace": "台北", "fortune_type": "紫微斗數命盤分析",
+           "focus_area": "事業發展與財富軌跡", "life_phases": []}
+
+class TestSections(unittest.TestCase):
+    """SectionCache 與分段生成的測試用例"""
+
+    def setUp(self):
+        """建立暫存的快取資料庫與無延遲的模擬服務"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = SectionCache(os.path.join(self.temp_dir.name, "sections.db"))
+        self.fake = FakeOllama(load_delay=0, first_token_latency=0, tokens_per_second=0)
+        self.fake.start()
+        self.analyzer = DestinyAnalyzer(api_url=self.fake.url, section_cache=self.cache)
+
+    def tearDown(self):
+        """停止模擬服務並刪除暫存資料"""
+        self.fake.stop()
+        self.temp_dir.cleanup()
+
+    def test_key_depends_only_on_section_fields(self):
+        """測試快取鍵只取決於段落相依的欄位，提示詞不含姓名"""
+        personality = SECTIONS[1]
+        other = dict(PROFILE, chinese_name="其他", birth_date="1990-05-05")
+        self.assertEqual(section_key(personality, PROFILE, "m"), section_key(personality, other, "m"))
+        self.assertNotEqual(section_key(personality, PROFILE, "m"),
+                            section_key(personality, dict(PROFILE, mbti="ENFP"), "m"))
+        self.assertNotEqual(section_key(personality, PROFILE, "m"),
+                            section_key(personality, PROFILE, "n"))
+        self.assertNotIn("測試", create_section_prompt(SECTIONS[0], 1, PROFILE))
+
+    def test_invalid_life_phases(self):
+        """測試人生階段為 null 或含非字串時視為未指定"""
+        overview = SECTIONS[0]
+        for phases in (None, [None, 3]):
+            self.assertEqual(section_key(overview, dict(PROFILE, life_phases=phases), "m"),
+                             section_key(overview, PROFILE, "m"))
+
+    def test_reuses_cached_sections(self):
+        """測試新個人資料只生成與自身相關的段落，其餘取自快取"""
+        stats = {}
+        reading = "".join(self.analyzer.stream_analysis(PROFILE, stats=stats))
+        self.assertEqual(reading, "\n\n".join([CANNED_READING] * len(SECTIONS)))
+        self.assertEqual(stats["cached_sections"], [])
+        self.assertGreater(stats["metrics"]["eval_count"], 0)
+
+        stats = {}
+        other = dict(PROFILE, chinese_name="其他", birth_time="05:00 - 05:59")
+        self.assertEqual(self.analyzer.analyze(other, stats=stats), reading)
+        self.assertEqual(stats["cached_sections"], ["personality", "focus", "remedies"])
+        self.assertEqual(sum(counts["hits"] for counts in self.cache.stats().values()), 3)
+
+if __name__ == "__main__":
+    unittest.main()
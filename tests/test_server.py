@@ -0,0 +1,140 @@
+"""
+HTTP API 伺服器的基本測試
+"""
+
+import asyncio
+import json
+import threading
+import unittest
+from cosmic_destiny.server import AnalysisServer
+
+class StubAnalyzer:
+    """以固定內容代替 Ollama 的分析器"""
+
+    def __init__(self):
+        """初始化計數器"""
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def stream_analysis(self, user_data, stats=None):
+        """逐段產生固定的分析結果"""
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            for index, text in enumerate(("命盤", "總論：", user_data["chinese_name"])):
+                threading.Event().wait(0.01)
+                if stats is not None:
+                    stats[f"chunk_{index}"] = len(text)
+                yield text
+        finally:
+            with self.lock:
+                self.active -= 1
+
+class FailingArchive:
+    """寫入時一律失敗的封存檔"""
+
+    def append(self, record):
+        """模擬磁碟錯誤"""
+        raise OSError("磁碟已滿")
+
+class TestServer(unittest.IsolatedAsyncioTestCase):
+    """AnalysisServer 類的測試用例"""
+
+    async def asyncSetUp(self):
+        """啟動測試用伺服器"""
+        self.analyzer = StubAnalyzer()
+        self.server = AnalysisServer(self.analyzer, slots=2)
+        self.host, self.port = await self.server.start("127.0.0.1", 0)
+
+    async def asyncTearDown(self):
+        """關閉伺服器"""
+        await self.server.close()
+
+    async def request(self, method, path, data=None):
+        """送出請求並回傳狀態碼與內容"""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(data).encode("utf-8") if data is not None else b""
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\n"
+                     f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+        response = await reader.read()
+        writer.close()
+        head, _, content = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), content.decode("utf-8")
+
+    async def test_submit_and_stream(self):
+        """測試提交分析並以 SSE 取得結果"""
+        status, content = await self.request("POST", "/api/analyses", {"chinese_name": "測試"})
+        self.assertEqual(status, 202)
+        job_id = json.loads(content)["id"]
+
+        status, content = await self.request("GET", f"/api/analyses/{job_id}/events")
+        self.assertEqual(status, 200)
+        self.assertIn("event: chunk", content)
+        self.assertIn("event: done", content)
+
+        status, content = await self.request("GET", f"/api/analyses/{job_id}")
+        self.assertEqual(json.loads(content)["result"], "命盤總論：測試")
+        self.assertEqual(json.loads(content)["metadata"]["chunk_2"], 2)
+
+    async def test_metadata_published_when_done(self):
+        """測試執行中的分析不回傳仍在寫入的指標"""
+        _, content = await self.request("POST", "/api/analyses", {"chinese_name": "測試"})
+        job_id = json.loads(content)["id"]
+
+        while True:
+            _, content = await self.request("GET", f"/api/analyses/{job_id}")
+            job = json.loads(content)
+            if job["status"] == "done":
+                break
+            self.assertNotIn("metadata", job)
+            await asyncio.sleep(0.002)
+        self.assertEqual(len(job["metadata"]), 3)
+
+    async def test_bounded_slots(self):
+        """測試同時執行的分析數量不超過槽位數"""
+        ids = []
+        for i in range(6):
+            _, content = await self.request("POST", "/api/analyses", {"chinese_name": f"測試{i}"})
+            ids.append(json.loads(content)["id"])
+
+        for job_id in ids:
+            await self.request("GET", f"/api/analyses/{job_id}/events")
+
+        _, content = await self.request("GET", "/api/status")
+        self.assertEqual(json.loads(content)["finished"], 6)
+        self.assertLessEqual(self.analyzer.max_active, 2)
+
+    async def test_invalid_profile(self):
+        """測試缺少姓名時回傳錯誤"""
+        status, _ = await self.request("POST", "/api/analyses", {"english_name": "Test"})
+        self.assertEqual(status, 400)
+
+    async def test_invalid_content_length(self):
+        """測試無效或過大的 Content-Length 回傳錯誤"""
+        for length, expected in (("abc", 400), ("-5", 400), ("999999999", 413)):
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            writer.write(f"POST /api/analyses HTTP/1.1\r\nHost: test\r\n"
+                         f"Content-Length: {length}\r\n\r\n".encode("latin-1"))
+            response = await reader.read()
+            writer.close()
+            self.assertEqual(int(response.split()[1]), expected)
+
+    async def test_archive_failure_keeps_result(self):
+        """測試封存失敗時分析仍視為完成"""
+        self.server.archive = FailingArchive()
+        with self.assertLogs("cosmic_destiny.server", "ERROR") as logs:
+            _, content = await self.request("POST", "/api/analyses", {"chinese_name": "測試"})
+            job_id = json.loads(content)["id"]
+            await self.request("GET", f"/api/analyses/{job_id}/events")
+            while not logs.records:
+                await asyncio.sleep(0.01)
+
+        _, content = await self.request("GET", f"/api/analyses/{job_id}")
+        job = json.loads(content)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["result"], "命盤總論：測試")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+可熱重載設定的基本測試
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+from cosmic_destiny.settings import SettingsWatcher, load_settings
+from cosmic_destiny.config import OLLAMA_MODEL, MODEL_SETTINGS
+
+class TestSettings(unittest.TestCase):
+    """load_settings 與 SettingsWatcher 的測試用例"""
+
+    def setUp(self):
+        """建立暫存的設定檔路徑"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "cosmic_destiny.toml")
+
+    def tearDown(self):
+        """刪除暫存資料"""
+        self.temp_dir.cleanup()
+
+    def write(self, text, mtime):
+        """寫入設定檔並指定修改時間，避免檔案系統時間精度影響測試"""
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.utime(self.path, (mtime, mtime))
+
+    def test_defaults_file_and_environment(self):
+        """測試預設值、設定檔與環境變數的優先順序"""
+        settings = load_settings(self.path)
+        self.assertEqual(settings.model, OLLAMA_MODEL)
+        self.assertEqual(settings.options, MODEL_SETTINGS)
+
+        self.write('[ollama]\nmodel = "deepseek-r1:7b"\n\n'
+                   '[model_settings]\nnum_predict = 1000\n', 1000)
+        with mock.patch.dict(os.environ, {"COSMIC_DESTINY_OPTION_TEMPERATURE": "0.2"}):
+            settings = load_settings(self.path)
+        self.assertEqual(settings.model, "deepseek-r1:7b")
+        self.assertEqual(settings.options["num_predict"], 1000)
+        self.assertEqual(settings.options["temperature"], 0.2)
+        self.assertEqual(settings.options["top_k"], MODEL_SETTINGS["top_k"])
+
+    def test_reload_keeps_previous_on_error(self):
+        """測試設定檔變更後重新載入，格式錯誤時保留原設定"""
+        self.write('[ollama]\nmodel = "deepseek-r1:7b"\n', 1000)
+        watcher = SettingsWatcher(self.path, interval=0)
+        before = watcher.current()
+        self.assertFalse(watcher.check())
+
+        reloads = []
+        watcher.add_listener(lambda old, new: reloads.append((old, new)))
+        self.write('[ollama]\nmodel = "deepseek-r1:1.5b"\n', 2000)
+        self.assertEqual(watcher.current().model, "deepseek-r1:1.5b")
+        self.assertEqual(reloads, [(before, watcher.current())])
+
+        # 已取得的快照不受重新載入影響
+        self.assertEqual(before.model, "deepseek-r1:7b")
+
+        with self.assertLogs("cosmic_destiny.settings", level="WARNING"):
+            self.write('[ui]\nanalysis_slots = 0\n', 3000)
+            self.assertFalse(watcher.check())
+        self.assertEqual(watcher.current().model, "deepseek-r1:1.5b")
+
+if __name__ == "__main__":
+    unittest.main()
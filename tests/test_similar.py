@@ -0,0 +1,82 @@
+"""
+相似過往分析索引的基本測試
+"""
+
+import os
+import tempfile
+import unittest
+from cosmic_destiny.analyzer import DestinyAnalyzer
+from cosmic_destiny.archive import ResultArchive, make_record
+from cosmic_destiny.library import LIBRARY_NOTE
+from cosmic_destiny.similar import SimilarReadings, reference_passages
+
+PROFILE = {"chinese_name": "測試", "english_name": "Test", "gender": "男",
+           "birth_date": "2000-01-01", "birth_time": "12:00 - 12:59",
+           "zodiac": "白羊座 (Aries)", "chinese_zodiac": "鼠 (Rat)",
+           "mbti": "INTJ", "birthplace": "台北", "fortune_type": "紫微斗數命盤分析",
+           "focus_area": "事業發展與財富軌跡", "life_phases": []}
+
+OTHER = dict(PROFILE, chinese_name="他人", english_name="Other", zodiac="巨蟹座 (Cancer)",
+             chinese_zodiac="蛇 (Snake)", mbti="ESFP", focus_area="感情姻緣與家庭關係")
+
+READING = "## 命盤總論\n\n測試的白羊座性格果斷。\n\n## 事業\n\n事業發展與財富軌跡穩健。"
+
+class TestSimilar(unittest.TestCase):
+    """SimilarReadings 與預覽、參考段落的測試用例"""
+
+    def setUp(self):
+        """建立暫存的封存檔與索引"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.archive = ResultArchive(os.path.join(self.temp_dir.name, "results.jsonl"))
+        self.index_path = os.path.join(self.temp_dir.name, "similar")
+        self.archive.append(make_record("near", PROFILE, READING))
+        self.archive.append(make_record("far", OTHER, "## 感情\n\n他人的巨蟹座感情細膩。"))
+        self.archive.append(make_record("offline", PROFILE, LIBRARY_NOTE + READING))
+
+    def tearDown(self):
+        """刪除暫存資料"""
+        self.temp_dir.cleanup()
+
+    def open_index(self):
+        """開啟暫存目錄中的索引"""
+        return SimilarReadings(self.index_path, self.archive.path)
+
+    def test_index_is_incremental_and_ranks_by_similarity(self):
+        """測試索引只加入新增的分析，並依相似度排序，略過解讀庫的備援結果"""
+        index = self.open_index()
+        self.assertEqual(index.refresh(), 2)
+        self.assertEqual(index.refresh(), 0)
+
+        query = dict(PROFILE, chinese_name="新人", birth_date="2001-03-03")
+        results = index.nearest(query, k=2)
+        self.assertEqual([record["id"] for _, record in results], ["near", "far"])
+        self.assertGreater(results[0][0], 0.8)
+        self.assertEqual(index.nearest(query, k=2, exclude_id="near")[0][1]["id"], "far")
+
+        self.archive.append(make_record("later", PROFILE, READING))
+        reopened = self.open_index()
+        self.assertEqual(len(reopened), 2)
+        self.assertEqual(reopened.refresh(), 1)
+        self.assertEqual(len(reopened.nearest(query, k=5)), 3)
+
+    def test_preview_and_reference_hide_the_other_name(self):
+        """測試預覽與參考段落不包含過往當事人的姓名"""
+        analyzer = DestinyAnalyzer(api_url="http://127.0.0.1:1/api/generate",
+                                   similar=self.open_index(), reference=True)
+        query = dict(PROFILE, chinese_name="新人")
+        label, text = analyzer.preview(query)
+        self.assertIn("相似度", label)
+        self.assertNotIn("測試", text)
+        self.assertIn("白羊座性格果斷", text)
+
+        stats = {}
+        prompt = analyzer.reference_prompt(query, stats)
+        self.assertIn("事業發展與財富軌跡穩健", prompt)
+        self.assertNotIn("測試", prompt)
+        self.assertEqual(stats["reference"], "near")
+
+        record = make_record("near", PROFILE, READING)
+        self.assertEqual(reference_passages(record, query, 12), "事業發展與財富軌跡穩健。")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+"""
+階段計時與生成進度的基本測試
+"""
+
+import unittest
+from cosmic_destiny.timing import Spans, GenerationProgress, format_spans
+
+class TestTiming(unittest.TestCase):
+    """Spans 與 GenerationProgress 類的測試用例"""
+
+    def test_spans_recorded_in_metadata(self):
+        """測試階段耗時累加並寫入分析資訊"""
+        stats = {}
+        spans = Spans.of(stats)
+        spans.add("generation", 2.0)
+        spans.add("generation", 0.5)
+        with spans.span("prompt"):
+            pass
+
+        self.assertEqual(stats["spans"]["generation"], 2.5)
+        self.assertLess(stats["spans"]["prompt"], 0.1)
+        self.assertTrue(format_spans(stats["spans"]).startswith("建立提示詞"))
+
+    def test_progress_rate_and_eta(self):
+        """測試以最近的吞吐量估計剩餘時間"""
+        progress = GenerationProgress(expected_tokens=300, budget=1000, window=5.0)
+        start = progress.start_time
+        for i in range(100):
+            progress.add(1, start + 2.0 + i * 0.1)
+
+        snapshot = progress.snapshot(start + 12.0)
+        self.assertAlmostEqual(snapshot["ttft"], 2.0)
+        self.assertAlmostEqual(snapshot["rate"], 10.0)
+        self.assertAlmostEqual(snapshot["eta"], 20.0)
+        self.assertEqual(snapshot["budget"], 1000)
+
+if __name__ == "__main__":
+    unittest.main()